@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import Counter
+
+from singleflight import SingleFlight
+
+# Настройки кэша ответов GET-эндпоинтов (можно переопределять через переменные окружения)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | redis | none
+CACHE_TTL = float(os.getenv("CACHE_TTL", 30))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "announcement_service")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Обращения к кэшу ответов", ["endpoint", "result"]
+)
+CACHE_NOT_MODIFIED = Counter("response_cache_not_modified_total", "Ответы 304 по If-None-Match", ["endpoint"])
+CACHE_INVALIDATIONS = Counter("response_cache_invalidations_total", "Инвалидации кэша ответов", ["scope"])
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверка заголовка If-None-Match (список ETag через запятую, * или слабые W/"...").
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def serialize(model, data: dict) -> bytes:
+    """
+    Тело ответа по схеме эндпоинта: кэшируется ровно то, что вернул бы response_model.
+    """
+    return json.dumps(jsonable_encoder(model(**data)), separators=(",", ":")).encode()
+
+
+def cached_response(cached: CachedResponse, if_none_match: Optional[str], endpoint: str) -> Response:
+    """
+    Ответ из кэша с ETag; 304 без тела, если клиент прислал совпадающий If-None-Match.
+    """
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, cached.etag):
+        CACHE_NOT_MODIFIED.labels(endpoint).inc()
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+class MemoryBackend:
+    """
+    LRU-кэш в памяти процесса с TTL на запись.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        # Счётчики версий хранятся отдельно, чтобы их не вытеснил LRU
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Общий для всех экземпляров сервиса кэш в Redis.
+    """
+
+    def __init__(self, client=None, url: str = REDIS_URL):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+            client = redis.from_url(url)
+        self._client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_backend(name: str = CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    if name == "none":
+        return None
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class ResponseCache:
+    """
+    Read-through кэш ответов: сериализованное тело и ETag хранятся в бэкенде,
+    одновременные промахи по одному ключу объединяются в один запрос к db_service.
+    Списки кэшируются под номером версии: при создании объявления версия увеличивается,
+    и все закэшированные страницы перестают использоваться без перебора ключей.
+    """
+
+    def __init__(self, backend=None, ttl: float = CACHE_TTL, prefix: str = CACHE_KEY_PREFIX):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self._flight = SingleFlight()
+
+    @property
+    def _list_version_key(self) -> str:
+        return f"{self.prefix}:announcements:list:version"
+
+    def item_key(self, announcement_id: int) -> str:
+        return f"{self.prefix}:announcements:item:{announcement_id}"
+
+    async def list_key(self, params: dict) -> str:
+        version = 0
+        if self.backend is not None:
+            try:
+                version = int((await self.backend.get(self._list_version_key)) or 0)
+            except Exception as e:
+                logger.warning(f"Cache read failed for list version: {e}")
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{self.prefix}:announcements:list:v{version}:{digest}"
+
+    async def get_or_load(self, key: str, endpoint: str, load: Callable[[], Awaitable[bytes]]) -> CachedResponse:
+        """
+        Возвращает закэшированный ответ или загружает его через load(); ошибки не кэшируются.
+        """
+        if self.backend is not None:
+            try:
+                cached = await self.backend.get(key)
+            except Exception as e:
+                # Недоступный кэш не должен ломать чтение: идём в db_service напрямую
+                logger.warning(f"Cache read failed for {key}: {e}")
+                cached = None
+            if cached is not None:
+                CACHE_REQUESTS.labels(endpoint, "hit").inc()
+                etag, _, body = cached.partition(b"\n")
+                return CachedResponse(body=body, etag=etag.decode())
+
+        async def fill() -> CachedResponse:
+            body = await load()
+            response = CachedResponse(body=body, etag=make_etag(body))
+            if self.backend is not None:
+                try:
+                    await self.backend.set(key, response.etag.encode() + b"\n" + body, self.ttl)
+                except Exception as e:
+                    logger.warning(f"Cache write failed for {key}: {e}")
+            return response
+
+        response, shared = await self._flight.do(key, fill)
+        CACHE_REQUESTS.labels(endpoint, "coalesced" if shared else "miss").inc()
+        return response
+
+    async def invalidate_announcement(self, announcement_id: int):
+        if self.backend is not None:
+            await self.backend.delete(self.item_key(announcement_id))
+        CACHE_INVALIDATIONS.labels("item").inc()
+
+    async def invalidate_lists(self):
+        if self.backend is not None:
+            await self.backend.incr(self._list_version_key)
+        CACHE_INVALIDATIONS.labels("lists").inc()
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+
+response_cache = ResponseCache(create_backend())
@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+
+from cache import response_cache
+from rabbitmq_utils import (
+    ANNOUNCEMENT_EVENTS_EXCHANGE, RABBITMQ_HOST, RABBITMQ_PASSWORD, RABBITMQ_PORT, RABBITMQ_RECONNECT_DELAY,
+    RABBITMQ_USER, publisher
+)
+
+# Идентификатор экземпляра: собственные события уже применены локально и пропускаются
+INSTANCE_ID = uuid.uuid4().hex
+
+logger = logging.getLogger(__name__)
+
+
+async def apply_event(event: dict):
+    """
+    Инвалидирует кэш по событию об изменении объявления.
+    """
+    announcement_id = event.get("announcement_id")
+    if announcement_id is not None:
+        await response_cache.invalidate_announcement(int(announcement_id))
+    await response_cache.invalidate_lists()
+
+
+async def announcement_changed(event: str, announcement_id: int):
+    """
+    Инвалидирует локальный кэш и оповещает остальные экземпляры через RabbitMQ.
+    """
+    message = {"event": event, "announcement_id": announcement_id, "origin": INSTANCE_ID}
+    try:
+        await apply_event(message)
+    except Exception as e:
+        # Изменение уже сохранено в db_service: устаревший кэш истечёт по TTL
+        logger.error(f"Failed to invalidate cache after '{event}' of announcement {announcement_id}: {e}")
+    publisher.publish(message, exchange=ANNOUNCEMENT_EVENTS_EXCHANGE)
+
+
+class InvalidationListener:
+    """
+    Подписка экземпляра на fanout-обменник событий: у каждого экземпляра своя
+    временная очередь, поэтому событие получают все экземпляры сервиса.
+    """
+
+    def __init__(self):
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._connection is not None and not self._connection.is_closed:
+            await self._connection.close()
+        self._connection = None
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        async with message.process(ignore_processed=True):
+            try:
+                event = json.loads(message.body)
+            except json.JSONDecodeError:
+                logger.error("Invalid cache invalidation event, skipped")
+                return
+            if event.get("origin") == INSTANCE_ID:
+                return
+            await apply_event(event)
+            logger.info(f"Cache invalidated by event: {event}")
+
+    async def _run(self):
+        # connect_robust восстанавливает подписку сам, повторяем только первое подключение
+        while True:
+            connection = None
+            try:
+                connection = await aio_pika.connect_robust(
+                    host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
+                )
+                channel = await connection.channel()
+                exchange = await channel.declare_exchange(
+                    ANNOUNCEMENT_EVENTS_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True
+                )
+                queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+                await queue.bind(exchange)
+                await queue.consume(self._on_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[RabbitMQ] Invalidation listener cannot subscribe: {e}")
+                if connection is not None:
+                    await connection.close()
+                await asyncio.sleep(RABBITMQ_RECONNECT_DELAY)
+                continue
+            self._connection = connection
+            logger.info(f"Listening for cache invalidation events on '{ANNOUNCEMENT_EVENTS_EXCHANGE}'")
+            return
+
+invalidation_listener = InvalidationListener()
@@ -1,6 +1,12 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes import announcements_router, responses_router
+from http_client import start_client, close_client
+from rabbitmq_utils import publisher
+from cache import response_cache
+from cache_events import invalidation_listener
+from revocation_events import revocation_listener
 from prometheus_fastapi_instrumentator import Instrumentator
 from starlette.middleware.cors import CORSMiddleware
 import os
@@ -17,11 +23,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+# Жизненный цикл приложения: общий HTTP-клиент, издатель RabbitMQ, подписки на инвалидацию кэша и отзыв токенов создаются при старте и закрываются при остановке
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_client()
+    await publisher.start()
+    await invalidation_listener.start()
+    await revocation_listener.start()
+    logger.info("Announcement Service запущен и готов к работе.")
+    yield
+    await revocation_listener.stop()
+    await invalidation_listener.stop()
+    await publisher.stop()
+    await response_cache.close()
+    await close_client()
+    logger.info("Announcement Service завершает работу.")
+
+
 # Инициализация FastAPI приложения
 app = FastAPI(
     title="Announcement Service",
     description="Сервис для публикации и взаимодействия с объявлениями",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Подключение маршрутизаторов
@@ -39,13 +64,3 @@ app.add_middleware(
 
 # Инструментатор Prometheus
 Instrumentator().instrument(app).expose(app)
-
-# Логируем сообщение о старте сервиса
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Announcement Service запущен и готов к работе.")
-
-# Логируем событие остановки сервиса
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Announcement Service завершает работу.")
@@ -1,55 +1,160 @@
-import pika
+import asyncio
+import contextlib
 import json
 import logging
 import os
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractRobustConnection
+from prometheus_client import Counter, Gauge
 
 # Константы для подключения к RabbitMQ (можно переопределять через переменные окружения)
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
-QUEUE_NAME = os.getenv("RABBITMQ_QUEUE_NAME", "notifications")
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
+# Fanout-обменник событий об изменении объявлений (инвалидация кэшей всех экземпляров)
+ANNOUNCEMENT_EVENTS_EXCHANGE = os.getenv("ANNOUNCEMENT_EVENTS_EXCHANGE", "announcements.events")
+
+# Настройки публикации
+RABBITMQ_OUTBOX_SIZE = int(os.getenv("RABBITMQ_OUTBOX_SIZE", 10000))
+RABBITMQ_PUBLISH_BATCH_SIZE = int(os.getenv("RABBITMQ_PUBLISH_BATCH_SIZE", 100))
+RABBITMQ_RECONNECT_DELAY = float(os.getenv("RABBITMQ_RECONNECT_DELAY", 3))
+RABBITMQ_SHUTDOWN_TIMEOUT = float(os.getenv("RABBITMQ_SHUTDOWN_TIMEOUT", 5))
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+OUTBOX_SIZE = Gauge("rabbitmq_outbox_size", "Сообщения, ожидающие публикации в RabbitMQ")
+PUBLISHED = Counter("rabbitmq_published_total", "Сообщения, подтверждённые брокером")
+DROPPED = Counter("rabbitmq_dropped_total", "Сообщения, отброшенные из-за переполнения буфера")
+PUBLISH_ERRORS = Counter("rabbitmq_publish_errors_total", "Ошибки публикации пачки сообщений")
+
 
-def publish_message(message: dict):
+class RabbitPublisher:
     """
-    Публикует сообщение в очередь RabbitMQ.
-    :param message: Словарь с данными сообщения.
+    Долгоживущий издатель: одно соединение и канал с подтверждениями публикации.
+    Обработчики кладут сообщения в ограниченный буфер и не ждут брокера;
+    фоновая задача публикует их пачками и переподключается при обрыве.
     """
-    logger.info("Connecting to RabbitMQ...")
-
-    connection = None
-    try:
-        # Устанавливаем соединение с RabbitMQ
-        parameters = pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT)
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-
-        # Объявляем очередь, если она не существует
-        channel.queue_declare(queue=QUEUE_NAME, durable=True)
-        logger.info(f"Queue '{QUEUE_NAME}' declared successfully.")
-
-        # Публикуем сообщение
-        channel.basic_publish(
-            exchange='',
-            routing_key=QUEUE_NAME,
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2  # Сообщения помечаются как "устойчивые" (persistent)
+
+    def __init__(self, outbox_size: int = RABBITMQ_OUTBOX_SIZE, batch_size: int = RABBITMQ_PUBLISH_BATCH_SIZE):
+        self.outbox_size = outbox_size
+        self.batch_size = batch_size
+        self._outbox: Optional[asyncio.Queue] = None
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._exchanges: dict[str, AbstractExchange] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._outbox = asyncio.Queue(maxsize=self.outbox_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info("RabbitMQ publisher started.")
+
+    async def stop(self, timeout: float = RABBITMQ_SHUTDOWN_TIMEOUT):
+        """
+        Дожидается публикации буфера (не дольше timeout) и закрывает соединение.
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._outbox.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[RabbitMQ] {self._outbox.qsize()} messages were not published before shutdown")
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if self._connection is not None and not self._connection.is_closed:
+            await self._connection.close()
+            logger.info("RabbitMQ connection closed.")
+        self._connection = None
+        self._channel = None
+
+    def publish(self, message: dict, exchange: str) -> bool:
+        """
+        Ставит сообщение в буфер публикации, не блокируя обработчик.
+        Уведомления пользователям сюда не попадают: их публикует outbox в db_service.
+        :param exchange: Fanout-обменник, в который публикуется сообщение.
+        """
+        if self._outbox is None:
+            logger.error(f"[RabbitMQ] Publisher is not started, message dropped: {message}")
+            DROPPED.inc()
+            return False
+        try:
+            self._outbox.put_nowait((exchange, message))
+        except asyncio.QueueFull:
+            logger.error(f"[RabbitMQ] Outbox is full, message dropped: {message}")
+            DROPPED.inc()
+            return False
+        OUTBOX_SIZE.set(self._outbox.qsize())
+        return True
+
+    async def _connect(self):
+        """
+        Открывает новый канал. Соединение создаётся, только если прежнее закрыто: обрыв
+        connect_robust восстанавливает сам, а ошибка канала не должна оставлять лишних соединений.
+        """
+        if self._connection is None or self._connection.is_closed:
+            logger.info("Connecting to RabbitMQ...")
+            self._connection = await aio_pika.connect_robust(
+                host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
             )
-        )
-        logger.info(f"[RabbitMQ] Message sent to queue '{QUEUE_NAME}': {message}")
-
-    except pika.exceptions.AMQPConnectionError as conn_err:
-        logger.error(f"[RabbitMQ] Connection error: {conn_err}")
-    except Exception as e:
-        logger.error(f"[RabbitMQ] Unexpected error while publishing message: {e}")
-    finally:
-        # Закрываем соединение, если оно было установлено
-        if connection and not connection.is_closed:
-            try:
-                connection.close()
-                logger.info("RabbitMQ connection closed.")
-            except Exception as close_err:
-                logger.error(f"Error closing RabbitMQ connection: {close_err}")
+        self._channel = await self._connection.channel(publisher_confirms=True)
+        # Обменники объявляются заново на каждом канале
+        self._exchanges = {}
+
+    async def _exchange(self, name: str) -> AbstractExchange:
+        if name not in self._exchanges:
+            self._exchanges[name] = await self._channel.declare_exchange(
+                name, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+        return self._exchanges[name]
+
+    async def _publish_batch(self, batch: list[tuple[str, dict]]):
+        exchanges = {name: await self._exchange(name) for name in {name for name, _ in batch}}
+        # Публикации отправляются без ожидания друг друга, подтверждения собираются вместе
+        await asyncio.gather(*(
+            exchanges[name].publish(
+                aio_pika.Message(
+                    body=json.dumps(message).encode(),
+                    content_type="application/json",
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT  # Сообщения помечаются как "устойчивые"
+                ),
+                routing_key=""
+            )
+            for name, message in batch
+        ))
+
+    async def _run(self):
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < self.batch_size and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            OUTBOX_SIZE.set(self._outbox.qsize())
+
+            # Пачка повторяется целиком до подтверждения: доставка "хотя бы один раз"
+            while True:
+                try:
+                    if self._channel is None or self._channel.is_closed:
+                        await self._connect()
+                    await self._publish_batch(batch)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    PUBLISH_ERRORS.inc()
+                    logger.error(f"[RabbitMQ] Failed to publish {len(batch)} messages: {e}")
+                    await asyncio.sleep(RABBITMQ_RECONNECT_DELAY)
+
+            PUBLISHED.inc(len(batch))
+            logger.info(f"[RabbitMQ] {len(batch)} messages published")
+            for _ in batch:
+                self._outbox.task_done()
+
+
+publisher = RabbitPublisher()
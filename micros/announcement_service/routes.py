@@ -1,20 +1,25 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 from schemas import (
     AnnouncementCreate,
     AnnouncementResponse,
     AnnouncementOut,
-    NotificationMessage,
+    AnnouncementPage,
+    AnnouncementSearchPage,
     ActionResponse
 )
-from rabbitmq_utils import publish_message
 from utils import (
     get_current_user,
     add_announcement,
     get_announcements,
     get_announcement_by_id,
+    search_announcements,
     respond_to_announcement
 )
+from cache import response_cache, serialize, cached_response
+from cache_events import announcement_changed
 
 logger = logging.getLogger(__name__)
 
@@ -35,39 +40,101 @@ async def create_announcement(
     try:
         announcement_id = await add_announcement(user_id=user["user_id"], announcement=announcement)
         logger.info(f"Announcement created with ID: {announcement_id}")
+        # Новое объявление меняет все страницы списка
+        await announcement_changed("created", announcement_id)
         return {"status": "success", "detail": f"Announcement created with ID {announcement_id}"}
     except Exception as e:
         logger.error(f"Failed to create announcement: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create announcement")
 
 
-# Эндпоинт для получения всех объявлений
-@announcements_router.get("/", response_model=list[AnnouncementOut])
-async def list_announcements():
+# Эндпоинт для получения объявлений постранично
+@announcements_router.get("/", response_model=AnnouncementPage)
+async def list_announcements(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    type: Optional[bool] = None,
+    place: Optional[str] = None,
+    user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Получение всех объявлений.
+    Получение страницы объявлений с фильтрами. Следующая страница — по `cursor` из `next_cursor`.
+    Ответ кэшируется; при совпадении If-None-Match с ETag возвращается 304.
     """
-    logger.info("Fetching all announcements")
+    params = {
+        "limit": limit,
+        "cursor": cursor,
+        "type": type,
+        "place": place,
+        "user_id": user_id,
+        "time_from": time_from.isoformat() if time_from else None,
+        "time_to": time_to.isoformat() if time_to else None,
+    }
+    params = {k: v for k, v in params.items() if v is not None}
+    logger.info(f"Fetching announcements page: {params}")
+
+    async def load() -> bytes:
+        return serialize(AnnouncementPage, await get_announcements(params))
+
     try:
-        announcements = await get_announcements()
-        return announcements
+        cached = await response_cache.get_or_load(await response_cache.list_key(params), "list", load)
+        return cached_response(cached, if_none_match, "list")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch announcements: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch announcements")
 
 
+# Эндпоинт для полнотекстового поиска (объявлен до /{announcement_id})
+@announcements_router.get("/search", response_model=AnnouncementSearchPage)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Поиск объявлений по названию предмета и месту, от более релевантных.
+    Результаты кэшируются вместе со списками и сбрасываются при создании объявления.
+    """
+    params = {k: v for k, v in {"q": q, "type": type, "limit": limit, "cursor": cursor}.items() if v is not None}
+
+    async def load() -> bytes:
+        return serialize(AnnouncementSearchPage, await search_announcements(params))
+
+    try:
+        key = await response_cache.list_key({"search": params})
+        cached = await response_cache.get_or_load(key, "search", load)
+        return cached_response(cached, if_none_match, "search")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to search announcements: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search announcements")
+
+
 # Эндпоинт для получения одного объявления по ID
 @announcements_router.get("/{announcement_id}", response_model=AnnouncementOut)
-async def get_announcement(announcement_id: int):
+async def get_announcement(announcement_id: int, if_none_match: Optional[str] = Header(None)):
     """
-    Получение конкретного объявления по ID.
+    Получение конкретного объявления по ID (с кэшем и ETag).
     """
     logger.info(f"Fetching announcement with ID {announcement_id}")
-    try:
+
+    async def load() -> bytes:
         announcement = await get_announcement_by_id(announcement_id)
         if not announcement:
             raise HTTPException(status_code=404, detail="Announcement not found")
-        return announcement
+        return serialize(AnnouncementOut, announcement)
+
+    try:
+        cached = await response_cache.get_or_load(response_cache.item_key(announcement_id), "item", load)
+        return cached_response(cached, if_none_match, "item")
     except HTTPException:
         raise
     except Exception as e:
@@ -101,17 +168,10 @@ async def respond_to_ann(
         if not success:
             raise HTTPException(status_code=404, detail="Announcement not found")
 
-        # Публикация уведомления через RabbitMQ
-        notification = NotificationMessage(
-            user_id=response.announcement_id,  # ID автора объявления
-            responding_user_id=user["user_id"],
-            announcement_id=response.announcement_id,
-            content=f"User {user['user_id']} responded to your announcement: {response.message}"
-        )
-        publish_message(notification.dict())
-
+        # Уведомление автору записывается db_service в outbox вместе с откликом
+        # и публикуется в RabbitMQ отдельным ретранслятором
         logger.info(f"User {user['user_id']} successfully responded to announcement {response.announcement_id}")
-        return {"status": "success", "detail": "Response sent and notification published"}
+        return {"status": "success", "detail": "Response sent and notification queued"}
     except HTTPException:
         raise
     except Exception as e:
@@ -25,6 +25,23 @@ class AnnouncementOut(BaseModel):
         orm_mode = True
 
 
+# Страница объявлений с курсором на следующую страницу
+class AnnouncementPage(BaseModel):
+    items: list[AnnouncementOut]
+    next_cursor: Optional[str] = None
+
+
+# Найденное объявление с оценкой релевантности (больше — лучше)
+class AnnouncementSearchHit(AnnouncementOut):
+    score: float
+
+
+# Страница результатов поиска
+class AnnouncementSearchPage(BaseModel):
+    items: list[AnnouncementSearchHit]
+    next_cursor: Optional[str] = None
+
+
 # Ответ на объявление
 class AnnouncementResponse(BaseModel):
     announcement_id: int
@@ -36,14 +53,6 @@ class AnnouncementResponse(BaseModel):
         orm_mode = True
 
 
-# Модель для сообщения в Notification Service
-class NotificationMessage(BaseModel):
-    user_id: int
-    responding_user_id: int
-    announcement_id: int
-    content: str  # Сообщение для уведомления
-
-
 # Ответ с подтверждением действия
 class ActionResponse(BaseModel):
     status: str
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from prometheus_client import Counter, Gauge
+
+from singleflight import SingleFlight
+
+# Настройки кэша проверенных токенов (можно переопределять через переменные окружения)
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300))
+TOKEN_CACHE_NEGATIVE_TTL = float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", 5))
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = Counter("token_cache_hits_total", "Попадания в кэш проверенных токенов", ["result"])
+CACHE_MISSES = Counter("token_cache_misses_total", "Промахи кэша проверенных токенов")
+CACHE_EVICTIONS = Counter("token_cache_evictions_total", "Вытеснения из кэша проверенных токенов по размеру")
+CACHE_COALESCED = Counter(
+    "token_cache_coalesced_total", "Промахи, объединённые с уже выполняющейся проверкой того же токена"
+)
+CACHE_SIZE = Gauge("token_cache_size", "Количество записей в кэше проверенных токенов")
+
+# Маркер отрицательной записи (токен был отклонён с 401)
+_INVALID = object()
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """
+    Время истечения токена (exp) без проверки подписи — используется только для ограничения TTL.
+    """
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp is not None else None
+
+
+class TokenCache:
+    """
+    LRU-кэш результатов проверки токенов с TTL и отрицательными записями.
+    Ключ — SHA-256 от токена, сам токен в памяти не хранится.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, ttl: float = TOKEN_CACHE_TTL,
+                 negative_ttl: float = TOKEN_CACHE_NEGATIVE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            CACHE_SIZE.set(len(self._entries))
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value, ttl: float):
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc()
+        CACHE_SIZE.set(len(self._entries))
+
+    def _positive_ttl(self, token: str) -> float:
+        # Запись не должна пережить сам токен
+        expiry = _token_expiry(token)
+        if expiry is None:
+            return self.ttl
+        return min(self.ttl, expiry - time.time())
+
+    def clear(self):
+        self._entries.clear()
+        CACHE_SIZE.set(0)
+
+    async def _load(self, key: str, token: str, verify: Callable[[str], Awaitable[dict]]) -> dict:
+        try:
+            user = await verify(token)
+        except HTTPException as exc:
+            if exc.status_code == 401:
+                self._put(key, _INVALID, self.negative_ttl)
+            raise
+        self._put(key, user, self._positive_ttl(token))
+        return user
+
+    async def get_or_verify(self, token: str, verify: Callable[[str], Awaitable[dict]]) -> dict:
+        """
+        Возвращает результат проверки токена из кэша или вызывает verify.
+        Одновременные промахи по одному токену объединяются в один вызов verify.
+        """
+        key = self.key(token)
+        value = self._get(key)
+        if value is _INVALID:
+            CACHE_HITS.labels(result="negative").inc()
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if value is not None:
+            CACHE_HITS.labels(result="positive").inc()
+            return value
+
+        CACHE_MISSES.inc()
+        user, shared = await self._flight.do(key, lambda: self._load(key, token, verify))
+        if shared:
+            CACHE_COALESCED.inc()
+        return user
+
+
+token_cache = TokenCache()
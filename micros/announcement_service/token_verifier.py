@@ -0,0 +1,102 @@
+import logging
+import os
+
+import httpx
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from http_client import get_client, AUTH_SERVICE_TIMEOUT
+
+# Настройки проверки токенов (можно переопределять через переменные окружения)
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth_service:8001")
+VERIFY_TOKEN_URL = f"{AUTH_SERVICE_URL}/auth/verify-token"
+TOKEN_VERIFY_MODE = os.getenv("TOKEN_VERIFY_MODE", "local")  # local | remote
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_secret_key")
+
+# Алгоритм и обязательные claims совпадают с jwt_handler.decode_access_token в auth_service
+ALGORITHM = "HS256"
+
+logger = logging.getLogger(__name__)
+
+
+def _load_keys() -> dict:
+    """
+    Ключи проверки из той же конфигурации, что и в auth_service: JWT_KEYS в формате
+    "kid1:secret1,kid2:secret2" или единственный ключ JWT_SECRET_KEY.
+    Секреты HS256 передаются только через окружение, по сети они не раздаются.
+    """
+    raw = os.getenv("JWT_KEYS")
+    if not raw:
+        return {"default": SECRET_KEY}
+    keys = {}
+    for pair in raw.split(","):
+        kid, _, secret = pair.strip().partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    return keys or {"default": SECRET_KEY}
+
+
+# При ротации новый ключ добавляется сюда раньше, чем auth_service начинает им подписывать
+JWT_KEYS = _load_keys()
+ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", next(iter(JWT_KEYS)))
+
+
+def decode_token(token: str, key: str) -> dict:
+    """
+    Проверяет подпись и срок действия токена, возвращает данные пользователя.
+    """
+    try:
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    try:
+        # jti нужен для проверки отзыва, в том числе для закэшированных результатов
+        return {"user_id": int(user_id), "jti": payload.get("jti")}
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def verify_token_remote(token: str) -> dict:
+    """
+    Проверка токена через эндпоинт /auth/verify-token сервиса авторизации.
+    """
+    try:
+        response = await get_client().post(
+            VERIFY_TOKEN_URL,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=AUTH_SERVICE_TIMEOUT
+        )
+    except httpx.RequestError as exc:
+        logger.error(f"Authorization service unavailable: {exc}")
+        raise HTTPException(status_code=503, detail="Authorization service unavailable")
+    if response.status_code != 200:
+        logger.warning(f"Token verification failed: {response.status_code}")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return response.json()
+
+
+async def verify_token_local(token: str) -> dict:
+    """
+    Локальная проверка токена по ключам из конфигурации.
+    """
+    try:
+        # Токены без kid выпущены до ротации ключей и проверяются активным ключом
+        kid = jwt.get_unverified_header(token).get("kid") or ACTIVE_KID
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not isinstance(kid, str) or kid not in JWT_KEYS:
+        logger.warning(f"Unknown JWT key id: {kid!r}")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return decode_token(token, JWT_KEYS[kid])
+
+
+async def verify_token(token: str) -> dict:
+    """
+    Проверка токена в режиме TOKEN_VERIFY_MODE (local или remote).
+    """
+    if TOKEN_VERIFY_MODE == "remote":
+        return await verify_token_remote(token)
+    return await verify_token_local(token)
@@ -1,33 +1,30 @@
 import logging
 from fastapi import HTTPException, Security
 from datetime import datetime
-import httpx
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from http_client import get_client
+from token_verifier import verify_token
+from token_cache import token_cache
+from revocation import revocation_list
 
 DATABASE_SERVICE_URL = "http://db_service:8090"
-AUTH_SERVICE_URL = "http://auth_service:8001/auth/verify-token"
 
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
 
-# Проверка текущего пользователя через Auth Service
+# Проверка текущего пользователя (с кэшем результатов, локально по ключам Auth Service или через сам сервис)
 async def get_current_user(authorization: HTTPAuthorizationCredentials = Security(security)):
     """
     Проверка токена и получение информации о пользователе.
     """
     logger.info("Verifying user token")
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            AUTH_SERVICE_URL,
-            headers={"Authorization": f"Bearer {authorization.credentials}"}
-        )
-        if response.status_code != 200:
-            logger.error(f"Token verification failed: {response.status_code}")
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        logger.info("Token verified successfully")
-        return response.json()
+    user = await token_cache.get_or_verify(authorization.credentials, verify_token)
+    if revocation_list.is_revoked(user.get("jti")):
+        logger.warning(f"Revoked token used by user {user['user_id']}")
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    logger.info("Token verified successfully")
+    return user
 
 
 # Добавление объявления
@@ -36,38 +33,56 @@ async def add_announcement(user_id: int, announcement):
     Добавление нового объявления в базу данных.
     """
     logger.info(f"Adding new announcement for user {user_id}: {announcement.dict()}")
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{DATABASE_SERVICE_URL}/announcements/",
-            json={
-                "user_id": user_id,
-                "item": announcement.item,
-                "place": announcement.place,
-                "type": announcement.type,
-                "time": announcement.time.isoformat() if announcement.time else None,
-            },
-        )
-        if response.status_code != 200:
-            logger.error(f"Failed to add announcement: {response.status_code}")
-            raise HTTPException(status_code=500, detail="Failed to add announcement")
-        announcement_id = response.json().get("id")
-        logger.info(f"Announcement added successfully with ID: {announcement_id}")
-        return announcement_id
+    client = get_client()
+    response = await client.post(
+        f"{DATABASE_SERVICE_URL}/announcements/",
+        json={
+            "user_id": user_id,
+            "item": announcement.item,
+            "place": announcement.place,
+            "type": announcement.type,
+            "time": announcement.time.isoformat() if announcement.time else None,
+        },
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to add announcement: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Failed to add announcement")
+    announcement_id = response.json().get("id")
+    logger.info(f"Announcement added successfully with ID: {announcement_id}")
+    return announcement_id
+
+
+# Получение страницы объявлений
+async def get_announcements(params: dict):
+    """
+    Получение страницы объявлений с фильтрами и курсором.
+    """
+    logger.info("Fetching announcements from database")
+    client = get_client()
+    response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/", params=params)
+    if response.status_code == 400:
+        raise HTTPException(status_code=400, detail=response.json().get("detail", "Invalid request"))
+    elif response.status_code != 200:
+        logger.error(f"Failed to fetch announcements: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Failed to fetch announcements")
+    logger.info("Announcements fetched successfully")
+    return response.json()
 
 
-# Получение всех объявлений
-async def get_announcements():
+# Полнотекстовый поиск объявлений
+async def search_announcements(params: dict):
     """
-    Получение списка всех объявлений.
+    Поиск объявлений по названию предмета и месту через db_service.
     """
-    logger.info("Fetching all announcements from database")
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/")
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch announcements: {response.status_code}")
-            raise HTTPException(status_code=500, detail="Failed to fetch announcements")
-        logger.info("Announcements fetched successfully")
-        return response.json()
+    logger.info(f"Searching announcements: {params}")
+    client = get_client()
+    response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/search", params=params)
+    if response.status_code in (400, 422):
+        raise HTTPException(status_code=400, detail=response.json().get("detail", "Invalid search query"))
+    elif response.status_code != 200:
+        logger.error(f"Failed to search announcements: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Failed to search announcements")
+    return response.json()
 
 
 # Получение объявления по ID
@@ -76,16 +91,16 @@ async def get_announcement_by_id(announcement_id: int):
     Получение информации об объявлении по его ID.
     """
     logger.info(f"Fetching announcement with ID {announcement_id}")
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/{announcement_id}")
-        if response.status_code == 404:
-            logger.error(f"Announcement not found: {announcement_id}")
-            raise HTTPException(status_code=404, detail="Announcement not found")
-        elif response.status_code != 200:
-            logger.error(f"Failed to fetch announcement: {response.status_code}")
-            raise HTTPException(status_code=500, detail="Failed to fetch announcement")
-        logger.info(f"Announcement with ID {announcement_id} fetched successfully")
-        return response.json()
+    client = get_client()
+    response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/{announcement_id}")
+    if response.status_code == 404:
+        logger.error(f"Announcement not found: {announcement_id}")
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    elif response.status_code != 200:
+        logger.error(f"Failed to fetch announcement: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Failed to fetch announcement")
+    logger.info(f"Announcement with ID {announcement_id} fetched successfully")
+    return response.json()
 
 
 # Ответ на объявление
@@ -94,21 +109,21 @@ async def respond_to_announcement(announcement_id: int, responding_user_id: int,
     Сохранение ответа на объявление.
     """
     logger.info(f"Responding to announcement {announcement_id} by user {responding_user_id}")
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{DATABASE_SERVICE_URL}/responses/",
-            json={
-                "announcement_id": announcement_id,
-                "responding_user_id": responding_user_id,
-                "message": message,
-                "time": time.isoformat(),
-            }
-        )
-        if response.status_code == 404:
-            logger.error(f"Announcement not found: {announcement_id}")
-            raise HTTPException(status_code=404, detail="Announcement not found")
-        elif response.status_code != 200:
-            logger.error(f"Failed to respond to announcement: {response.status_code}")
-            raise HTTPException(status_code=500, detail="Failed to respond to announcement")
-        logger.info("Response to announcement saved successfully")
-        return response.json()
+    client = get_client()
+    response = await client.post(
+        f"{DATABASE_SERVICE_URL}/responses/",
+        json={
+            "announcement_id": announcement_id,
+            "responding_user_id": responding_user_id,
+            "message": message,
+            "time": time.isoformat(),
+        }
+    )
+    if response.status_code == 404:
+        logger.error(f"Announcement not found: {announcement_id}")
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    elif response.status_code != 200:
+        logger.error(f"Failed to respond to announcement: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Failed to respond to announcement")
+    logger.info("Response to announcement saved successfully")
+    return response.json()
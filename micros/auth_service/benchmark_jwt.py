@@ -0,0 +1,55 @@
+"""
+Сравнение реализаций JWT (jwt_backends.py) на токенах auth_service.
+
+Запуск из каталога auth_service:
+    python benchmark_jwt.py --iterations 20000
+Печатает время на операцию для выпуска и проверки токена каждой реализацией,
+а также для decode_access_token с кэшем проверенных токенов.
+"""
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta, UTC
+
+from jwt_backends import BACKENDS
+
+KEYS = {"default": os.getenv("JWT_SECRET_KEY", "your_secret_key")}
+
+
+def measure(fn, iterations: int) -> float:
+    """
+    Лучшее из трёх повторов, микросекунд на вызов.
+    """
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000, help="Operations per measurement")
+    args = parser.parse_args()
+
+    claims = {"sub": "42", "exp": datetime.now(UTC) + timedelta(minutes=30)}
+    print(f"{'backend':<16}{'encode, us':>12}{'decode, us':>12}")
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class(KEYS)
+        except RuntimeError as e:
+            print(f"{name:<16}skipped: {e}")
+            continue
+        token = backend.encode(claims, "default")
+        # Токены разных реализаций взаимозаменяемы: проверяем токен, выпущенный эталонной реализацией
+        reference = BACKENDS["hmac"](KEYS).encode(claims, "default")
+        assert backend.decode(reference, "default")["sub"] == "42"
+        encode = measure(lambda: backend.encode(claims, "default"), args.iterations)
+        decode = measure(lambda: backend.decode(token, "default"), args.iterations)
+        print(f"{name:<16}{encode:>12.2f}{decode:>12.2f}")
+
+    import jwt_handler
+
+    token = jwt_handler.create_access_token({"sub": "42"})
+    cached = measure(lambda: jwt_handler.decode_access_token(token), args.iterations)
+    print(f"{'cached ' + jwt_handler.JWT_BACKEND:<16}{'':>12}{cached:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
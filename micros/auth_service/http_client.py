@@ -0,0 +1,114 @@
+import logging
+import os
+from typing import Optional
+
+import httpx
+from prometheus_client import Gauge
+
+# Настройки пула соединений (можно переопределять через переменные окружения)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# Таймаут для запросов к db_service
+DB_SERVICE_TIMEOUT = httpx.Timeout(
+    float(os.getenv("DB_SERVICE_TIMEOUT", 5)),
+    connect=float(os.getenv("DB_SERVICE_CONNECT_TIMEOUT", 2)),
+)
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+# Метрики использования пула (отдаются через /metrics Instrumentator'а)
+POOL_CONNECTIONS = Gauge(
+    "http_client_pool_connections",
+    "Количество соединений в пуле HTTP-клиента по состоянию",
+    ["state"],
+)
+POOL_PENDING_REQUESTS = Gauge(
+    "http_client_pool_pending_requests",
+    "Количество запросов, ожидающих свободного соединения",
+)
+POOL_MAX_CONNECTIONS = Gauge(
+    "http_client_pool_max_connections",
+    "Максимальное количество соединений в пуле HTTP-клиента",
+)
+POOL_MAX_CONNECTIONS.set(HTTP_MAX_CONNECTIONS)
+
+
+def _pool():
+    """
+    Возвращает пул соединений httpcore текущего клиента (если он создан).
+    Пул и очередь запросов — внутренние атрибуты httpx/httpcore: они читаются напрямую, без запасных значений,
+    чтобы после обновления библиотек ошибку показал test_http_client.py, а не нулевые метрики.
+    """
+    if _client is None or _client.is_closed:
+        return None
+    return _client._transport._pool
+
+
+def _count_connections(state: str) -> int:
+    pool = _pool()
+    if pool is None:
+        return 0
+    connections = pool.connections
+    if state == "idle":
+        return sum(1 for conn in connections if conn.is_idle())
+    return sum(1 for conn in connections if not conn.is_idle() and not conn.is_closed())
+
+
+def _count_pending() -> int:
+    pool = _pool()
+    if pool is None:
+        return 0
+    return sum(1 for request in pool._requests if request.is_queued())
+
+
+POOL_CONNECTIONS.labels(state="active").set_function(lambda: _count_connections("active"))
+POOL_CONNECTIONS.labels(state="idle").set_function(lambda: _count_connections("idle"))
+POOL_PENDING_REQUESTS.set_function(_count_pending)
+
+
+def _create_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits, http2=HTTP2_ENABLED, timeout=DB_SERVICE_TIMEOUT)
+
+
+async def start_client():
+    """
+    Создаёт общий HTTP-клиент при старте сервиса.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+        logger.info(
+            f"HTTP client started (max_connections={HTTP_MAX_CONNECTIONS}, "
+            f"keepalive={HTTP_MAX_KEEPALIVE_CONNECTIONS}, http2={HTTP2_ENABLED})"
+        )
+
+
+async def close_client():
+    """
+    Закрывает общий HTTP-клиент при остановке сервиса.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("HTTP client closed.")
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий HTTP-клиент с пулом keep-alive соединений.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
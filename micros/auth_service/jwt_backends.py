@@ -0,0 +1,165 @@
+"""
+Реализации подписи и проверки JWT (HS256). Выбор — переменная окружения JWT_BACKEND:
+  hmac — собственная проверка на hmac/hashlib с заранее подготовленным состоянием ключей;
+  jose — python-jose (прежняя реализация);
+  pyjwt — PyJWT (устанавливается отдельно: pip install PyJWT).
+Все реализации выпускают совместимые токены, сравнение скорости: python benchmark_jwt.py.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+
+ALGORITHM = "HS256"
+
+
+class InvalidToken(Exception):
+    """Подпись, формат или срок действия токена не прошли проверку."""
+
+
+class JoseBackend:
+    name = "jose"
+
+    def __init__(self, keys: dict):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+        self._keys = keys
+
+    def encode(self, claims: dict, kid: str) -> str:
+        return self._jwt.encode(claims, self._keys[kid], algorithm=ALGORITHM, headers={"kid": kid})
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._error as e:
+            raise InvalidToken(str(e)) from e
+
+    def decode(self, token: str, kid: str) -> dict:
+        try:
+            return self._jwt.decode(token, self._keys[kid], algorithms=[ALGORITHM])
+        except self._error as e:
+            raise InvalidToken(str(e)) from e
+
+
+class PyJWTBackend:
+    name = "pyjwt"
+
+    def __init__(self, keys: dict):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("JWT_BACKEND=pyjwt requires PyJWT: pip install PyJWT") from e
+
+        self._jwt = jwt
+        self._keys = keys
+
+    def encode(self, claims: dict, kid: str) -> str:
+        return self._jwt.encode(claims, self._keys[kid], algorithm=ALGORITHM, headers={"kid": kid})
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+
+    def decode(self, token: str, kid: str) -> dict:
+        try:
+            return self._jwt.decode(token, self._keys[kid], algorithms=[ALGORITHM])
+        except self._jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class HmacBackend:
+    """
+    Только HS256: состояние HMAC для каждого ключа вычисляется один раз при старте,
+    на каждый токен остаётся copy() и хеширование подписываемой части.
+    """
+
+    name = "hmac"
+
+    def __init__(self, keys: dict):
+        self._macs = {kid: hmac.new(secret.encode(), digestmod=hashlib.sha256) for kid, secret in keys.items()}
+
+    def _sign(self, kid: str, signing_input: bytes) -> bytes:
+        mac = self._macs[kid].copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, claims: dict, kid: str) -> str:
+        header = {"alg": ALGORITHM, "typ": "JWT", "kid": kid}
+        signing_input = b".".join(
+            _b64encode(json.dumps(part, separators=(",", ":"), default=_json_default).encode())
+            for part in (header, claims)
+        )
+        return (signing_input + b"." + _b64encode(self._sign(kid, signing_input))).decode()
+
+    def _split(self, token: str) -> tuple[bytes, bytes, bytes]:
+        try:
+            header, claims, signature = token.encode("ascii").split(b".")
+        except (UnicodeEncodeError, ValueError) as e:
+            raise InvalidToken("Malformed token") from e
+        return header, claims, signature
+
+    @staticmethod
+    def _load(segment: bytes) -> dict:
+        try:
+            value = json.loads(_b64decode(segment))
+        except (binascii.Error, ValueError) as e:
+            raise InvalidToken("Malformed token") from e
+        if not isinstance(value, dict):
+            raise InvalidToken("Malformed token")
+        return value
+
+    def get_unverified_header(self, token: str) -> dict:
+        return self._load(self._split(token)[0])
+
+    def decode(self, token: str, kid: str) -> dict:
+        header, claims, signature = self._split(token)
+        if self._load(header).get("alg") != ALGORITHM:
+            raise InvalidToken("Unsupported algorithm")
+        try:
+            expected = _b64decode(signature)
+        except binascii.Error as e:
+            raise InvalidToken("Malformed token") from e
+        if not hmac.compare_digest(self._sign(kid, header + b"." + claims), expected):
+            raise InvalidToken("Signature verification failed")
+
+        payload = self._load(claims)
+        now = time.time()
+        for claim in ("exp", "nbf"):
+            if claim in payload and not isinstance(payload[claim], (int, float)):
+                raise InvalidToken(f"Invalid {claim} claim")
+        if "exp" in payload and payload["exp"] <= now:
+            raise InvalidToken("Signature has expired")
+        if "nbf" in payload and payload["nbf"] > now:
+            raise InvalidToken("The token is not yet valid")
+        return payload
+
+
+BACKENDS = {backend.name: backend for backend in (HmacBackend, JoseBackend, PyJWTBackend)}
+
+
+def create_backend(name: str, keys: dict):
+    try:
+        return BACKENDS[name](keys)
+    except KeyError:
+        raise ValueError(f"Unknown JWT_BACKEND {name!r}, expected one of: {', '.join(BACKENDS)}") from None
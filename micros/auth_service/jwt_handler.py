@@ -1,21 +1,99 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, UTC
 
 from fastapi import HTTPException
-from jose import JWTError, jwt
 
-SECRET_KEY = "your_secret_key"
-ALGORITHM = "HS256"
+from jwt_backends import ALGORITHM, InvalidToken, create_backend
+from revocation import revocation_list
+
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_secret_key")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refresh-токен позволяет получить новый access-токен без пароля и bcrypt
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+# Реализация JWT: hmac, jose или pyjwt (см. jwt_backends.py)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "hmac")
+# Сколько недавно проверенных токенов помнить (0 — проверять подпись каждый раз)
+JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", 4096))
+
+
+def _load_keys() -> dict:
+    """
+    Загружает набор ключей подписи из JWT_KEYS в формате "kid1:secret1,kid2:secret2".
+    Без настройки используется единственный ключ SECRET_KEY.
+    """
+    raw = os.getenv("JWT_KEYS")
+    if not raw:
+        return {"default": SECRET_KEY}
+    keys = {}
+    for pair in raw.split(","):
+        kid, _, secret = pair.strip().partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    return keys or {"default": SECRET_KEY}
+
+
+# Ключи для ротации: новые токены подписываются активным ключом,
+# старые продолжают проверяться, пока их kid остаётся в наборе
+JWT_KEYS = _load_keys()
+ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", next(iter(JWT_KEYS)))
+
+backend = create_backend(JWT_BACKEND, JWT_KEYS)
+
+# Токен -> полезная нагрузка для уже проверенных токенов (LRU); срок действия проверяется при каждом обращении
+_verified: OrderedDict[str, dict] = OrderedDict()
+# /verify-token выполняется в пуле потоков: чтение с move_to_end и вытеснение не должны перемежаться
+_verified_lock = threading.Lock()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti позволяет отозвать конкретный токен до истечения срока
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    return backend.encode(to_encode, ACTIVE_KID)
 
-def decode_access_token(token: str):
+def _decode(token: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError as e:
+        # Токены без kid выпущены до ротации ключей и проверяются активным ключом
+        kid = backend.get_unverified_header(token).get("kid") or ACTIVE_KID
+        if not isinstance(kid, str) or kid not in JWT_KEYS:
+            raise HTTPException(status_code=401, detail="Invalid token payload")
+        return backend.decode(token, kid)
+    except InvalidToken as e:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
+def decode_access_token(token: str):
+    with _verified_lock:
+        payload = _verified.get(token)
+        if payload is not None and payload.get("exp", float("inf")) > time.time():
+            _verified.move_to_end(token)
+        else:
+            _verified.pop(token, None)
+            payload = None
+    if payload is None:
+        # Проверка подписи — вне блокировки, чтобы потоки не ждали друг друга
+        payload = _decode(token)
+        if JWT_DECODE_CACHE_SIZE > 0:
+            with _verified_lock:
+                _verified[token] = payload
+                while len(_verified) > JWT_DECODE_CACHE_SIZE:
+                    _verified.popitem(last=False)
+    # Отзыв проверяется и для закэшированных токенов
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return dict(payload)
+
+def create_refresh_token() -> tuple[str, str]:
+    """
+    Новый refresh-токен и его SHA-256: в db_service сохраняется только хеш.
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -1,11 +1,28 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes import router
+from http_client import start_client, close_client
+from utils import password_hasher
+from revocation_sync import revocation_sync
 from prometheus_fastapi_instrumentator import Instrumentator
 
 logging.basicConfig(level=logging.INFO, filename='auth_service.log', filemode='a', format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-app = FastAPI(title="Auth Service")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Общий HTTP-клиент для запросов к db_service
+    await start_client()
+    await revocation_sync.start()
+    yield
+    await revocation_sync.stop()
+    await close_client()
+    password_hasher.shutdown()
+
+
+app = FastAPI(title="Auth Service", lifespan=lifespan)
 app.include_router(router)
 
 Instrumentator().instrument(app).expose(app)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from prometheus_client import Counter
+
+# Ограничение попыток входа: ёмкость корзины и пополнение в попытках в минуту
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", 5))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", 5))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 30))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 60))
+# Сколько корзин хранится; давно не использованные вытесняются (вытесненная корзина снова полна)
+LOGIN_LIMITER_MAX_KEYS = int(os.getenv("LOGIN_LIMITER_MAX_KEYS", 100000))
+
+RATE_LIMITED = Counter("login_rate_limited_total", "Попытки входа, отклонённые ограничителем", ["scope"])
+
+
+class TokenBucketLimiter:
+    """
+    Корзины токенов по ключу: попытка забирает токен, токены пополняются с постоянной скоростью
+    до ёмкости burst. Хранится не больше max_keys корзин (LRU).
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_keys: int = LOGIN_LIMITER_MAX_KEYS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # ключ -> (токены, время)
+
+    def _tokens(self, key: str) -> float:
+        tokens, updated_at = self._buckets.get(key, (self.burst, self._clock()))
+        return min(self.burst, tokens + (self._clock() - updated_at) * self.rate)
+
+    def retry_after(self, key: str) -> float:
+        """
+        Через сколько секунд появится токен (0 — попытка разрешена сейчас).
+        """
+        missing = 1 - self._tokens(key)
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+    def consume(self, key: str):
+        self._buckets[key] = (self._tokens(key) - 1, self._clock())
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class LoginRateLimiter:
+    """
+    Попытка входа разрешена, если есть токен и в корзине имени пользователя, и в корзине IP:
+    первая останавливает подбор пароля к одной учётной записи, вторая — перебор учётных записей с одного адреса.
+    """
+
+    def __init__(self):
+        self.scopes = {
+            "username": TokenBucketLimiter(LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE),
+            "ip": TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE),
+        }
+
+    def acquire(self, username: str, ip: str) -> float:
+        """
+        Забирает по токену из обеих корзин. Если попытка запрещена, ничего не забирает
+        и возвращает время до следующей разрешённой попытки в секундах; иначе 0.
+        """
+        keys = {"username": username.lower(), "ip": ip}
+        for scope, limiter in self.scopes.items():
+            wait = limiter.retry_after(keys[scope])
+            if wait > 0:
+                RATE_LIMITED.labels(scope=scope).inc()
+                return wait
+        for scope, limiter in self.scopes.items():
+            limiter.consume(keys[scope])
+        return 0.0
+
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,43 @@
+import time
+from typing import Iterable, Optional
+
+from prometheus_client import Gauge
+
+# Модуль одинаковый в auth_service, announcement_service и report_service (у каждого сервиса свой образ)
+
+REVOKED_TOKENS = Gauge("revoked_tokens", "Отозванные токены с неистёкшим сроком действия в локальном списке")
+
+
+class RevocationList:
+    """
+    Отозванные access-токены: jti -> exp. Проверка — один поиск в словаре, без сетевых запросов.
+    Запись нужна только до истечения токена: после exp токен отклоняется и без списка.
+    Отзыв не отменяется, поэтому снимок и события можно применять в любом порядке.
+    """
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def add(self, jti: str, exp: float):
+        if exp > time.time():
+            self._revoked[jti] = exp
+            REVOKED_TOKENS.set(len(self._revoked))
+
+    def merge(self, entries: Iterable[dict]):
+        """
+        Добавляет снимок [{"jti", "exp"}, ...] и удаляет записи об истёкших токенах.
+        """
+        now = time.time()
+        revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        revoked.update((entry["jti"], entry["exp"]) for entry in entries if entry["exp"] > now)
+        self._revoked = revoked
+        REVOKED_TOKENS.set(len(self._revoked))
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,57 @@
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+from http_client import get_client
+from revocation import revocation_list
+
+DATABASE_SERVICE_URL = "http://db_service:8090"
+# Отзывы, сделанные другими экземплярами auth_service, видны не позже чем через этот интервал (секунды)
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 10))
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_revoked_tokens() -> list[dict]:
+    """
+    Отозванные токены с неистёкшим сроком действия из db_service.
+    """
+    response = await get_client().get(f"{DATABASE_SERVICE_URL}/tokens/revoked")
+    response.raise_for_status()
+    return response.json()
+
+
+class RevocationSync:
+    """
+    Периодически дополняет локальный список отзывов из db_service.
+    """
+
+    def __init__(self, interval: float = REVOCATION_SYNC_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                revocation_list.merge(await fetch_revoked_tokens())
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Failed to sync revoked tokens: {e}")
+            await asyncio.sleep(self.interval)
+
+
+revocation_sync = RevocationSync()
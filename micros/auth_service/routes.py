@@ -1,14 +1,32 @@
 import logging
-from typing import Annotated
-from fastapi import APIRouter, HTTPException, Depends
+import math
+import os
+import secrets
+from typing import Annotated, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 import httpx
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import schemas, utils, jwt_handler
+from http_client import get_client
+from rate_limit import login_limiter
+from revocation import revocation_list
+from revocation_sync import fetch_revoked_tokens
+from user_cache import user_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 DATABASE_SERVICE_URL = "http://db_service:8090"
+# Токен для внутренних эндпоинтов; если не задан, внутренние эндпоинты недоступны
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+def require_internal_token(x_internal_token: Optional[str] = Header(default=None)):
+    """
+    Доступ к внутренним эндпоинтам только по заголовку X-Internal-Token.
+    """
+    if not INTERNAL_API_TOKEN or not secrets.compare_digest(x_internal_token or "", INTERNAL_API_TOKEN):
+        logger.warning("Internal request rejected: invalid or unconfigured internal token")
+        raise HTTPException(status_code=403, detail="Forbidden")
 
 @router.post("/register", response_model=schemas.UserOut)
 async def register(user: Annotated[schemas.UserCreate, Depends()]):
@@ -16,46 +34,105 @@ async def register(user: Annotated[schemas.UserCreate, Depends()]):
     Эндпоинт для регистрации нового пользователя.
     """
     logger.info(f"Registering user: {user.username}")
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{DATABASE_SERVICE_URL}/users/",
+    client = get_client()
+    response = await client.post(
+        f"{DATABASE_SERVICE_URL}/users/",
+        json={
+            "username": user.username,
+            "hashed_password": await utils.password_hasher.hash(user.password)
+        }
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to register user: {response.json()}")
+        raise HTTPException(status_code=response.status_code, detail=response.json())
+    # Имя могло попасть в кэш как несуществующее до регистрации
+    user_cache.invalidate([user.username])
+    logger.info(f"User registered successfully: {user.username}")
+    return response.json()
+
+async def rehash_password(user_id: int, username: str, new_hash: str):
+    """
+    Сохраняет пересчитанный хеш пароля (устаревшая стоимость bcrypt). Ошибка не прерывает вход.
+    """
+    try:
+        response = await get_client().patch(
+            f"{DATABASE_SERVICE_URL}/users/{user_id}/password",
+            json={"hashed_password": new_hash}
+        )
+        response.raise_for_status()
+        user_cache.invalidate([username])
+        logger.info(f"Password hash upgraded for user_id: {user_id}")
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to upgrade password hash for user_id {user_id}: {str(e)}")
+
+async def fetch_user(username: str) -> Optional[dict]:
+    """
+    Загружает пользователя из db_service; None, если пользователь не найден.
+    """
+    response = await get_client().get(f"{DATABASE_SERVICE_URL}/users/by-username/", params={"username": username})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()  # Проверяем на другие коды ошибок
+    db_user = response.json()
+    if "hashed_password" not in db_user:
+        logger.error(f"Missing 'hashed_password' in response for user: {username}")
+        raise HTTPException(status_code=500, detail="Unexpected database response")
+    return db_user
+
+async def issue_tokens(user_id: int) -> dict:
+    """
+    Access-токен и новый refresh-токен. Если refresh-токен не удалось сохранить,
+    вход не прерывается: клиент получит только access-токен.
+    """
+    tokens = {"access_token": jwt_handler.create_access_token({"sub": str(user_id)}), "token_type": "bearer"}
+    refresh_token, token_hash = jwt_handler.create_refresh_token()
+    try:
+        response = await get_client().post(
+            f"{DATABASE_SERVICE_URL}/tokens/refresh",
             json={
-                "username": user.username,
-                "hashed_password": utils.hash_password(user.password)
+                "token_hash": token_hash,
+                "user_id": user_id,
+                "expires_in": jwt_handler.REFRESH_TOKEN_EXPIRE_DAYS * 86400
             }
         )
-        if response.status_code != 200:
-            logger.error(f"Failed to register user: {response.json()}")
-            raise HTTPException(status_code=response.status_code, detail=response.json())
-        logger.info(f"User registered successfully: {user.username}")
-        return response.json()
+        response.raise_for_status()
+        tokens["refresh_token"] = refresh_token
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to store refresh token for user_id {user_id}: {str(e)}")
+    return tokens
 
 @router.post("/login", response_model=schemas.Token)
-async def login(user: Annotated[schemas.UserCreate, Depends()]):
+async def login(request: Request, user: Annotated[schemas.UserCreate, Depends()]):
     """
     Эндпоинт для входа пользователя в систему.
     """
     logger.info(f"User login attempt: {user.username}")
+    # Ограничение проверяется до обращения к db_service и bcrypt
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = login_limiter.acquire(user.username, client_ip)
+    if retry_after:
+        logger.warning(f"Login rate limited: {user.username} from {client_ip}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{DATABASE_SERVICE_URL}/users/by-username/?username={user.username}")
-            if response.status_code == 404:
-                logger.warning(f"User not found: {user.username}")
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-            response.raise_for_status()  # Проверяем на другие коды ошибок
-            db_user = response.json()
-
-            if "hashed_password" not in db_user:
-                logger.error(f"Missing 'hashed_password' in response for user: {user.username}")
-                raise HTTPException(status_code=500, detail="Unexpected database response")
-
-            if not utils.verify_password(user.password, db_user["hashed_password"]):
-                logger.warning(f"Invalid password for user: {user.username}")
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-
-            access_token = jwt_handler.create_access_token({"sub": str(db_user["id"])})
-            logger.info(f"User logged in successfully: {user.username}")
-            return {"access_token": access_token, "token_type": "bearer"}
+        db_user = await user_cache.get_or_fetch(user.username, fetch_user)
+        if db_user is None:
+            logger.warning(f"User not found: {user.username}")
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        is_valid, new_hash = await utils.password_hasher.verify_and_update(user.password, db_user["hashed_password"])
+        if not is_valid:
+            logger.warning(f"Invalid password for user: {user.username}")
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if new_hash:
+            await rehash_password(db_user["id"], user.username, new_hash)
+
+        tokens = await issue_tokens(db_user["id"])
+        logger.info(f"User logged in successfully: {user.username}")
+        return tokens
     except httpx.RequestError as e:
         logger.error(f"Error during request to database service: {str(e)}")
         raise HTTPException(status_code=500, detail="Database service unavailable")
@@ -64,6 +141,39 @@ async def login(user: Annotated[schemas.UserCreate, Depends()]):
         #raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh(data: schemas.RefreshRequest):
+    """
+    Новая пара токенов по refresh-токену, без пароля и bcrypt. Использованный refresh-токен отзывается.
+    """
+    new_refresh_token, new_hash = jwt_handler.create_refresh_token()
+    try:
+        response = await get_client().post(
+            f"{DATABASE_SERVICE_URL}/tokens/refresh/rotate",
+            json={
+                "token_hash": jwt_handler.hash_refresh_token(data.refresh_token),
+                "new_token_hash": new_hash,
+                "expires_in": jwt_handler.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+            }
+        )
+    except httpx.RequestError as e:
+        logger.error(f"Error during request to database service: {str(e)}")
+        raise HTTPException(status_code=500, detail="Database service unavailable")
+    if response.status_code == 401:
+        logger.warning("Refresh rejected: invalid, expired or already used refresh token")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if response.status_code != 200:
+        logger.error(f"Failed to rotate refresh token: {response.status_code}")
+        raise HTTPException(status_code=500, detail="Unexpected database response")
+    user_id = response.json()["user_id"]
+    logger.info(f"Tokens refreshed for user_id: {user_id}")
+    return {
+        "access_token": jwt_handler.create_access_token({"sub": str(user_id)}),
+        "token_type": "bearer",
+        "refresh_token": new_refresh_token
+    }
+
+
 security = HTTPBearer()
 
 @router.post("/verify-token")
@@ -78,4 +188,63 @@ def verify_token(token: HTTPAuthorizationCredentials = Depends(security)):
         logger.error("Invalid token payload")
         raise HTTPException(status_code=401, detail="Invalid token payload")
     logger.info(f"Token verified successfully for user_id: {user_id}")
-    return {"user_id": int(user_id)}
+    # jti нужен проверяющим сервисам, чтобы применять отзыв и к закэшированным результатам проверки
+    return {"user_id": int(user_id), "jti": payload.get("jti")}
+
+
+@router.post("/revoke")
+async def revoke(data: schemas.RevokeRequest, token: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Выход: отзывает предъявленный access-токен (и refresh-токен, если передан).
+    Остальные сервисы узнают об отзыве через RabbitMQ (обменник auth.revocations).
+    """
+    payload = jwt_handler.decode_access_token(token.credentials)
+    if not payload.get("jti"):
+        # Токены, выпущенные до появления jti, действуют до истечения срока
+        raise HTTPException(status_code=400, detail="Token cannot be revoked")
+    try:
+        response = await get_client().post(
+            f"{DATABASE_SERVICE_URL}/tokens/revoked",
+            json={"jti": payload["jti"], "exp": payload["exp"]}
+        )
+        response.raise_for_status()
+        if data.refresh_token:
+            response = await get_client().post(
+                f"{DATABASE_SERVICE_URL}/tokens/refresh/revoke",
+                json={"token_hash": jwt_handler.hash_refresh_token(data.refresh_token)}
+            )
+            response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to revoke token: {str(e)}")
+        raise HTTPException(status_code=500, detail="Database service unavailable")
+    revocation_list.add(payload["jti"], payload["exp"])
+    logger.info(f"Token revoked for user_id: {payload.get('sub')}")
+    return {"revoked": True}
+
+
+@router.post("/internal/user-cache/invalidate")
+def invalidate_user_cache(body: schemas.UserCacheInvalidate, _: None = Depends(require_internal_token)):
+    """
+    Внутренний эндпоинт: сброс кэша пользователей после изменений в обход auth_service.
+    Без списка имён кэш очищается полностью.
+    """
+    if body.usernames is None:
+        removed = user_cache.clear()
+    else:
+        removed = user_cache.invalidate(body.usernames)
+    logger.info(f"User cache invalidated: {removed} entries removed")
+    return {"removed": removed}
+
+
+@router.get("/revocations")
+async def get_revocations(_: None = Depends(require_internal_token)):
+    """
+    Снимок отозванных токенов для сервисов, проверяющих токены локально (при старте и периодически).
+    """
+    try:
+        revoked = await fetch_revoked_tokens()
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to fetch revoked tokens: {str(e)}")
+        raise HTTPException(status_code=500, detail="Database service unavailable")
+    revocation_list.merge(revoked)
+    return {"revoked": revoked}
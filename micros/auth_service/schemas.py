@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class UserCreate(BaseModel):
@@ -11,3 +12,14 @@ class UserOut(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class RevokeRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+class UserCacheInvalidate(BaseModel):
+    usernames: Optional[list[str]] = None
@@ -0,0 +1,109 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+
+from prometheus_client import Counter, Gauge
+
+from singleflight import SingleFlight
+
+# Настройки кэша пользователей для входа (можно переопределять через переменные окружения)
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))
+# Неизвестные имена кэшируются отдельно: перебор несуществующих логинов не доходит до db_service
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", 10))
+
+CACHE_REQUESTS = Counter("user_cache_requests_total", "Обращения к кэшу пользователей", ["result"])
+CACHE_INVALIDATIONS = Counter("user_cache_invalidations_total", "Инвалидации кэша пользователей", ["scope"])
+CACHE_SIZE = Gauge("user_cache_size", "Количество записей в кэше пользователей")
+
+# Маркер отрицательной записи (пользователь не найден)
+_NOT_FOUND = object()
+
+
+class UserCache:
+    """
+    LRU-кэш "имя пользователя -> {id, hashed_password}" с TTL и отрицательными записями.
+    Одновременные промахи по одному имени объединяются в один запрос к db_service.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL,
+                 negative_ttl: float = USER_CACHE_NEGATIVE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._flight = SingleFlight()
+        # Растёт при каждой инвалидации: результат загрузки, начатой до неё, не кэшируется
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, username: str):
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[username]
+            CACHE_SIZE.set(len(self._entries))
+            return None
+        self._entries.move_to_end(username)
+        return value
+
+    def _put(self, username: str, value, ttl: float):
+        if ttl <= 0:
+            return
+        self._entries[username] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        CACHE_SIZE.set(len(self._entries))
+
+    async def _load(self, username: str, fetch: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        generation = self._generation
+        user = await fetch(username)
+        if generation == self._generation:
+            if user is None:
+                self._put(username, _NOT_FOUND, self.negative_ttl)
+            else:
+                self._put(username, {"id": user["id"], "hashed_password": user["hashed_password"]}, self.ttl)
+        return user
+
+    async def get_or_fetch(self, username: str, fetch: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """
+        Возвращает {id, hashed_password} или None, если пользователя нет.
+        fetch возвращает None для несуществующего пользователя; его исключения не кэшируются.
+        """
+        value = self._get(username)
+        if value is _NOT_FOUND:
+            CACHE_REQUESTS.labels(result="negative").inc()
+            return None
+        if value is not None:
+            CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+
+        user, shared = await self._flight.do(username, lambda: self._load(username, fetch))
+        CACHE_REQUESTS.labels(result="coalesced" if shared else "miss").inc()
+        return None if user is None else {"id": user["id"], "hashed_password": user["hashed_password"]}
+
+    def invalidate(self, usernames: Iterable[str]) -> int:
+        self._generation += 1
+        removed = 0
+        for username in usernames:
+            removed += self._entries.pop(username, None) is not None
+        CACHE_INVALIDATIONS.labels(scope="usernames").inc()
+        CACHE_SIZE.set(len(self._entries))
+        return removed
+
+    def clear(self) -> int:
+        self._generation += 1
+        removed = len(self._entries)
+        self._entries.clear()
+        CACHE_INVALIDATIONS.labels(scope="all").inc()
+        CACHE_SIZE.set(0)
+        return removed
+
+
+user_cache = UserCache()
@@ -1,11 +1,39 @@
 
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
 import logging
 
 logging.basicConfig(level=logging.INFO, filename='auth_service.log', filemode='a', format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Настройки хеширования паролей (можно переопределять через переменные окружения)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Хеши с меньшей стоимостью считаются устаревшими и перехешируются при входе
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", BCRYPT_ROUNDS))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 64))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_MIN_ROUNDS,
+)
+
+HASH_QUEUE_DEPTH = Gauge("password_hash_queue_depth", "Операции хеширования, ожидающие свободного воркера")
+HASH_IN_FLIGHT = Gauge("password_hash_in_flight", "Операции хеширования в очереди и в работе")
+HASH_LATENCY = Histogram(
+    "password_hash_seconds", "Время операции хеширования с учётом ожидания в очереди", ["operation"]
+)
+HASH_REJECTED = Counter("password_hash_rejected_total", "Операции, отклонённые из-за переполнения очереди")
 
 def hash_password(password: str) -> str:
     hashed = pwd_context.hash(password)
@@ -16,14 +44,74 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     is_valid = pwd_context.verify(plain_password, hashed_password)
     logger.debug(f"Password valid: {is_valid}")
     return is_valid
-'''
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Проверяет пароль и, если хеш устарел (например, меньшая стоимость bcrypt), возвращает новый.
+    """
+    is_valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    logger.debug(f"Password valid: {is_valid}, rehashed: {new_hash is not None}")
+    return is_valid, new_hash
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-'''
\ No newline at end of file
+class PasswordHasher:
+    """
+    Выполняет bcrypt в пуле воркеров, чтобы не блокировать event loop.
+    Очередь ограничена: при переполнении запрос отклоняется с 503.
+    """
+
+    def __init__(self, executor_type: str = PASSWORD_HASH_EXECUTOR, workers: int = PASSWORD_HASH_WORKERS,
+                 queue_size: int = PASSWORD_HASH_QUEUE_SIZE):
+        self.executor_type = executor_type
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # bcrypt отпускает GIL, поэтому потоков обычно достаточно
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            logger.info(f"Password hash pool started: {self.executor_type} x{self.workers}")
+        return self._executor
+
+    def _update_gauges(self):
+        HASH_IN_FLIGHT.set(self._pending)
+        HASH_QUEUE_DEPTH.set(max(0, self._pending - self.workers))
+
+    async def _run(self, operation: str, fn, *args):
+        if self._pending >= self.capacity:
+            HASH_REJECTED.inc()
+            logger.warning(f"Password hash queue is full ({self._pending}), rejecting {operation}")
+            raise HTTPException(
+                status_code=503,
+                detail="Service is busy, try again later",
+                headers={"Retry-After": "1"}
+            )
+        self._pending += 1
+        self._update_gauges()
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+            self._update_gauges()
+            HASH_LATENCY.labels(operation=operation).observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await self._run("verify", verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
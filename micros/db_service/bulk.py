@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from prometheus_client import Counter, Histogram
+from sqlalchemy import insert, select
+
+import models
+import rollups
+from database import IS_SQLITE
+from matching import matching_engine, match_notifications
+from outbox import notification_message, outbox_relay, to_utc, utcnow
+from read_cache import announcement_key, read_cache
+from write_queue import write_queue
+
+# Строк в одной транзакции массовой вставки
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
+# Строк в одном запросе; строки сверх лимита возвращаются с ошибкой
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", 100000))
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+logger = logging.getLogger(__name__)
+
+BULK_ROWS = Counter("bulk_insert_rows_total", "Строки массовой вставки", ["table", "status"])
+BULK_CHUNK_SECONDS = Histogram("bulk_insert_chunk_seconds", "Длительность транзакции одной пачки", ["table"])
+
+Row = tuple[int, dict]  # номер строки в запросе и её данные
+
+
+def error(index: int, detail: str) -> dict:
+    return {"index": index, "status": "error", "detail": detail}
+
+
+def describe_validation_error(exc: ValidationError) -> str:
+    first = exc.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    yield buffer
+
+
+async def read_rows(request: Request) -> AsyncIterator[tuple[int, object]]:
+    """
+    Строки запроса: JSON-массив или NDJSON (по Content-Type), который читается потоком.
+    Строка, которую не удалось разобрать, передаётся как исключение ValueError.
+    """
+    media_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if media_type in NDJSON_MEDIA_TYPES:
+        index = 0
+        async for line in _ndjson_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as exc:
+                yield index, ValueError(f"Invalid JSON: {exc}")
+            index += 1
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+async def bulk_insert(request: Request, model: type, insert_chunk: Callable[[list[Row]], Awaitable[list[dict]]],
+                      table: str) -> dict:
+    """
+    Проверяет строки схемой model и вставляет корректные пачками по BULK_CHUNK_SIZE,
+    каждую пачку — своей транзакцией. Возвращает результат по каждой строке в порядке запроса.
+    """
+    results, chunk = [], []
+
+    async def flush():
+        with BULK_CHUNK_SECONDS.labels(table).time():
+            results.extend(await insert_chunk(chunk))
+        chunk.clear()
+
+    async for index, raw in read_rows(request):
+        if index >= BULK_MAX_ROWS:
+            results.append(error(index, f"At most {BULK_MAX_ROWS} rows per request"))
+            continue
+        if isinstance(raw, Exception):
+            results.append(error(index, str(raw)))
+            continue
+        if not isinstance(raw, dict):
+            results.append(error(index, "Row must be a JSON object"))
+            continue
+        try:
+            chunk.append((index, model(**raw).model_dump()))
+        except ValidationError as exc:
+            results.append(error(index, describe_validation_error(exc)))
+            continue
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+
+    results.sort(key=lambda result: result["index"])
+    created = sum(result["status"] == "created" for result in results)
+    BULK_ROWS.labels(table, "created").inc(created)
+    BULK_ROWS.labels(table, "error").inc(len(results) - created)
+    logger.info(f"Bulk insert into {table}: {created} created, {len(results) - created} failed")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+async def _existing_users(session, user_ids: set[int]) -> set[int]:
+    return set(await session.scalars(select(models.User.id).where(models.User.id.in_(user_ids))))
+
+
+async def _insert_returning_ids(session, model, rows: list[dict]) -> list[int]:
+    """
+    Вставка одним executemany (insertmanyvalues) с id в порядке строк.
+    """
+    if IS_SQLITE:
+        # SQLite не гарантирует порядок RETURNING, и с sort_by_parameter_order SQLAlchemy вставлял бы
+        # строки по одной. Пачка вставляется транзакцией очереди записи: писатель один,
+        # rowid выдаются по возрастанию в порядке VALUES.
+        return sorted(await session.scalars(insert(model).returning(model.id), rows))
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(await session.scalars(statement, rows))
+
+
+async def insert_announcements(chunk: list[Row], match: bool = True) -> list[dict]:
+    """
+    Вставляет пачку объявлений вместе со сводками и уведомлениями о найденных парах.
+    С match=False объявления только добавляются в индекс сопоставления: поиск пар для каждой строки
+    стоит до MATCH_MAX_SCAN сравнений и при импорте архива занимает больше времени, чем сама вставка.
+    """
+    results, rows, ids, notifications = [], [], [], []
+
+    async def write(session):
+        users = await _existing_users(session, {row["user_id"] for _, row in chunk})
+        for index, row in chunk:
+            if row["user_id"] not in users:
+                results.append(error(index, "User not found"))
+                continue
+            # В UTC, как у create_announcement
+            row["time"] = to_utc(row["time"]) if row["time"] else utcnow()
+            rows.append((index, row))
+        if not rows:
+            return
+
+        ids.extend(await _insert_returning_ids(session, models.Announcement, [row for _, row in rows]))
+        await rollups.record_announcements(session, [row for _, row in rows])
+        for announcement_id, (_, row) in zip(ids, rows):
+            announcement = models.Announcement(id=announcement_id, **row)
+            if match:
+                notifications.extend(match_notifications(announcement, matching_engine.add_and_match(announcement)))
+            else:
+                matching_engine.add(announcement)
+        session.add_all(notifications)
+
+    try:
+        # Пачка фиксируется единственным писателем, как и одиночные вставки
+        await write_queue.run(write)
+    except Exception as exc:
+        logger.error(f"Bulk insert of {len(rows)} announcements failed: {exc}")
+        # Пачка откатилась: объявления, уже добавленные в индекс сопоставления, убираем
+        for announcement_id in ids:
+            matching_engine.index.remove(announcement_id)
+        return results + [error(index, "Insert failed") for index, _ in rows]
+    read_cache.invalidate(*(announcement_key(announcement_id) for announcement_id in ids))
+    if notifications:
+        outbox_relay.notify()
+    return results + [
+        {"index": index, "status": "created", "id": announcement_id}
+        for announcement_id, (index, _) in zip(ids, rows)
+    ]
+
+
+async def insert_responses(chunk: list[Row]) -> list[dict]:
+    """
+    Вставляет пачку откликов вместе со сводками и уведомлениями авторам объявлений.
+    """
+    results, rows, ids = [], [], []
+
+    async def write(session):
+        announcement_ids = {row["announcement_id"] for _, row in chunk}
+        announcements = {
+            announcement.id: announcement
+            for announcement in await session.execute(
+                select(models.Announcement.id, models.Announcement.user_id, models.Announcement.time,
+                       models.Announcement.type)
+                .where(models.Announcement.id.in_(announcement_ids))
+            )
+        }
+        users = await _existing_users(session, {row["responding_user_id"] for _, row in chunk})
+        for index, row in chunk:
+            if row["announcement_id"] not in announcements:
+                results.append(error(index, "Announcement not found"))
+            elif row["responding_user_id"] not in users:
+                results.append(error(index, "Responding user not found"))
+            else:
+                row["time"] = row["time"] or datetime.now()
+                rows.append((index, row))
+        if not rows:
+            return
+
+        ids.extend(await _insert_returning_ids(session, models.Response, [row for _, row in rows]))
+        await rollups.record_responses(session, announcements, [row for _, row in rows])
+        session.add_all([
+            notification_message(announcements[row["announcement_id"]].user_id, {
+                "responding_user_id": row["responding_user_id"],
+                "announcement_id": row["announcement_id"],
+                "content": f"User {row['responding_user_id']} responded to your announcement: {row['message']}",
+                "created_at": row["time"].isoformat(),
+            })
+            for _, row in rows
+        ])
+
+    try:
+        await write_queue.run(write)
+    except Exception as exc:
+        logger.error(f"Bulk insert of {len(rows)} responses failed: {exc}")
+        return results + [error(index, "Insert failed") for index, _ in rows]
+    if not rows:
+        return results
+    outbox_relay.notify()
+    return results + [
+        {"index": index, "status": "created", "id": response_id}
+        for response_id, (index, _) in zip(ids, rows)
+    ]
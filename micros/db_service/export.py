@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import Select
+
+from database import AsyncSessionLocal
+
+# Количество строк, которое курсор читает из базы за один раз
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_rows(query: Select, fmt: str) -> AsyncIterator[str]:
+    """
+    Потоково выгружает результат запроса в NDJSON или CSV.
+    Строки читаются серверным курсором порциями по EXPORT_BATCH_SIZE, поэтому
+    расход памяти не зависит от размера таблицы.
+    """
+    # Сессия открывается внутри генератора: она должна жить, пока отдаётся ответ
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        async for partition in result.mappings().partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [value.isoformat() if isinstance(value, datetime) else value for value in row.values()]
+                    for row in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in partition)
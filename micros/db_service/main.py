@@ -1,15 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import users_router, announcements_router, responses_router
+from routes import users_router, announcements_router, responses_router, matching_router, stats_router, tokens_router
 from database import Base, engine
+from write_queue import write_queue
+from outbox import outbox_relay
+from search import create_search_index
+from matching import matching_engine
 from prometheus_fastapi_instrumentator import Instrumentator
 
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_search_index)
+    await matching_engine.rebuild()
+    await write_queue.start()
+    await outbox_relay.start()
+    yield
+    await outbox_relay.stop()
+    await write_queue.stop()
+    await engine.dispose()
 
-app = FastAPI(title="Database Service")
+
+app = FastAPI(title="Database Service", lifespan=lifespan)
 
 app.include_router(users_router)
 app.include_router(announcements_router)
 app.include_router(responses_router)
+app.include_router(matching_router)
+app.include_router(stats_router)
+app.include_router(tokens_router)
 
 Instrumentator().instrument(app).expose(app)
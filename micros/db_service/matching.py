@@ -0,0 +1,254 @@
+import heapq
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from prometheus_client import Counter, Gauge, Histogram
+
+import models
+import queries
+from database import AsyncSessionLocal
+from outbox import notification_message, to_utc, utcnow
+
+# Объявление считается открытым для сопоставления MATCH_WINDOW_DAYS дней
+MATCH_WINDOW = timedelta(days=float(os.getenv("MATCH_WINDOW_DAYS", 30)))
+MATCH_MIN_SCORE = float(os.getenv("MATCH_MIN_SCORE", 0.3))
+MATCH_MAX_RESULTS = int(os.getenv("MATCH_MAX_RESULTS", 5))
+# Сколько объявлений из списков по словам просматривается для одного сопоставления
+MATCH_MAX_SCAN = int(os.getenv("MATCH_MAX_SCAN", 5000))
+# Вклад совпадения предмета и места в итоговую оценку
+MATCH_ITEM_WEIGHT = float(os.getenv("MATCH_ITEM_WEIGHT", 0.7))
+
+logger = logging.getLogger(__name__)
+
+INDEX_SIZE = Gauge("match_index_size", "Открытые объявления в индексе сопоставления")
+CANDIDATES_SCANNED = Histogram(
+    "match_candidates_scanned", "Объявлений, оценённых при одном сопоставлении",
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+MATCHES_FOUND = Counter("matches_found_total", "Найденные пары потерянное/найденное")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+STOP_WORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "with", "my", "near",
+    "и", "в", "во", "на", "с", "со", "у", "около", "возле", "мой", "моя", "мое", "мои",
+}
+
+
+def normalize(text: str) -> frozenset[str]:
+    """
+    Нормализованные слова: нижний регистр, без служебных слов и однобуквенных токенов,
+    с грубым отсечением английского множественного числа (keys -> key).
+    """
+    tokens = set()
+    for token in _TOKEN.findall(text.lower()):
+        if len(token) < 2 or token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and token.isascii():
+            token = token[:-1]
+        tokens.add(token)
+    return frozenset(tokens)
+
+
+def jaccard(left: frozenset, right: frozenset) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+@dataclass(frozen=True)
+class Entry:
+    id: int
+    user_id: int
+    type: bool
+    item: str
+    place: str
+    time: datetime
+    item_tokens: frozenset
+    place_tokens: frozenset
+
+    @classmethod
+    def from_announcement(cls, announcement: models.Announcement) -> "Entry":
+        return cls(
+            id=announcement.id, user_id=announcement.user_id, type=announcement.type,
+            item=announcement.item, place=announcement.place, time=to_utc(announcement.time),
+            item_tokens=normalize(announcement.item), place_tokens=normalize(announcement.place),
+        )
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "user_id": self.user_id, "item": self.item, "place": self.place,
+                "time": self.time, "type": self.type}
+
+
+@dataclass(frozen=True)
+class Match:
+    entry: Entry
+    score: float
+
+
+class MatchIndex:
+    """
+    Инвертированный индекс открытых объявлений: (тип, слово предмета) -> id объявлений.
+    Кандидаты для нового объявления берутся только из списков его слов у противоположного типа,
+    поэтому сопоставление не зависит от общего числа объявлений.
+    """
+
+    def __init__(self, window: timedelta = MATCH_WINDOW):
+        self.window = window
+        self._entries: dict[int, Entry] = {}
+        self._postings: dict[tuple[bool, str], set[int]] = {}
+        self._by_time: list[tuple[datetime, int]] = []  # куча для вытеснения устаревших
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: Entry):
+        if entry.id in self._entries or not entry.item_tokens:
+            return
+        self._entries[entry.id] = entry
+        for token in entry.item_tokens:
+            self._postings.setdefault((entry.type, token), set()).add(entry.id)
+        heapq.heappush(self._by_time, (entry.time, entry.id))
+
+    def remove(self, announcement_id: int):
+        entry = self._entries.pop(announcement_id, None)
+        if entry is None:
+            return
+        for token in entry.item_tokens:
+            posting = self._postings.get((entry.type, token))
+            if posting is not None:
+                posting.discard(announcement_id)
+                if not posting:
+                    del self._postings[(entry.type, token)]
+
+    def expire(self, now: datetime):
+        """
+        Убирает объявления старше окна сопоставления.
+        """
+        cutoff = now - self.window
+        while self._by_time and self._by_time[0][0] < cutoff:
+            _, announcement_id = heapq.heappop(self._by_time)
+            self.remove(announcement_id)
+
+    def candidates(self, entry: Entry, limit: int = MATCH_MAX_RESULTS, min_score: float = MATCH_MIN_SCORE) -> list[Match]:
+        """
+        Лучшие пары для объявления среди открытых объявлений противоположного типа.
+        """
+        # Сначала редкие слова: они отбирают кандидатов точнее, а частые могут не уложиться в MATCH_MAX_SCAN
+        postings = sorted(
+            (self._postings.get((not entry.type, token), ()) for token in entry.item_tokens), key=len
+        )
+        seen: set[int] = set()
+        matches = []
+        for candidate_id in (candidate_id for posting in postings for candidate_id in posting):
+            if candidate_id in seen:
+                continue
+            if len(seen) >= MATCH_MAX_SCAN:
+                break
+            seen.add(candidate_id)
+            candidate = self._entries[candidate_id]
+            if candidate.user_id == entry.user_id or abs(candidate.time - entry.time) > self.window:
+                continue
+            score = (MATCH_ITEM_WEIGHT * jaccard(entry.item_tokens, candidate.item_tokens)
+                     + (1 - MATCH_ITEM_WEIGHT) * jaccard(entry.place_tokens, candidate.place_tokens))
+            if score >= min_score:
+                matches.append(Match(candidate, round(score, 4)))
+        CANDIDATES_SCANNED.observe(len(seen))
+        return sorted(matches, key=lambda match: (-match.score, -match.entry.id))[:limit]
+
+
+class MatchingEngine:
+    """
+    Держит индекс сопоставления и пересобирает его из базы, не теряя объявления,
+    добавленные во время пересборки.
+    """
+
+    def __init__(self):
+        self.index = MatchIndex()
+        self._rebuilding = False
+        self._added_during_rebuild: list[Entry] = []
+
+    def add_and_match(self, announcement: models.Announcement) -> list[Match]:
+        """
+        Добавляет только что сохранённое объявление в индекс и возвращает его пары.
+        """
+        entry = Entry.from_announcement(announcement)
+        self.index.expire(utcnow())
+        matches = self.index.candidates(entry)
+        self.index.add(entry)
+        if self._rebuilding:
+            self._added_during_rebuild.append(entry)
+        MATCHES_FOUND.inc(len(matches))
+        INDEX_SIZE.set(len(self.index))
+        return matches
+
+    def add(self, announcement: models.Announcement):
+        """
+        Добавляет объявление в индекс без поиска пар (массовый импорт).
+        """
+        entry = Entry.from_announcement(announcement)
+        self.index.add(entry)
+        if self._rebuilding:
+            self._added_during_rebuild.append(entry)
+        INDEX_SIZE.set(len(self.index))
+
+    def matches_for(self, announcement: models.Announcement) -> list[Match]:
+        return self.index.candidates(Entry.from_announcement(announcement))
+
+    async def rebuild(self) -> int:
+        """
+        Строит новый индекс по открытым объявлениям и заменяет им текущий.
+        """
+        if self._rebuilding:
+            return len(self.index)
+        self._rebuilding = True
+        self._added_during_rebuild = []
+        try:
+            index = MatchIndex()
+            since = utcnow() - index.window
+            async with AsyncSessionLocal() as session:
+                result = await session.stream_scalars(queries.open_announcements(since))
+                async for announcement in result:
+                    index.add(Entry.from_announcement(announcement))
+            for entry in self._added_during_rebuild:
+                index.add(entry)
+            self.index = index
+        finally:
+            self._rebuilding = False
+            self._added_during_rebuild = []
+        INDEX_SIZE.set(len(self.index))
+        logger.info(f"Match index rebuilt with {len(self.index)} open announcements")
+        return len(self.index)
+
+
+matching_engine = MatchingEngine()
+
+
+def match_notifications(announcement: models.Announcement, matches: list[Match]) -> list[models.OutboxMessage]:
+    """
+    Уведомления о найденных парах обоим авторам: новому объявлению и совпавшему.
+    """
+    def describe(entry_type: bool, item: str, place: str) -> str:
+        return f"{'found' if entry_type else 'lost'} '{item}' ({place})"
+
+    messages = []
+    for match in matches:
+        other = match.entry
+        common = {"kind": "match", "score": match.score}
+        messages.append(notification_message(announcement.user_id, {
+            **common,
+            "announcement_id": announcement.id,
+            "matched_announcement_id": other.id,
+            "content": f"Possible match for your announcement '{announcement.item}': "
+                       f"{describe(other.type, other.item, other.place)}",
+        }))
+        messages.append(notification_message(other.user_id, {
+            **common,
+            "announcement_id": other.id,
+            "matched_announcement_id": announcement.id,
+            "content": f"Possible match for your announcement '{other.item}': "
+                       f"{describe(announcement.type, announcement.item, announcement.place)}",
+        }))
+    return messages
@@ -0,0 +1,54 @@
+"""Исходная схема: пользователи, объявления, отклики
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Базы, созданные до миграций через Base.metadata.create_all, уже содержат эти таблицы
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+    if "announcements" not in existing:
+        op.create_table(
+            "announcements",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item", sa.String(), nullable=False),
+            sa.Column("place", sa.String(), nullable=False),
+            sa.Column("time", sa.DateTime(), nullable=False),
+            sa.Column("type", sa.Boolean(), nullable=False),
+        )
+        op.create_index("ix_announcements_id", "announcements", ["id"])
+    if "responses" not in existing:
+        op.create_table(
+            "responses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("announcement_id", sa.Integer(), sa.ForeignKey("announcements.id"), nullable=False),
+            sa.Column("responding_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("message", sa.String(), nullable=False),
+            sa.Column("time", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_responses_id", "responses", ["id"])
+
+
+def downgrade():
+    op.drop_table("responses")
+    op.drop_table("announcements")
+    op.drop_table("users")
@@ -0,0 +1,32 @@
+"""Индексы под фильтры и сортировку маршрутов db_service
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_announcements_time", "announcements", ["time"]),
+    ("ix_announcements_type_time", "announcements", ["type", "time"]),
+    ("ix_announcements_user_id_time", "announcements", ["user_id", "time"]),
+    ("ix_announcements_place_time", "announcements", ["place", "time"]),
+    ("ix_responses_time", "responses", ["time"]),
+    ("ix_responses_announcement_id_time", "responses", ["announcement_id", "time"]),
+    ("ix_responses_responding_user_id_time", "responses", ["responding_user_id", "time"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
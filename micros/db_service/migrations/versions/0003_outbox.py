@@ -0,0 +1,35 @@
+"""Таблица outbox для публикации уведомлений в RabbitMQ
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("routing_key", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("published_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    unpublished = sa.text("published_at IS NULL")
+    op.create_index(
+        "ix_outbox_unpublished", "outbox", ["id"],
+        sqlite_where=unpublished, postgresql_where=unpublished, if_not_exists=True,
+    )
+    op.create_index("ix_outbox_published_at", "outbox", ["published_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_table("outbox")
@@ -0,0 +1,54 @@
+"""Полнотекстовый поиск по объявлениям: FTS5 в SQLite, tsvector + GIN в Postgres
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS announcements_fts USING fts5(
+        item, place, content='announcements', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS announcements_fts_insert AFTER INSERT ON announcements BEGIN
+        INSERT INTO announcements_fts(rowid, item, place) VALUES (new.id, new.item, new.place);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS announcements_fts_delete AFTER DELETE ON announcements BEGIN
+        INSERT INTO announcements_fts(announcements_fts, rowid, item, place) VALUES ('delete', old.id, old.item, old.place);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS announcements_fts_update AFTER UPDATE OF item, place ON announcements BEGIN
+        INSERT INTO announcements_fts(announcements_fts, rowid, item, place) VALUES ('delete', old.id, old.item, old.place);
+        INSERT INTO announcements_fts(rowid, item, place) VALUES (new.id, new.item, new.place);
+    END""",
+    # Индексируем объявления, созданные до миграции
+    "INSERT INTO announcements_fts(announcements_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_UPGRADE = [
+    """ALTER TABLE announcements ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(item, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(place, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_announcements_search_vector ON announcements USING GIN (search_vector)",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for statement in SQLITE_UPGRADE if dialect == "sqlite" else POSTGRES_UPGRADE:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for trigger in ("announcements_fts_insert", "announcements_fts_delete", "announcements_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS announcements_fts")
+    else:
+        op.execute("DROP INDEX IF EXISTS ix_announcements_search_vector")
+        op.execute("ALTER TABLE announcements DROP COLUMN IF EXISTS search_vector")
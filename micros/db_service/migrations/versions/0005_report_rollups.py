@@ -0,0 +1,72 @@
+"""Сводные таблицы для отчётов: stats_daily и announcement_stats
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Заполнение по объявлениям и откликам, созданным до миграции (то же, что rollups.py rebuild)
+BACKFILL_ANNOUNCEMENT_STATS = """
+    INSERT INTO announcement_stats (announcement_id, announcement_time, responses, first_response_seconds)
+    SELECT a.id, a.time, r.responses, {seconds}
+    FROM announcements a
+    JOIN (
+        SELECT announcement_id, count(*) AS responses, min(time) AS first_time
+        FROM responses GROUP BY announcement_id
+    ) r ON r.announcement_id = a.id
+"""
+BACKFILL_STATS_DAILY = """
+    INSERT INTO stats_daily (day, type, announcements, answered, responses)
+    SELECT {day}, a.type, count(*), count(s.announcement_id), coalesce(sum(s.responses), 0)
+    FROM announcements a
+    LEFT JOIN announcement_stats s ON s.announcement_id = a.id
+    GROUP BY {day}, a.type
+"""
+
+
+def upgrade():
+    op.create_table(
+        "stats_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("type", sa.Boolean(), primary_key=True),
+        sa.Column("announcements", sa.Integer(), nullable=False),
+        sa.Column("answered", sa.Integer(), nullable=False),
+        sa.Column("responses", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "announcement_stats",
+        sa.Column("announcement_id", sa.Integer(), sa.ForeignKey("announcements.id"), primary_key=True),
+        sa.Column("announcement_time", sa.DateTime(), nullable=False),
+        sa.Column("responses", sa.Integer(), nullable=False),
+        sa.Column("first_response_seconds", sa.Float(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_announcement_stats_responses", "announcement_stats", ["responses"], if_not_exists=True)
+    op.create_index("ix_announcement_stats_time", "announcement_stats", ["announcement_time"], if_not_exists=True)
+    op.create_index(
+        "ix_announcement_stats_first_response", "announcement_stats", ["first_response_seconds"], if_not_exists=True
+    )
+
+    if op.get_bind().dialect.name == "sqlite":
+        seconds = "round((julianday(r.first_time) - julianday(a.time)) * 86400, 3)"
+        day = "date(a.time)"
+    else:
+        seconds = "extract(epoch FROM r.first_time - a.time)"
+        day = "CAST(date_trunc('day', a.time) AS DATE)"
+    op.execute("DELETE FROM announcement_stats")
+    op.execute("DELETE FROM stats_daily")
+    op.execute(BACKFILL_ANNOUNCEMENT_STATS.format(seconds=seconds))
+    op.execute(BACKFILL_STATS_DAILY.format(day=day))
+
+
+def downgrade():
+    op.drop_table("announcement_stats")
+    op.drop_table("stats_daily")
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer, String
+    Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text
 )
 from sqlalchemy.orm import relationship
 from database import Base
@@ -34,6 +34,14 @@ class Announcement(Base):
     user = relationship("User", back_populates="announcements")
     responses = relationship("Response", back_populates="announcement")
 
+    # Индексы под фильтры и сортировку по времени в маршрутах (см. queries.py)
+    __table_args__ = (
+        Index("ix_announcements_time", "time"),
+        Index("ix_announcements_type_time", "type", "time"),
+        Index("ix_announcements_user_id_time", "user_id", "time"),
+        Index("ix_announcements_place_time", "place", "time"),
+    )
+
 
 # Модель ответа на объявление
 class Response(Base):
@@ -48,3 +56,82 @@ class Response(Base):
     # Связь с объявлением и пользователем
     announcement = relationship("Announcement", back_populates="responses")
     responding_user = relationship("User", back_populates="responses")
+
+    __table_args__ = (
+        Index("ix_responses_time", "time"),
+        Index("ix_responses_announcement_id_time", "announcement_id", "time"),
+        Index("ix_responses_responding_user_id_time", "responding_user_id", "time"),
+    )
+
+
+# Исходящее сообщение для RabbitMQ, записывается в одной транзакции с изменением данных
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    routing_key = Column(String, nullable=False)  # Имя очереди RabbitMQ
+    # Fanout-обменник (например, auth.revocations); пустая строка — публикация в очередь routing_key
+    exchange = Column(String, nullable=False, default="", server_default="")
+    payload = Column(Text, nullable=False)  # Тело сообщения в JSON
+    # Время хранится в UTC без часового пояса, чтобы считать задержку публикации одинаково в SQLite и Postgres
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    published_at = Column(DateTime, nullable=True)  # NULL — ещё не опубликовано
+
+    __table_args__ = (
+        # Частичный индекс: ретранслятор читает только неопубликованные сообщения
+        Index(
+            "ix_outbox_unpublished", "id",
+            sqlite_where=published_at.is_(None),
+            postgresql_where=published_at.is_(None),
+        ),
+        Index("ix_outbox_published_at", "published_at"),
+    )
+
+
+# Refresh-токен: хранится только SHA-256, при обновлении токен отзывается и заменяется новым
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Время в UTC без часового пояса, как в outbox
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)  # NULL — токен действителен
+
+
+# Отозванный access-токен (по jti); запись нужна только до истечения самого токена
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# Сводка по дням: объявления каждого типа, сколько из них получили отклик и сколько всего откликов.
+# Обновляется при каждой вставке (см. rollups.py), отчёты читают её вместо исходных таблиц
+class StatsDaily(Base):
+    __tablename__ = "stats_daily"
+
+    day = Column(Date, primary_key=True)  # День публикации объявления
+    type = Column(Boolean, primary_key=True)
+    announcements = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)  # Объявления с хотя бы одним откликом
+    responses = Column(Integer, nullable=False, default=0)
+
+
+# Счётчики откликов по объявлению; строка появляется с первым откликом
+class AnnouncementStats(Base):
+    __tablename__ = "announcement_stats"
+
+    announcement_id = Column(Integer, ForeignKey("announcements.id"), primary_key=True)
+    announcement_time = Column(DateTime, nullable=False)  # Копия времени объявления для фильтров по периоду
+    responses = Column(Integer, nullable=False, default=0)
+    first_response_seconds = Column(Float, nullable=False)  # От публикации до первого отклика
+
+    __table_args__ = (
+        Index("ix_announcement_stats_responses", "responses"),
+        Index("ix_announcement_stats_time", "announcement_time"),
+        Index("ix_announcement_stats_first_response", "first_response_seconds"),
+    )
@@ -0,0 +1,239 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractRobustConnection
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete, update
+
+import models
+import queries
+from database import AsyncSessionLocal
+
+# Подключение к RabbitMQ
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
+NOTIFICATIONS_QUEUE = os.getenv("RABBITMQ_QUEUE_NAME", "notifications")
+# Fanout-обменник отзывов access-токенов (подписаны announcement_service и report_service)
+REVOCATIONS_EXCHANGE = os.getenv("AUTH_REVOCATIONS_EXCHANGE", "auth.revocations")
+
+# Очереди объявляются без аргументов: DLX уведомлений задаётся политикой RabbitMQ (notification_service/topology.py)
+
+# Настройки ретранслятора
+OUTBOX_RELAY_ENABLED = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 1))
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY", 3))
+OUTBOX_RETENTION = timedelta(hours=float(os.getenv("OUTBOX_RETENTION_HOURS", 24)))
+OUTBOX_CLEANUP_INTERVAL = float(os.getenv("OUTBOX_CLEANUP_INTERVAL", 300))
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BACKLOG = Gauge("outbox_backlog", "Неопубликованные сообщения в outbox")
+OUTBOX_OLDEST_AGE = Gauge("outbox_oldest_unpublished_seconds", "Возраст самого старого неопубликованного сообщения")
+OUTBOX_PUBLISHED = Counter("outbox_published_total", "Сообщения outbox, подтверждённые брокером")
+OUTBOX_ERRORS = Counter("outbox_publish_errors_total", "Ошибки публикации пачки сообщений outbox")
+OUTBOX_LAG = Histogram(
+    "outbox_publish_lag_seconds",
+    "Время от записи сообщения в outbox до подтверждения брокером",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(value: datetime) -> datetime:
+    """
+    Время в UTC без часового пояса, как хранится в базе. Время без пояса уже считается UTC.
+    """
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def notification_message(user_id: int, payload: dict) -> models.OutboxMessage:
+    """
+    Уведомление пользователю; сохраняется вместе с изменением, которое его вызвало.
+    """
+    return models.OutboxMessage(
+        routing_key=NOTIFICATIONS_QUEUE,
+        payload=json.dumps({"user_id": user_id, **payload}, default=str),
+    )
+
+
+def revocation_message(jti: str, exp: int) -> models.OutboxMessage:
+    """
+    Событие об отзыве access-токена для всех экземпляров сервисов, проверяющих токены.
+    """
+    return models.OutboxMessage(
+        exchange=REVOCATIONS_EXCHANGE,
+        routing_key="",
+        payload=json.dumps({"event": "revoked", "jti": jti, "exp": exp}),
+    )
+
+
+class OutboxRelay:
+    """
+    Переносит сообщения из таблицы outbox в RabbitMQ пачками с подтверждениями публикации.
+    Сообщение отмечается опубликованным только после подтверждения брокером,
+    поэтому при сбое оно будет отправлено повторно (доставка "хотя бы один раз").
+    """
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._declared: set[str] = set()
+        self._exchanges: dict[str, AbstractExchange] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._last_cleanup = 0.0
+
+    async def start(self):
+        if not OUTBOX_RELAY_ENABLED or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Outbox relay started")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if self._connection is not None and not self._connection.is_closed:
+            await self._connection.close()
+        self._connection = None
+        self._channel = None
+        logger.info("Outbox relay stopped")
+
+    def notify(self):
+        """
+        Будит ретранслятор после записи нового сообщения, не дожидаясь следующего опроса.
+        """
+        self._wakeup.set()
+
+    async def _connect(self):
+        """
+        Открывает новый канал. Соединение создаётся, только если прежнее закрыто: обрыв
+        connect_robust восстанавливает сам, а ошибка канала не должна оставлять лишних соединений.
+        """
+        if self._connection is None or self._connection.is_closed:
+            self._connection = await aio_pika.connect_robust(
+                host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
+            )
+            logger.info("Outbox relay connected to RabbitMQ")
+        self._channel = await self._connection.channel(publisher_confirms=True)
+        # Объявления и обменники привязаны к каналу
+        self._declared.clear()
+        self._exchanges = {"": self._channel.default_exchange}
+
+    async def _declare(self, routing_key: str):
+        if routing_key not in self._declared:
+            await self._channel.declare_queue(routing_key, durable=True)
+            self._declared.add(routing_key)
+
+    async def _exchange(self, name: str) -> AbstractExchange:
+        if name not in self._exchanges:
+            self._exchanges[name] = await self._channel.declare_exchange(
+                name, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+        return self._exchanges[name]
+
+    async def _publish(self, messages: list[models.OutboxMessage]):
+        if self._channel is None or self._channel.is_closed:
+            await self._connect()
+        for routing_key in {message.routing_key for message in messages if not message.exchange}:
+            await self._declare(routing_key)
+        exchanges = {name: await self._exchange(name) for name in {message.exchange for message in messages}}
+        published_at = time.time()
+        await asyncio.gather(*(
+            exchanges[message.exchange].publish(
+                aio_pika.Message(
+                    body=message.payload.encode(),
+                    content_type="application/json",
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    message_id=f"outbox-{message.id}",  # Позволяет получателю отбросить повтор
+                    timestamp=published_at,
+                    # Точное время публикации для метрики сквозной задержки в notification_service
+                    headers={"x-published-at": published_at},
+                ),
+                routing_key=message.routing_key,
+            )
+            for message in messages
+        ))
+
+    async def relay_batch(self) -> int:
+        """
+        Публикует одну пачку неопубликованных сообщений и возвращает их количество.
+        """
+        async with AsyncSessionLocal() as session:
+            messages = list(await session.scalars(queries.unpublished_outbox(self.batch_size)))
+            if not messages:
+                return 0
+            await self._publish(messages)
+            published_at = utcnow()
+            await session.execute(
+                update(models.OutboxMessage)
+                .where(models.OutboxMessage.id.in_([message.id for message in messages]))
+                .values(published_at=published_at)
+            )
+            await session.commit()
+        OUTBOX_PUBLISHED.inc(len(messages))
+        for message in messages:
+            OUTBOX_LAG.observe((published_at - message.created_at).total_seconds())
+        return len(messages)
+
+    async def update_metrics(self):
+        async with AsyncSessionLocal() as session:
+            backlog, oldest = (await session.execute(queries.outbox_backlog())).one()
+        OUTBOX_BACKLOG.set(backlog)
+        OUTBOX_OLDEST_AGE.set((utcnow() - oldest).total_seconds() if oldest else 0)
+
+    async def cleanup(self):
+        """
+        Удаляет опубликованные сообщения старше OUTBOX_RETENTION.
+        """
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(models.OutboxMessage).where(models.OutboxMessage.published_at < utcnow() - OUTBOX_RETENTION)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.info(f"Removed {result.rowcount} published outbox messages")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            try:
+                # Полная пачка — значит, в таблице могут оставаться сообщения: продолжаем без ожидания
+                while await self.relay_batch() == self.batch_size:
+                    pass
+                await self.update_metrics()
+                if loop.time() - self._last_cleanup >= OUTBOX_CLEANUP_INTERVAL:
+                    await self.cleanup()
+                    self._last_cleanup = loop.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                OUTBOX_ERRORS.inc()
+                logger.error(f"Outbox relay failed: {e}")
+                await asyncio.sleep(OUTBOX_RETRY_DELAY)
+                continue
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+
+
+outbox_relay = OutboxRelay()
@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(time: datetime, id: int) -> str:
+    """
+    Непрозрачный курсор для keyset-пагинации по (time, id).
+    """
+    raw = json.dumps([time.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        time, id = json.loads(raw)
+        return datetime.fromisoformat(time), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
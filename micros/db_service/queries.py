@@ -0,0 +1,141 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+
+import models
+
+# Запросы, выполняемые маршрутами db_service. Вынесены отдельно, чтобы их планы
+# выполнения можно было проверять в тестах (tests/test_db_query_plans.py).
+
+
+def user_by_id(user_id: int) -> Select:
+    return select(models.User).where(models.User.id == user_id)
+
+
+def user_by_username(username: str) -> Select:
+    return select(models.User).where(models.User.username == username)
+
+
+def announcement_by_id(announcement_id: int) -> Select:
+    return select(models.Announcement).where(models.Announcement.id == announcement_id)
+
+
+def users_by_ids(ids: list[int]) -> Select:
+    return select(models.User).where(models.User.id.in_(ids))
+
+
+def announcements_by_ids(ids: list[int], include: frozenset[str] = frozenset()) -> Select:
+    """
+    Объявления по списку id с подгрузкой связей из include:
+    автор — JOIN в том же запросе, отклики — один дополнительный запрос IN (...) на все объявления.
+    """
+    query = select(models.Announcement).where(models.Announcement.id.in_(ids))
+    if "user" in include:
+        query = query.options(joinedload(models.Announcement.user))
+    if "responses" in include:
+        query = query.options(selectinload(models.Announcement.responses))
+    return query
+
+
+def filter_announcements(query: Select, type: Optional[bool] = None, place: Optional[str] = None,
+                         user_id: Optional[int] = None, time_from: Optional[datetime] = None,
+                         time_to: Optional[datetime] = None) -> Select:
+    """
+    Добавляет к запросу фильтры по объявлениям.
+    """
+    if type is not None:
+        query = query.where(models.Announcement.type == type)
+    if place is not None:
+        query = query.where(models.Announcement.place == place)
+    if user_id is not None:
+        query = query.where(models.Announcement.user_id == user_id)
+    if time_from is not None:
+        query = query.where(models.Announcement.time >= time_from)
+    if time_to is not None:
+        query = query.where(models.Announcement.time < time_to)
+    return query
+
+
+def list_announcements(limit: int, cursor: Optional[tuple[datetime, int]] = None, **filters) -> Select:
+    """
+    Страница объявлений от новых к старым; на одну запись больше limit, чтобы узнать о следующей странице.
+    """
+    query = filter_announcements(select(models.Announcement), **filters)
+    if cursor is not None:
+        query = query.where(tuple_(models.Announcement.time, models.Announcement.id) < tuple_(*cursor))
+    return query.order_by(models.Announcement.time.desc(), models.Announcement.id.desc()).limit(limit + 1)
+
+
+def export_announcements(**filters) -> Select:
+    return filter_announcements(select(*models.Announcement.__table__.columns), **filters).order_by(
+        models.Announcement.time, models.Announcement.id
+    )
+
+
+def announcements_by_user(user_id: int) -> Select:
+    return select(models.Announcement).where(models.Announcement.user_id == user_id).order_by(
+        models.Announcement.time
+    )
+
+
+def announcements_by_type(item_type: bool) -> Select:
+    return select(models.Announcement).where(models.Announcement.type == item_type).order_by(
+        models.Announcement.time
+    )
+
+
+def open_announcements(since: datetime) -> Select:
+    """
+    Объявления в окне сопоставления потерянных и найденных вещей (см. matching.py).
+    """
+    return select(models.Announcement).where(models.Announcement.time >= since).order_by(
+        models.Announcement.time
+    )
+
+
+def export_responses(announcement_id: Optional[int] = None, responding_user_id: Optional[int] = None,
+                     time_from: Optional[datetime] = None, time_to: Optional[datetime] = None) -> Select:
+    query = select(*models.Response.__table__.columns)
+    if announcement_id is not None:
+        query = query.where(models.Response.announcement_id == announcement_id)
+    if responding_user_id is not None:
+        query = query.where(models.Response.responding_user_id == responding_user_id)
+    if time_from is not None:
+        query = query.where(models.Response.time >= time_from)
+    if time_to is not None:
+        query = query.where(models.Response.time < time_to)
+    return query.order_by(models.Response.time, models.Response.id)
+
+
+def responses_by_announcement(announcement_id: int) -> Select:
+    return select(models.Response).where(models.Response.announcement_id == announcement_id).order_by(
+        models.Response.time
+    )
+
+
+def responses_by_user(user_id: int) -> Select:
+    return select(models.Response).where(models.Response.responding_user_id == user_id).order_by(
+        models.Response.time
+    )
+
+
+def unpublished_outbox(limit: int) -> Select:
+    return select(models.OutboxMessage).where(models.OutboxMessage.published_at.is_(None)).order_by(
+        models.OutboxMessage.id
+    ).limit(limit)
+
+
+def outbox_backlog() -> Select:
+    return select(func.count(), func.min(models.OutboxMessage.created_at)).where(
+        models.OutboxMessage.published_at.is_(None)
+    )
+
+
+def refresh_token_by_hash(token_hash: str) -> Select:
+    return select(models.RefreshToken).where(models.RefreshToken.token_hash == token_hash)
+
+
+def active_revoked_tokens(now: datetime) -> Select:
+    return select(models.RevokedToken).where(models.RevokedToken.expires_at > now)
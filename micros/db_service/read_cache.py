@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from prometheus_client import Counter, Gauge
+
+# Микрокэш горячих чтений: короткий TTL ограничивает расхождение, если экземпляров db_service несколько
+# (инвалидация при записи — только локальная). READ_CACHE_TTL=0 оставляет только объединение запросов.
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", 1))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", 10000))
+
+READ_QUERIES = Counter("db_read_queries_total", "Выполненные запросы чтения через кэш", ["endpoint"])
+READ_QUERIES_SAVED = Counter(
+    "db_read_queries_saved_total",
+    "Запросы чтения, которые не пришлось выполнять: ответ из микрокэша или из одновременного запроса",
+    ["endpoint", "source"],
+)
+READ_CACHE_SIZE = Gauge("db_read_cache_size", "Записи в микрокэше чтений")
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.stale = False  # ключ инвалидирован во время запроса: результат не кэшируется
+
+
+class ReadCache:
+    """
+    Объединение одновременных одинаковых чтений (single-flight) и микрокэш с TTL.
+    Первый запрос по ключу выполняет загрузку, остальные ждут его результат; результат
+    (в том числе None — "не найдено") хранится READ_CACHE_TTL секунд.
+    Запись вызывает invalidate: закэшированное значение удаляется, а новые запросы
+    не присоединяются к загрузке, начатой до записи.
+    """
+
+    def __init__(self, ttl: float = READ_CACHE_TTL, max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def _get(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _put(self, key: Hashable, value):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        READ_CACHE_SIZE.set(len(self._entries))
+
+    async def get_or_load(self, key: Hashable, endpoint: str, load: Callable[[], Awaitable[Any]]):
+        found, value = self._get(key)
+        if found:
+            READ_QUERIES_SAVED.labels(endpoint, "cache").inc()
+            return value
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            READ_QUERIES_SAVED.labels(endpoint, "coalesced").inc()
+            return await asyncio.shield(flight.task)
+
+        # Загрузка выполняется отдельной задачей, и первый запрос ждёт её через shield, как остальные:
+        # его отмена (клиент отключился) не отменяет загрузку для присоединившихся запросов
+        READ_QUERIES.labels(endpoint).inc()
+        flight = self._flights[key] = _Flight(asyncio.ensure_future(load()))
+        flight.task.add_done_callback(lambda task: self._landed(key, flight))
+        return await asyncio.shield(flight.task)
+
+    def _landed(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.cancelled():
+            return
+        # exception() помечает исключение как полученное, если ожидающих не осталось
+        if flight.task.exception() is None and not flight.stale:
+            self._put(key, flight.task.result())
+
+    def invalidate(self, *keys: Hashable):
+        for key in keys:
+            self._entries.pop(key, None)
+            flight = self._flights.pop(key, None)
+            if flight is not None:
+                flight.stale = True
+        READ_CACHE_SIZE.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        READ_CACHE_SIZE.set(0)
+
+
+def announcement_key(announcement_id: int) -> tuple:
+    return ("announcement", announcement_id)
+
+
+def username_key(username: str) -> tuple:
+    return ("user_by_username", username)
+
+
+read_cache = ReadCache()
+
+
+def columns(instance) -> Optional[dict]:
+    """
+    Значения столбцов ORM-объекта: в кэше хранятся словари, а не объекты, привязанные к сессии.
+    """
+    if instance is None:
+        return None
+    return {column.name: getattr(instance, column.name) for column in instance.__table__.columns}
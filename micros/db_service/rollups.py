@@ -0,0 +1,210 @@
+"""
+Сводные таблицы для отчётов (stats_daily, announcement_stats).
+
+Маршруты создания объявлений и откликов передают в очередь записи upsert-запросы из этого модуля,
+и сводки обновляются в той же транзакции, что и сама вставка. Пересборка по исходным таблицам
+нужна для заполнения после миграции или исправления расхождений:
+
+    python rollups.py rebuild
+"""
+import argparse
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Executable, bindparam, case, delete, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import IS_SQLITE, engine
+from stats import bucket_expression, seconds_between
+
+logger = logging.getLogger(__name__)
+
+daily = models.StatsDaily.__table__
+per_announcement = models.AnnouncementStats.__table__
+
+
+def _upsert(table):
+    return (sqlite.insert if IS_SQLITE else postgresql.insert)(table)
+
+
+def _naive(value: datetime) -> datetime:
+    # Так время хранится в базе: часовой пояс отбрасывается
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _daily_upsert():
+    statement = _upsert(daily)
+    return statement.on_conflict_do_update(
+        index_elements=[daily.c.day, daily.c.type],
+        set_={"announcements": daily.c.announcements + statement.excluded.announcements},
+    )
+
+
+def _counters_upsert():
+    statement = _upsert(per_announcement)
+    return statement.on_conflict_do_update(
+        index_elements=[per_announcement.c.announcement_id],
+        set_={
+            "responses": per_announcement.c.responses + statement.excluded.responses,
+            # Отклик может прийти с более ранним временем, чем уже учтённый
+            "first_response_seconds": case(
+                (statement.excluded.first_response_seconds < per_announcement.c.first_response_seconds,
+                 statement.excluded.first_response_seconds),
+                else_=per_announcement.c.first_response_seconds,
+            ),
+        },
+    )
+
+
+def _daily_responses_update(values: Optional[dict] = None):
+    """
+    Добавляет отклики в сводку по дню объявления (выполняется после _counters_upsert).
+    Объявление впервые получило отклик, если его счётчик равен числу только что добавленных.
+    Без values параметры передаются при выполнении (executemany).
+    """
+    def param(name: str):
+        return bindparam(name, value=values[name]) if values else bindparam(name)
+
+    first = (
+        select(case((per_announcement.c.responses == param("added"), 1), else_=0))
+        .where(per_announcement.c.announcement_id == param("announcement_id"))
+        .scalar_subquery()
+    )
+    return (
+        update(daily)
+        .where(daily.c.day == param("announcement_day"), daily.c.type == param("announcement_type"))
+        .values(responses=daily.c.responses + param("added"), answered=daily.c.answered + first)
+    )
+
+
+def _daily_rows(announcements: Iterable[tuple[datetime, bool]]) -> list[dict]:
+    counts = Counter((_naive(time).date(), type) for time, type in announcements)
+    return [
+        {"day": day, "type": type, "announcements": count, "answered": 0, "responses": 0}
+        for (day, type), count in counts.items()
+    ]
+
+
+def _response_rows(announcement, times: list[datetime]) -> tuple[dict, dict]:
+    """
+    Параметры для _counters_upsert и _daily_responses_update по откликам на одно объявление.
+    """
+    seconds = round((min(map(_naive, times)) - _naive(announcement.time)).total_seconds(), 3)
+    counters = {
+        "announcement_id": announcement.id, "announcement_time": _naive(announcement.time),
+        "responses": len(times), "first_response_seconds": seconds,
+    }
+    day = {
+        "announcement_id": announcement.id, "announcement_day": _naive(announcement.time).date(),
+        "announcement_type": announcement.type, "added": len(times),
+    }
+    return counters, day
+
+
+def announcement_created(announcement: models.Announcement) -> list[Executable]:
+    """
+    Запросы, учитывающие новое объявление в сводке по дням.
+    """
+    return [_daily_upsert().values(**_daily_rows([(announcement.time, announcement.type)])[0])]
+
+
+def response_created(announcement: models.Announcement, response: models.Response) -> list[Executable]:
+    """
+    Запросы, учитывающие новый отклик: счётчик объявления, затем сводка по дню объявления.
+    """
+    counters, day = _response_rows(announcement, [response.time])
+    return [_counters_upsert().values(**counters), _daily_responses_update(day)]
+
+
+async def record_announcements(session: AsyncSession, announcements: list[dict]):
+    """
+    Учитывает пачку вставленных объявлений (словари с time и type): один executemany на пачку.
+    """
+    rows = _daily_rows((announcement["time"], announcement["type"]) for announcement in announcements)
+    if rows:
+        await session.execute(_daily_upsert(), rows)
+
+
+async def record_responses(session: AsyncSession, announcements: dict, responses: list[dict]):
+    """
+    Учитывает пачку вставленных откликов; announcements — объявления (id, time, type) по id.
+    """
+    times = defaultdict(list)
+    for response in responses:
+        times[response["announcement_id"]].append(response["time"])
+    rows = [_response_rows(announcements[announcement_id], values) for announcement_id, values in times.items()]
+    if rows:
+        await session.execute(_counters_upsert(), [counters for counters, _ in rows])
+        await session.execute(_daily_responses_update(), [day for _, day in rows])
+
+
+def rebuild_rollups(connection: Connection) -> dict:
+    """
+    Заполняет сводки заново по исходным таблицам одной транзакцией.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        # Вставки, начатые во время пересборки, применят свои upsert уже поверх новых сводок
+        connection.execute(text("LOCK TABLE stats_daily, announcement_stats IN EXCLUSIVE MODE"))
+    connection.execute(delete(per_announcement))
+    connection.execute(delete(daily))
+
+    first = (
+        select(
+            models.Response.announcement_id,
+            func.count().label("responses"),
+            func.min(models.Response.time).label("first_time"),
+        )
+        .group_by(models.Response.announcement_id)
+        .subquery("first_responses")
+    )
+    connection.execute(insert(per_announcement).from_select(
+        ["announcement_id", "announcement_time", "responses", "first_response_seconds"],
+        select(
+            models.Announcement.id, models.Announcement.time, first.c.responses,
+            seconds_between(dialect, models.Announcement.time, first.c.first_time),
+        ).join(first, first.c.announcement_id == models.Announcement.id),
+    ))
+
+    day = bucket_expression(dialect, models.Announcement.time, "day")
+    connection.execute(insert(daily).from_select(
+        ["day", "type", "announcements", "answered", "responses"],
+        select(
+            day, models.Announcement.type, func.count(),
+            func.count(per_announcement.c.announcement_id),
+            func.coalesce(func.sum(per_announcement.c.responses), 0),
+        )
+        .outerjoin(per_announcement, per_announcement.c.announcement_id == models.Announcement.id)
+        .group_by(day, models.Announcement.type),
+    ))
+    return {
+        "days": connection.scalar(select(func.count()).select_from(daily)),
+        "announcements": connection.scalar(select(func.count()).select_from(per_announcement)),
+    }
+
+
+async def rebuild():
+    async with engine.begin() as conn:
+        result = await conn.run_sync(rebuild_rollups)
+    await engine.dispose()
+    logger.info(f"Rollups rebuilt: {result['days']} daily rows, {result['announcements']} answered announcements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Rebuild report rollups from announcements and responses")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
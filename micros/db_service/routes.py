@@ -1,101 +1,316 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import models, schemas
-from datetime import datetime
-from database import get_db
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+import models, schemas, queries
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from database import AsyncSessionLocal, get_db
+from write_queue import write_queue
+from pagination import encode_cursor, decode_cursor
+from export import stream_rows, MEDIA_TYPES
+from outbox import notification_message, revocation_message, outbox_relay, to_utc, utcnow
+import search
+import stats
+import rollups
+import bulk
+from matching import matching_engine, match_notifications
+from read_cache import read_cache, announcement_key, username_key, columns
+
+# Наибольшее число id в одном пакетном запросе (/users/batch, /announcements/batch)
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 500))
+ANNOUNCEMENT_INCLUDES = {"user", "responses"}
+
+def parse_ids(ids: str) -> list[int]:
+    """
+    Список id через запятую без повторов, в порядке запроса.
+    """
+    try:
+        parsed = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(parsed) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    return parsed
+
+def parse_include(include: Optional[str]) -> frozenset[str]:
+    names = frozenset(name.strip() for name in (include or "").split(",") if name.strip())
+    unknown = names - ANNOUNCEMENT_INCLUDES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    return names
 
 # Маршруты для пользователей
 users_router = APIRouter(prefix="/users", tags=["Users"])
 
 @users_router.post("/", response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(queries.user_by_username(user.username))
     if db_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     new_user = models.User(
         username=user.username,
         hashed_password=user.hashed_password
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    try:
+        created = await write_queue.submit(new_user)
+    except IntegrityError:
+        # Пользователь с таким именем создан параллельным запросом
+        raise HTTPException(status_code=400, detail="Username already exists")
+    read_cache.invalidate(username_key(created.username))
+    return created
 
 @users_router.get("/", response_model=schemas.UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(queries.user_by_id(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+@users_router.get("/batch", response_model=list[schemas.UserOut])
+async def get_users_batch(ids: str = Query(..., description="id через запятую"), db: AsyncSession = Depends(get_db)):
+    """
+    Несколько пользователей одним запросом, в порядке `ids`; отсутствующие id пропускаются.
+    """
+    ids = parse_ids(ids)
+    users = {user.id: user for user in await db.scalars(queries.users_by_ids(ids))}
+    return [users[user_id] for user_id in ids if user_id in users]
+
 @users_router.get("/by-username/", response_model=schemas.UserOut)
-def get_user_by_username(username: str, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username == username).first()
+async def get_user_by_username(username: str):
+    """
+    Одновременные запросы одного имени выполняются одним SQL-запросом, результат кэшируется на READ_CACHE_TTL.
+    Запрос выполняется в собственной сессии: его ждут и другие запросы, а сессия первого закрывается при его отмене.
+    """
+    async def load():
+        async with AsyncSessionLocal() as session:
+            return columns(await session.scalar(queries.user_by_username(username)))
+
+    user = await read_cache.get_or_load(username_key(username), "user_by_username", load)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+@users_router.patch("/{user_id}/password", response_model=schemas.UserOut)
+async def update_user_password(user_id: int, data: schemas.UserPasswordUpdate):
+    """
+    Обновить хеш пароля пользователя (например, при перехешировании с новой стоимостью).
+    """
+    async def update_password(session: AsyncSession):
+        result = await session.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .values(hashed_password=data.hashed_password)
+            .returning(models.User.id, models.User.username, models.User.hashed_password)
+        )
+        return result.mappings().first()
+
+    user = await write_queue.run(update_password)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    read_cache.invalidate(username_key(user["username"]))
+    return user
+
 # Маршруты для объявлений
 announcements_router = APIRouter(prefix="/announcements", tags=["Announcements"])
 
 @announcements_router.post("/", response_model=schemas.AnnouncementOut)
-def create_announcement(data: schemas.AnnouncementCreate, db: Session = Depends(get_db)):
+async def create_announcement(data: schemas.AnnouncementCreate, db: AsyncSession = Depends(get_db)):
     new_announcement = models.Announcement(
         user_id=data.user_id,
         item=data.item,
         place=data.place,
         type=data.type,
-        time=data.time or datetime.now()
+        # Время объявлений хранится в UTC: сопоставление сравнивает его с текущим временем и после пересборки индекса
+        time=to_utc(data.time) if data.time else utcnow()
+    )
+    announcement = await write_queue.submit(new_announcement, *rollups.announcement_created(new_announcement))
+    # Запрос несуществовавшего ещё id мог закэшировать "не найдено"
+    read_cache.invalidate(announcement_key(announcement.id))
+
+    # Ищем пары среди открытых объявлений противоположного типа и уведомляем обоих авторов
+    matches = matching_engine.add_and_match(announcement)
+    if matches:
+        await write_queue.submit(*match_notifications(announcement, matches))
+        outbox_relay.notify()
+    return announcement
+
+@announcements_router.post("/bulk", response_model=schemas.BulkInsertResult)
+async def create_announcements_bulk(request: Request, match: bool = True):
+    """
+    Массовая вставка объявлений: JSON-массив или NDJSON (`Content-Type: application/x-ndjson`)
+    из объектов как для POST /announcements/. Строки вставляются пачками, каждая пачка — одной транзакцией;
+    ошибка в строке не мешает остальным, результат возвращается по каждой строке.
+    `match=false` — не искать пары для импортируемых объявлений (они всё равно попадают в индекс сопоставления).
+    """
+    return await bulk.bulk_insert(
+        request, schemas.AnnouncementCreate, lambda chunk: bulk.insert_announcements(chunk, match), "announcements"
+    )
+
+@announcements_router.get("/export")
+async def export_announcements(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    type: Optional[bool] = None,
+    place: Optional[str] = None,
+    user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None
+):
+    """
+    Потоковая выгрузка объявлений в NDJSON или CSV с теми же фильтрами, что и у списка.
+    """
+    query = queries.export_announcements(
+        type=type, place=place, user_id=user_id, time_from=time_from, time_to=time_to
     )
-    db.add(new_announcement)
-    db.commit()
-    db.refresh(new_announcement)
-    return new_announcement
+    return StreamingResponse(stream_rows(query, format), media_type=MEDIA_TYPES[format])
+
+@announcements_router.get("/search", response_model=schemas.AnnouncementSearchPage)
+async def search_announcements(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Полнотекстовый поиск по названию предмета и месту (все слова, по префиксу), от более релевантных.
+    Для следующей страницы передайте `cursor` из `next_cursor` предыдущего ответа.
+    """
+    offset = search.decode_offset(cursor) if cursor else 0
+    query = search.search_announcements(db.bind.dialect.name, q, limit, offset, type=type)
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = search.encode_offset(offset + limit)
+    items = [
+        {**{c.name: getattr(announcement, c.name) for c in models.Announcement.__table__.columns}, "score": score}
+        for announcement, score in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+@announcements_router.get("/batch", response_model=list[schemas.AnnouncementExpanded])
+async def get_announcements_batch(
+    ids: str = Query(..., description="id через запятую"),
+    include: Optional[str] = Query(None, description="user,responses"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Несколько объявлений одним запросом, в порядке `ids`; отсутствующие id пропускаются.
+    `include=user,responses` добавляет автора и отклики: на всю пачку это один-два SQL-запроса
+    вместо отдельных HTTP-вызовов на каждое объявление.
+    """
+    ids = parse_ids(ids)
+    expand = parse_include(include)
+    announcements = {
+        announcement.id: announcement
+        for announcement in (await db.scalars(queries.announcements_by_ids(ids, expand))).unique()
+    }
+    items = []
+    for announcement_id in ids:
+        announcement = announcements.get(announcement_id)
+        if announcement is None:
+            continue
+        item = {c.name: getattr(announcement, c.name) for c in models.Announcement.__table__.columns}
+        if "user" in expand:
+            item["user"] = {"id": announcement.user.id, "username": announcement.user.username}
+        if "responses" in expand:
+            item["responses"] = sorted(announcement.responses, key=lambda response: (response.time, response.id))
+        items.append(item)
+    return items
 
 @announcements_router.get("/{announcement_id}", response_model=schemas.AnnouncementOut)
-def get_announcement(announcement_id: int, db: Session = Depends(get_db)):
-    announcement = db.query(models.Announcement).filter(models.Announcement.id == announcement_id).first()
+async def get_announcement(announcement_id: int):
+    """
+    Одновременные запросы одного объявления выполняются одним SQL-запросом, результат кэшируется на READ_CACHE_TTL.
+    Запрос выполняется в собственной сессии, как в get_user_by_username.
+    """
+    async def load():
+        async with AsyncSessionLocal() as session:
+            return columns(await session.scalar(queries.announcement_by_id(announcement_id)))
+
+    announcement = await read_cache.get_or_load(announcement_key(announcement_id), "announcement", load)
     if not announcement:
         raise HTTPException(status_code=404, detail="Announcement not found")
     return announcement
 
-@announcements_router.get("/", response_model=list[schemas.AnnouncementOut])
-def list_announcements(db: Session = Depends(get_db)):
-    announcements = db.query(models.Announcement).all()
-    return announcements
+@announcements_router.get("/", response_model=schemas.AnnouncementPage)
+async def list_announcements(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    type: Optional[bool] = None,
+    place: Optional[str] = None,
+    user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Получить страницу объявлений (от новых к старым) с фильтрами.
+    Для следующей страницы передайте `cursor` из `next_cursor` предыдущего ответа.
+    """
+    query = queries.list_announcements(
+        limit,
+        decode_cursor(cursor) if cursor else None,
+        type=type, place=place, user_id=user_id, time_from=time_from, time_to=time_to
+    )
+
+    announcements = (await db.scalars(query)).all()
+    next_cursor = None
+    if len(announcements) > limit:
+        announcements = announcements[:limit]
+        next_cursor = encode_cursor(announcements[-1].time, announcements[-1].id)
+    return {"items": announcements, "next_cursor": next_cursor}
+
+@announcements_router.get("/{announcement_id}/matches", response_model=list[schemas.AnnouncementMatch])
+async def get_announcement_matches(announcement_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Возможные пары для объявления среди открытых объявлений противоположного типа.
+    """
+    announcement = await db.scalar(queries.announcement_by_id(announcement_id))
+    if not announcement:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    return [
+        {"announcement": match.entry.to_dict(), "score": match.score}
+        for match in matching_engine.matches_for(announcement)
+    ]
 
 @announcements_router.get("/user/{user_id}", response_model=list[schemas.AnnouncementOut])
-def get_announcements_by_user(user_id: int, db: Session = Depends(get_db)):
-    announcements = db.query(models.Announcement).filter(models.Announcement.user_id == user_id).all()
+async def get_announcements_by_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    announcements = (await db.scalars(queries.announcements_by_user(user_id))).all()
     if not announcements:
         raise HTTPException(status_code=404, detail="No announcements found for this user")
     return announcements
 
 @announcements_router.get("/type/", response_model=list[schemas.AnnouncementOut])
-def get_announcements_by_type(item_type: bool, db: Session = Depends(get_db)):
+async def get_announcements_by_type(item_type: bool, db: AsyncSession = Depends(get_db)):
     """
     Получить объявления по типу:
     - `True` = Найденные предметы
     - `False` = Потерянные предметы
     """
-    announcements = db.query(models.Announcement).filter(models.Announcement.type == item_type).all()
+    announcements = (await db.scalars(queries.announcements_by_type(item_type))).all()
     return announcements
 
 # Маршруты для ответов на объявления
 responses_router = APIRouter(prefix="/responses", tags=["Responses"])
 
 @responses_router.post("/", response_model=schemas.ResponseOut)
-def create_response(data: schemas.ResponseCreate, db: Session = Depends(get_db)):
+async def create_response(data: schemas.ResponseCreate, db: AsyncSession = Depends(get_db)):
     """
     Создать отклик на объявление.
     """
     # Проверяем, существует ли объявление
-    announcement = db.query(models.Announcement).filter(models.Announcement.id == data.announcement_id).first()
+    announcement = await db.scalar(queries.announcement_by_id(data.announcement_id))
     if not announcement:
         raise HTTPException(status_code=404, detail="Announcement not found")
 
     # Проверяем, существует ли пользователь, отправляющий отклик
-    user = db.query(models.User).filter(models.User.id == data.responding_user_id).first()
+    user = await db.scalar(queries.user_by_id(data.responding_user_id))
     if not user:
         raise HTTPException(status_code=404, detail="Responding user not found")
 
@@ -106,27 +321,221 @@ def create_response(data: schemas.ResponseCreate, db: Session = Depends(get_db))
         message=data.message,
         time=data.time or datetime.now()
     )
-    db.add(new_response)
-    db.commit()
-    db.refresh(new_response)
-    return new_response
+    # Уведомление автору объявления сохраняется в той же транзакции, что и отклик
+    notification = notification_message(announcement.user_id, {
+        "responding_user_id": data.responding_user_id,
+        "announcement_id": data.announcement_id,
+        "content": f"User {data.responding_user_id} responded to your announcement: {data.message}",
+        "created_at": new_response.time.isoformat(),
+    })
+    response = await write_queue.submit(
+        new_response, notification, *rollups.response_created(announcement, new_response)
+    )
+    outbox_relay.notify()
+    return response
+
+@responses_router.post("/bulk", response_model=schemas.BulkInsertResult)
+async def create_responses_bulk(request: Request):
+    """
+    Массовая вставка откликов (JSON-массив или NDJSON), как POST /announcements/bulk.
+    """
+    return await bulk.bulk_insert(request, schemas.ResponseCreate, bulk.insert_responses, "responses")
+
+@responses_router.get("/export")
+async def export_responses(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    announcement_id: Optional[int] = None,
+    responding_user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None
+):
+    """
+    Потоковая выгрузка откликов в NDJSON или CSV.
+    """
+    query = queries.export_responses(
+        announcement_id=announcement_id,
+        responding_user_id=responding_user_id,
+        time_from=time_from,
+        time_to=time_to
+    )
+    return StreamingResponse(stream_rows(query, format), media_type=MEDIA_TYPES[format])
 
 @responses_router.get("/announcement/{announcement_id}", response_model=list[schemas.ResponseOut])
-def get_responses_by_announcement(announcement_id: int, db: Session = Depends(get_db)):
+async def get_responses_by_announcement(announcement_id: int, db: AsyncSession = Depends(get_db)):
     """
     Получить все отклики на конкретное объявление.
     """
-    responses = db.query(models.Response).filter(models.Response.announcement_id == announcement_id).all()
+    responses = (await db.scalars(queries.responses_by_announcement(announcement_id))).all()
     if not responses:
         raise HTTPException(status_code=404, detail="No responses found for this announcement")
     return responses
 
 @responses_router.get("/user/{user_id}", response_model=list[schemas.ResponseOut])
-def get_responses_by_user(user_id: int, db: Session = Depends(get_db)):
+async def get_responses_by_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Получить все отклики, сделанные конкретным пользователем.
     """
-    responses = db.query(models.Response).filter(models.Response.responding_user_id == user_id).all()
+    responses = (await db.scalars(queries.responses_by_user(user_id))).all()
     if not responses:
         raise HTTPException(status_code=404, detail="No responses found for this user")
     return responses
+
+# Маршруты подсистемы сопоставления потерянных и найденных вещей
+matching_router = APIRouter(prefix="/matching", tags=["Matching"])
+
+@matching_router.post("/rebuild", response_model=schemas.MatchIndexRebuild)
+async def rebuild_match_index():
+    """
+    Пересобрать индекс сопоставления по открытым объявлениям из базы.
+    """
+    return {"indexed": await matching_engine.rebuild()}
+
+# Агрегаты для отчётов: считаются в базе, клиенту уходят только итоги
+stats_router = APIRouter(prefix="/stats", tags=["Stats"])
+
+@stats_router.get("/announcements/counts", response_model=list[schemas.AnnouncementCountBucket])
+async def get_announcement_counts(
+    bucket: stats.Bucket = "day",
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Число объявлений каждого типа по дням или неделям (`bucket=day|week`).
+    """
+    query = stats.announcement_counts(db.bind.dialect.name, bucket, time_from=time_from, time_to=time_to)
+    return (await db.execute(query)).mappings().all()
+
+@stats_router.get("/places/top", response_model=list[schemas.PlaceCount])
+async def get_top_places(
+    limit: int = Query(10, ge=1, le=100),
+    type: Optional[bool] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = stats.top_places(limit, type=type, time_from=time_from, time_to=time_to)
+    return (await db.execute(query)).mappings().all()
+
+@stats_router.get("/responses/rate", response_model=schemas.ResponseRateStats)
+async def get_response_rate(
+    limit: int = Query(10, ge=1, le=100),
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Доля объявлений периода, получивших отклик, и `limit` объявлений с наибольшим числом откликов.
+    """
+    return await stats.response_rate(db, limit, time_from=time_from, time_to=time_to)
+
+@stats_router.get("/responses/first-response-time", response_model=schemas.FirstResponseStats)
+async def get_first_response_time(
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Медиана времени до первого отклика (в секундах) по объявлениям периода, получившим отклик.
+    """
+    return await stats.median_first_response(db, time_from=time_from, time_to=time_to)
+
+@stats_router.get("/users/active", response_model=list[schemas.UserActivity])
+async def get_active_users(
+    limit: int = Query(10, ge=1, le=100),
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = stats.active_users(limit, time_from=time_from, time_to=time_to)
+    return (await db.execute(query)).mappings().all()
+
+
+# Маршруты для токенов auth_service: refresh-токены и отозванные access-токены
+tokens_router = APIRouter(prefix="/tokens", tags=["Tokens"])
+
+@tokens_router.post("/refresh", response_model=schemas.RefreshTokenOut)
+async def create_refresh_token(data: schemas.RefreshTokenCreate, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(queries.user_by_id(data.user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    token = models.RefreshToken(
+        token_hash=data.token_hash,
+        user_id=data.user_id,
+        expires_at=utcnow() + timedelta(seconds=data.expires_in)
+    )
+    return await write_queue.submit(token)
+
+@tokens_router.post("/refresh/rotate", response_model=schemas.RefreshTokenOut)
+async def rotate_refresh_token(data: schemas.RefreshTokenRotate):
+    """
+    Отзывает действующий refresh-токен и сохраняет новый для того же пользователя.
+    Отзыв — одно условное UPDATE, поэтому один токен нельзя обменять дважды.
+    """
+    async def rotate(session: AsyncSession) -> Optional[models.RefreshToken]:
+        now = utcnow()
+        user_id = await session.scalar(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.token_hash == data.token_hash,
+                models.RefreshToken.revoked_at.is_(None),
+                models.RefreshToken.expires_at > now,
+            )
+            .values(revoked_at=now)
+            .returning(models.RefreshToken.user_id)
+        )
+        if user_id is None:
+            return None
+        token = models.RefreshToken(
+            token_hash=data.new_token_hash,
+            user_id=user_id,
+            expires_at=now + timedelta(seconds=data.expires_in)
+        )
+        session.add(token)
+        return token
+
+    token = await write_queue.run(rotate)
+    if token is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return token
+
+@tokens_router.post("/refresh/revoke")
+async def revoke_refresh_token(data: schemas.RefreshTokenRevoke):
+    async def revoke(session: AsyncSession) -> bool:
+        result = await session.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.token_hash == data.token_hash, models.RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=utcnow())
+        )
+        return result.rowcount > 0
+
+    return {"revoked": await write_queue.run(revoke)}
+
+@tokens_router.post("/revoked", response_model=schemas.RevokedToken)
+async def revoke_access_token(data: schemas.RevokedToken, db: AsyncSession = Depends(get_db)):
+    """
+    Отзыв access-токена. Событие для проверяющих сервисов сохраняется в outbox в той же транзакции.
+    """
+    expires_at = datetime.fromtimestamp(data.exp, timezone.utc).replace(tzinfo=None)
+    # Истёкший токен уже не пройдёт проверку, повторный отзыв ничего не меняет
+    if expires_at <= utcnow() or await db.get(models.RevokedToken, data.jti) is not None:
+        return data
+    try:
+        await write_queue.submit(models.RevokedToken(jti=data.jti, expires_at=expires_at),
+                                 revocation_message(data.jti, data.exp))
+    except IntegrityError:
+        # Тот же токен отозван параллельным запросом
+        return data
+    outbox_relay.notify()
+    return data
+
+@tokens_router.get("/revoked", response_model=list[schemas.RevokedToken])
+async def list_revoked_tokens(db: AsyncSession = Depends(get_db)):
+    """
+    Отозванные токены, срок действия которых ещё не истёк (снимок для проверяющих сервисов).
+    """
+    tokens = await db.scalars(queries.active_revoked_tokens(utcnow()))
+    return [
+        {"jti": token.jti, "exp": int(token.expires_at.replace(tzinfo=timezone.utc).timestamp())}
+        for token in tokens
+    ]
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
 from typing import Optional
 
@@ -7,6 +7,10 @@ class UserCreate(BaseModel):
     username: str
     hashed_password: str
 
+# Модель для обновления хеша пароля
+class UserPasswordUpdate(BaseModel):
+    hashed_password: str
+
 # Модель для отображения пользователя
 class UserOut(BaseModel):
     id: int
@@ -30,7 +34,33 @@ class AnnouncementOut(BaseModel):
     time: datetime
     type: bool  # True = Найдено, False = Потеряно
 
+# Автор объявления без служебных полей
+class UserBrief(BaseModel):
+    id: int
+    username: str
+
+# Страница объявлений с курсором на следующую страницу
+class AnnouncementPage(BaseModel):
+    items: list[AnnouncementOut]
+    next_cursor: Optional[str] = None
+
+# Найденное объявление с оценкой релевантности (больше — лучше)
+class AnnouncementSearchHit(AnnouncementOut):
+    score: float
+
+# Страница результатов поиска
+class AnnouncementSearchPage(BaseModel):
+    items: list[AnnouncementSearchHit]
+    next_cursor: Optional[str] = None
+
+# Возможная пара для объявления (потерянное/найденное) с оценкой сходства от 0 до 1
+class AnnouncementMatch(BaseModel):
+    announcement: AnnouncementOut
+    score: float
 
+# Результат пересборки индекса сопоставления
+class MatchIndexRebuild(BaseModel):
+    indexed: int
 
 # Модель для создания отклика на объявление
 class ResponseCreate(BaseModel):
@@ -46,3 +76,83 @@ class ResponseOut(BaseModel):
     responding_user_id: int
     message: str
     time: datetime
+
+# Объявление со связями, запрошенными в include (не запрошенные — null)
+class AnnouncementExpanded(AnnouncementOut):
+    user: Optional[UserBrief] = None
+    responses: Optional[list[ResponseOut]] = None
+
+# Результат массовой вставки для одной строки запроса (index — её номер во входных данных)
+class BulkRowResult(BaseModel):
+    index: int
+    status: str  # created | error
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+# Итог массовой вставки
+class BulkInsertResult(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkRowResult]
+
+# Число объявлений одного типа за день или неделю (period — начало периода)
+class AnnouncementCountBucket(BaseModel):
+    period: date
+    type: bool
+    count: int
+
+# Место и число объявлений в нём
+class PlaceCount(BaseModel):
+    place: str
+    count: int
+
+# Число откликов на объявление
+class AnnouncementResponseCount(BaseModel):
+    announcement_id: int
+    item: str
+    responses: int
+
+# Доля объявлений с откликами и объявления с наибольшим числом откликов
+class ResponseRateStats(BaseModel):
+    announcements: int
+    answered: int
+    rate: float
+    avg_responses: float
+    top: list[AnnouncementResponseCount]
+
+# Медиана времени от публикации объявления до первого отклика
+class FirstResponseStats(BaseModel):
+    announcements: int
+    median_seconds: Optional[float] = None
+
+# Активность пользователя: объявления и отклики
+class UserActivity(BaseModel):
+    user_id: int
+    username: str
+    announcements: int
+    responses: int
+    total: int
+
+# Новый refresh-токен: хранится только хеш, срок действия в секундах
+class RefreshTokenCreate(BaseModel):
+    token_hash: str
+    user_id: int
+    expires_in: int
+
+# Замена refresh-токена: старый отзывается, новый сохраняется
+class RefreshTokenRotate(BaseModel):
+    token_hash: str
+    new_token_hash: str
+    expires_in: int
+
+class RefreshTokenRevoke(BaseModel):
+    token_hash: str
+
+class RefreshTokenOut(BaseModel):
+    user_id: int
+    expires_at: datetime
+
+# Отозванный access-токен: jti и exp (Unix-время) из его claims
+class RevokedToken(BaseModel):
+    jti: str
+    exp: int
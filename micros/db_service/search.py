@@ -0,0 +1,134 @@
+import base64
+import os
+import re
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Select, column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+
+import models
+
+# Конфигурация текстового поиска Postgres ('simple' — без стемминга, подходит для смешанных языков)
+SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+# Ограничение глубины страниц: поиск ранжирует все совпадения, далёкие страницы дороги
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", 1000))
+# Сколько самых новых совпадений ранжируется по релевантности
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", 2000))
+# Вес поля item относительно place в ранжировании
+SEARCH_ITEM_WEIGHT = float(os.getenv("SEARCH_ITEM_WEIGHT", 2.0))
+
+FTS_TABLE = "announcements_fts"
+
+# SQLite: внешняя FTS5-таблица над announcements, синхронизируется триггерами
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        item, place, content='announcements', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS announcements_fts_insert AFTER INSERT ON announcements BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, item, place) VALUES (new.id, new.item, new.place);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS announcements_fts_delete AFTER DELETE ON announcements BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, item, place) VALUES ('delete', old.id, old.item, old.place);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS announcements_fts_update AFTER UPDATE OF item, place ON announcements BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, item, place) VALUES ('delete', old.id, old.item, old.place);
+        INSERT INTO {FTS_TABLE}(rowid, item, place) VALUES (new.id, new.item, new.place);
+    END""",
+]
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+# Postgres: вычисляемая колонка tsvector (обновляется самой базой) и GIN-индекс
+POSTGRES_DDL = [
+    f"""ALTER TABLE announcements ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(item, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_TS_CONFIG}', coalesce(place, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_announcements_search_vector ON announcements USING GIN (search_vector)",
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_index(connection: Connection):
+    """
+    Создаёт поисковый индекс, если его ещё нет; для SQLite заполняет его существующими объявлениями.
+    """
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text(SQLITE_REBUILD))
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.execute(text(statement))
+
+
+def tokenize(q: str) -> list[str]:
+    return [token.lower() for token in _TOKEN.findall(q)]
+
+
+def search_announcements(dialect: str, q: str, limit: int, offset: int = 0, type: Optional[bool] = None) -> Select:
+    """
+    Объявления, содержащие все слова запроса в item или place, от более релевантных.
+    Последнее слово ищется по префиксу (запрос может быть недописан).
+    Ранжируются только SEARCH_RANK_WINDOW самых новых совпадений: оценка каждого совпадения
+    стоит дорого, и без окна частое слово на миллионе объявлений ранжировалось бы сотни миллисекунд.
+    Оценка score приведена к виду "больше — лучше" для обеих СУБД. Выбирается на одну запись больше limit.
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+
+    if dialect == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"))
+        fts_ref = literal_column(FTS_TABLE)
+        # Каждое слово — фраза в кавычках: спецсимволы синтаксиса FTS5 из запроса не интерпретируются
+        match = " ".join(f'"{token}"' for token in tokens) + "*"
+        candidates = (
+            select(fts.c.rowid.label("id"), (-func.bm25(fts_ref, SEARCH_ITEM_WEIGHT, 1.0)).label("score"))
+            .where(fts_ref.op("MATCH")(match))
+        )
+        candidate_id = fts.c.rowid
+        if type is not None:
+            candidates = candidates.join(models.Announcement, models.Announcement.id == fts.c.rowid)
+    else:
+        search_vector = literal_column("announcements.search_vector")
+        tsquery = func.to_tsquery(SEARCH_TS_CONFIG, " & ".join(tokens) + ":*")
+        candidates = (
+            select(models.Announcement.id, func.ts_rank(search_vector, tsquery).label("score"))
+            .where(search_vector.op("@@")(tsquery))
+        )
+        candidate_id = models.Announcement.id
+    if type is not None:
+        # Фильтр до окна: иначе самые новые совпадения другого типа вытеснили бы нужные
+        candidates = candidates.where(models.Announcement.type == type)
+    candidates = candidates.order_by(candidate_id.desc()).limit(SEARCH_RANK_WINDOW).subquery("candidates")
+
+    query = select(models.Announcement, candidates.c.score).join(
+        candidates, candidates.c.id == models.Announcement.id
+    )
+    return query.order_by(candidates.c.score.desc(), models.Announcement.id.desc()).offset(offset).limit(limit + 1)
+
+
+def encode_offset(offset: int) -> str:
+    """
+    Курсор страницы поиска. Порядок по релевантности не подходит для keyset-пагинации, поэтому курсор — смещение.
+    """
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, offset = raw.split(":")
+        if prefix != "o" or int(offset) < 0:
+            raise ValueError
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if int(offset) > SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Search results are limited, refine the query")
+    return int(offset)
@@ -0,0 +1,141 @@
+from datetime import datetime, time
+from typing import Literal, Optional
+
+from sqlalchemy import Date, Select, cast, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+# Агрегаты для отчётов: считаются в базе, наружу уходят только итоги.
+# Число объявлений и доля откликов читаются из сводок (см. rollups.py), места и активные
+# пользователи — GROUP BY по исходным таблицам с индексами по времени.
+# Выражения над датами зависят от СУБД (SQLite хранит время строкой, в Postgres есть date_trunc).
+
+Bucket = Literal["day", "week"]
+
+
+def _time_range(query: Select, column, time_from: Optional[datetime], time_to: Optional[datetime]) -> Select:
+    if time_from is not None:
+        query = query.where(column >= time_from)
+    if time_to is not None:
+        query = query.where(column < time_to)
+    return query
+
+
+def bucket_expression(dialect: str, column, bucket: Bucket):
+    """
+    Начало дня или недели (понедельник) для значения времени.
+    """
+    if dialect == "sqlite":
+        return func.date(column) if bucket == "day" else func.date(column, "weekday 0", "-6 days")
+    return cast(func.date_trunc(bucket, column), Date)
+
+
+def seconds_between(dialect: str, start, end):
+    """
+    Разница во времени в секундах с точностью до миллисекунд (julianday в SQLite точнее не даёт).
+    """
+    if dialect == "sqlite":
+        return func.round((func.julianday(end) - func.julianday(start)) * 86400, 3)
+    return func.extract("epoch", end - start)
+
+
+def _day_range(query: Select, time_from: Optional[datetime], time_to: Optional[datetime]) -> Select:
+    """
+    Фильтр сводки по дням: границы периода округляются до целых дней.
+    """
+    day = models.StatsDaily.day
+    if time_from is not None:
+        query = query.where(day >= time_from.date())
+    if time_to is not None:
+        query = query.where(day < time_to.date() if time_to.time() == time.min else day <= time_to.date())
+    return query
+
+
+def announcement_counts(dialect: str, bucket: Bucket, time_from: Optional[datetime] = None,
+                        time_to: Optional[datetime] = None) -> Select:
+    period = bucket_expression(dialect, models.StatsDaily.day, bucket).label("period")
+    query = select(period, models.StatsDaily.type, func.sum(models.StatsDaily.announcements).label("count"))
+    query = _day_range(query, time_from, time_to)
+    return query.group_by(period, models.StatsDaily.type).order_by(period, models.StatsDaily.type)
+
+
+def top_places(limit: int, type: Optional[bool] = None, time_from: Optional[datetime] = None,
+               time_to: Optional[datetime] = None) -> Select:
+    count = func.count().label("count")
+    query = select(models.Announcement.place, count)
+    if type is not None:
+        query = query.where(models.Announcement.type == type)
+    query = _time_range(query, models.Announcement.time, time_from, time_to)
+    return query.group_by(models.Announcement.place).order_by(count.desc(), models.Announcement.place).limit(limit)
+
+
+async def response_rate(db: AsyncSession, limit: int, time_from: Optional[datetime] = None,
+                        time_to: Optional[datetime] = None) -> dict:
+    """
+    Итоги по сводке дней и `limit` объявлений с наибольшим числом откликов по счётчикам объявлений.
+    """
+    total, answered, responses = (await db.execute(_day_range(select(
+        func.coalesce(func.sum(models.StatsDaily.announcements), 0),
+        func.coalesce(func.sum(models.StatsDaily.answered), 0),
+        func.coalesce(func.sum(models.StatsDaily.responses), 0),
+    ), time_from, time_to))).one()
+    query = (
+        select(models.AnnouncementStats.announcement_id, models.Announcement.item, models.AnnouncementStats.responses)
+        .join(models.Announcement, models.Announcement.id == models.AnnouncementStats.announcement_id)
+    )
+    query = _time_range(query, models.AnnouncementStats.announcement_time, time_from, time_to)
+    top = (await db.execute(
+        query.order_by(models.AnnouncementStats.responses.desc(), models.AnnouncementStats.announcement_id).limit(limit)
+    )).mappings().all()
+    return {
+        "announcements": total,
+        "answered": answered,
+        "rate": answered / total if total else 0.0,
+        "avg_responses": responses / total if total else 0.0,
+        "top": top,
+    }
+
+
+async def median_first_response(db: AsyncSession, time_from: Optional[datetime] = None,
+                                time_to: Optional[datetime] = None) -> dict:
+    """
+    Медиана времени до первого отклика: число строк, затем одна-две средние строки через OFFSET
+    по индексу first_response_seconds, без выгрузки всех значений из базы.
+    """
+    delay = models.AnnouncementStats.first_response_seconds
+    count = await db.scalar(
+        _time_range(select(func.count()).select_from(models.AnnouncementStats), models.AnnouncementStats.announcement_time, time_from, time_to)
+    )
+    if not count:
+        return {"announcements": 0, "median_seconds": None}
+    query = _time_range(select(delay), models.AnnouncementStats.announcement_time, time_from, time_to)
+    middle = (await db.scalars(query.order_by(delay).offset((count - 1) // 2).limit(2 - count % 2))).all()
+    return {"announcements": count, "median_seconds": float(sum(middle) / len(middle))}
+
+
+def active_users(limit: int, time_from: Optional[datetime] = None, time_to: Optional[datetime] = None) -> Select:
+    announcements = _time_range(
+        select(models.Announcement.user_id.label("user_id"), literal(1).label("announcements"),
+               literal(0).label("responses")),
+        models.Announcement.time, time_from, time_to,
+    )
+    responses = _time_range(
+        select(models.Response.responding_user_id.label("user_id"), literal(0).label("announcements"),
+               literal(1).label("responses")),
+        models.Response.time, time_from, time_to,
+    )
+    activity = union_all(announcements, responses).subquery("activity")
+    total = func.count().label("total")
+    return (
+        select(
+            activity.c.user_id, models.User.username,
+            func.sum(activity.c.announcements).label("announcements"),
+            func.sum(activity.c.responses).label("responses"),
+            total,
+        )
+        .join(models.User, models.User.id == activity.c.user_id)
+        .group_by(activity.c.user_id, models.User.username)
+        .order_by(total.desc(), activity.c.user_id)
+        .limit(limit)
+    )
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from prometheus_client import Histogram
+from sqlalchemy import Executable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, IS_SQLITE
+
+# Настройки очереди записи (по умолчанию включена только для SQLite)
+DB_WRITE_QUEUE_ENABLED = os.getenv("DB_WRITE_QUEUE_ENABLED", str(IS_SQLITE)).lower() == "true"
+DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", 10000))
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 200))
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WRITE_BATCH_SIZE = Histogram(
+    "db_write_batch_size",
+    "Количество вставок, зафиксированных одной транзакцией очереди записи",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+
+class WriteQueue:
+    """
+    Единственный писатель: вставки из разных запросов накапливаются в очереди,
+    пока выполняется предыдущий commit, и фиксируются одной транзакцией (group commit).
+    """
+
+    def __init__(self, enabled: bool = DB_WRITE_QUEUE_ENABLED, max_size: int = DB_WRITE_QUEUE_SIZE,
+                 batch_size: int = DB_WRITE_BATCH_SIZE):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Write queue started (batch_size={self.batch_size})")
+
+    async def stop(self):
+        """
+        Фиксирует всё, что уже стоит в очереди, и останавливает писателя.
+        """
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+        logger.info("Write queue stopped")
+
+    async def submit(self, *items):
+        """
+        Сохраняет объекты в одной транзакции и возвращает первый из них с заполненным id.
+        Среди объектов могут быть SQL-запросы (например, upsert сводок): они выполняются
+        в той же транзакции после вставки объектов, в порядке передачи.
+        """
+        if self._task is None:
+            await self._commit(items)
+            return items[0]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((items, future))
+        await future
+        return items[0]
+
+    async def run(self, work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """
+        Выполняет work(session) отдельной транзакцией писателя и возвращает результат work.
+        Для записей, которым нужны чтения или результат запроса (массовая вставка, UPDATE ... RETURNING):
+        пока work выполняется, других записей нет. commit выполняет очередь.
+        """
+        if self._task is None:
+            return await self._transaction(work)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((work, future))
+        return await future
+
+    @staticmethod
+    async def _transaction(work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        async with AsyncSessionLocal() as session:
+            result = await work(session)
+            await session.commit()
+            return result
+
+    @staticmethod
+    async def _apply(session: AsyncSession, items):
+        statements = [item for item in items if isinstance(item, Executable)]
+        session.add_all([item for item in items if not isinstance(item, Executable)])
+        if statements:
+            await session.flush()
+            for statement in statements:
+                await session.execute(statement)
+
+    async def _commit(self, items):
+        async with AsyncSessionLocal() as session:
+            await self._apply(session, items)
+            await session.commit()
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, work = [], None
+            item = await self._queue.get()
+            while item is not None:
+                if callable(item[0]):
+                    # Транзакция из run() выполняется отдельно, после уже накопленных вставок
+                    work = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            stopping = item is None
+            if batch:
+                await self._commit_batch(batch)
+            if work is not None:
+                await self._run_work(*work)
+
+    async def _run_work(self, work, future):
+        try:
+            result = await self._transaction(work)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def _commit_batch(self, batch):
+        WRITE_BATCH_SIZE.observe(len(batch))
+        try:
+            async with AsyncSessionLocal() as session:
+                await self._apply(session, [item for items, _ in batch for item in items])
+                await session.commit()
+        except Exception as exc:
+            if len(batch) == 1:
+                _, future = batch[0]
+                if not future.done():
+                    future.set_exception(exc)
+                return
+            # Одна ошибочная запись не должна отменять остальные: повторяем по одной
+            logger.warning(f"Batch commit of {len(batch)} writes failed, retrying one by one: {exc}")
+            for items, future in batch:
+                try:
+                    await self._commit(items)
+                except Exception as item_exc:
+                    if not future.done():
+                        future.set_exception(item_exc)
+                else:
+                    if not future.done():
+                        future.set_result(None)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+write_queue = WriteQueue()
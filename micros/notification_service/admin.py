@@ -0,0 +1,102 @@
+"""
+Администрирование карантина уведомлений.
+
+    python admin.py list [--limit 20]
+    python admin.py replay [--limit 100] [--all]
+"""
+import argparse
+import asyncio
+import logging
+
+import aio_pika
+
+from consumer import RABBITMQ_HOST, RABBITMQ_PASSWORD, RABBITMQ_PORT, RABBITMQ_USER
+from topology import ATTEMPTS_HEADER, ERROR_HEADER, QUARANTINE_QUEUE, QUEUE_NAME, declare_topology
+
+logger = logging.getLogger(__name__)
+
+
+def describe(message: aio_pika.abc.AbstractIncomingMessage) -> str:
+    headers = message.headers or {}
+    error = headers.get(ERROR_HEADER)
+    if error is None:
+        # Сообщение попало в DLX от брокера (reject/expired), причина — в x-death
+        deaths = headers.get("x-death") or [{}]
+        error = f"dead-lettered: {deaths[0].get('reason', 'unknown')}"
+    body = message.body.decode(errors="replace")
+    return (f"id={message.message_id} attempts={headers.get(ATTEMPTS_HEADER, 0)} "
+            f"error={error!s} body={body[:200]}")
+
+
+async def list_quarantined(channel: aio_pika.abc.AbstractChannel, limit: int):
+    """
+    Показывает сообщения карантина, не удаляя их: неподтверждённые вернутся в очередь при закрытии канала.
+    """
+    queue = await channel.get_queue(QUARANTINE_QUEUE)
+    shown = 0
+    while shown < limit:
+        message = await queue.get(no_ack=False, fail=False)
+        if message is None:
+            break
+        shown += 1
+        print(describe(message))
+    print(f"{shown} message(s) shown")
+
+
+async def replay_quarantined(channel: aio_pika.abc.AbstractChannel, limit: int):
+    """
+    Возвращает сообщения из карантина в основную очередь со сброшенным счётчиком попыток.
+    Обрабатывается не больше сообщений, чем было в карантине при запуске: снова упавшие
+    сообщения возвращаются в карантин, и без этой границы --all мог бы не завершиться.
+    """
+    queue = await channel.declare_queue(QUARANTINE_QUEUE, passive=True)
+    limit = min(limit, queue.declaration_result.message_count)
+    replayed = 0
+    while replayed < limit:
+        message = await queue.get(no_ack=False, fail=False)
+        if message is None:
+            break
+        headers = {
+            key: value for key, value in (message.headers or {}).items()
+            if key not in (ATTEMPTS_HEADER, ERROR_HEADER) and not key.startswith("x-death")
+        }
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                headers=headers,
+                content_type=message.content_type,
+                message_id=message.message_id,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=QUEUE_NAME,
+        )
+        # Из карантина удаляем только после подтверждения публикации
+        await message.ack()
+        replayed += 1
+    print(f"{replayed} message(s) replayed to '{QUEUE_NAME}'")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Notification quarantine admin")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="Show quarantined messages")
+    list_parser.add_argument("--limit", type=int, default=20)
+    replay_parser = commands.add_parser("replay", help="Move quarantined messages back to the main queue")
+    replay_parser.add_argument("--limit", type=int, default=100)
+    replay_parser.add_argument("--all", action="store_true", help="Replay every quarantined message")
+    args = parser.parse_args()
+
+    connection = await aio_pika.connect_robust(
+        host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
+    )
+    async with connection:
+        channel = await connection.channel(publisher_confirms=True)
+        await declare_topology(channel)
+        if args.command == "list":
+            await list_quarantined(channel, args.limit)
+        else:
+            await replay_quarantined(channel, float("inf") if args.all else args.limit)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
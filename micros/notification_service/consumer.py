@@ -1,12 +1,35 @@
-import time
-import pika
-from pika import exceptions
+import asyncio
+import contextlib
 import logging
-from notifications import process_notification
+import os
+import signal
+from collections import deque
+from typing import Optional
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractIncomingMessage
+from notifications import InvalidNotification, pipeline, process_notification
+from topology import (
+    ATTEMPTS_HEADER, DLX_NAME, ERROR_HEADER, MAX_ATTEMPTS, QUEUE_NAME, apply_dead_letter_policy, attempts,
+    declare_topology, published_at, retry_queue
+)
 
 # Конфигурация RabbitMQ
-RABBITMQ_HOST = "rabbitmq"
-QUEUE_NAME = "notifications"
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
+
+# Настройки потребителя
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", 100))  # Неподтверждённых сообщений на канал
+# Параллельных обработчиков. Обработчик ждёт доставки своей пачки, поэтому размер пачки
+# ограничен этим числом: по умолчанию оно равно окну prefetch
+CONSUMER_CONCURRENCY = int(os.getenv("CONSUMER_CONCURRENCY", 100))
+ACK_BATCH_SIZE = int(os.getenv("ACK_BATCH_SIZE", 25))
+ACK_FLUSH_INTERVAL = float(os.getenv("ACK_FLUSH_INTERVAL", 0.2))
+CONSUMER_SHUTDOWN_TIMEOUT = float(os.getenv("CONSUMER_SHUTDOWN_TIMEOUT", 30))
+RECONNECT_DELAY = float(os.getenv("RABBITMQ_RECONNECT_DELAY", 3))
 
 # Настройка логгера
 logging.basicConfig(
@@ -16,43 +39,206 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def callback(ch, method, properties, body):
+class AckTracker:
     """
-    Callback-функция для обработки сообщений из RabbitMQ.
+    Копит подтверждения и отправляет их одним basic.ack(multiple=True).
+    multiple подтверждает все сообщения канала до указанного тега, поэтому
+    подтверждается только непрерывный префикс уже обработанных сообщений.
     """
-    try:
-        logger.info(f"Received message from queue '{QUEUE_NAME}'")
-        process_notification(body)
-        ch.basic_ack(delivery_tag=method.delivery_tag)  # Подтверждаем обработку сообщения
-        logger.info("Message processed and acknowledged.")
-    except Exception as e:
-        logger.error(f"Error processing message: {e}", exc_info=True)
 
+    def __init__(self):
+        self._pending: deque = deque()  # Сообщения в порядке доставки
+        self._done: set[int] = set()  # Теги обработанных, но ещё не подтверждённых сообщений
+        self._channel = None
+        # Подтверждения с меньшим тегом не должны уйти после большего: повтор тега закрывает канал
+        self._lock = asyncio.Lock()
+
+    def delivered(self, message: AbstractIncomingMessage):
+        if message.channel is not self._channel:
+            # После переподключения теги начинаются заново, старые сообщения брокер доставит повторно
+            self._pending.clear()
+            self._done.clear()
+            self._channel = message.channel
+        self._pending.append(message)
+
+    def settled(self, message: AbstractIncomingMessage):
+        if message.channel is self._channel:
+            self._done.add(message.delivery_tag)
+
+    @property
+    def ready(self) -> int:
+        return len(self._done)
+
+    async def flush(self):
+        async with self._lock:
+            last_acked = None
+            while self._pending and self._pending[0].delivery_tag in self._done:
+                message = self._pending.popleft()
+                self._done.discard(message.delivery_tag)
+                if not message.processed:  # nack уже отправлен отдельно
+                    last_acked = message
+            if last_acked is None:
+                return
+            try:
+                await last_acked.ack(multiple=True)
+            except Exception as e:
+                logger.warning(f"Failed to ack messages up to tag {last_acked.delivery_tag}: {e}")
 
-def start_consumer():
+
+class NotificationConsumer:
     """
-    Запуск потребителя RabbitMQ.
+    Асинхронный потребитель очереди уведомлений: prefetch задаёт окно доставки,
+    CONSUMER_CONCURRENCY обработчиков разбирают сообщения параллельно.
     """
-    parameters = pika.ConnectionParameters(host=RABBITMQ_HOST, port=5672)
 
-    while True:
+    def __init__(self, prefetch: int = CONSUMER_PREFETCH, concurrency: int = CONSUMER_CONCURRENCY):
+        self.prefetch = prefetch
+        self.concurrency = concurrency
+        # Пачка подтверждений не должна быть больше окна prefetch, иначе доставка остановится
+        self.ack_batch_size = max(1, min(ACK_BATCH_SIZE, prefetch))
+        self._buffer: Optional[asyncio.Queue] = None
+        self._acks = AckTracker()
+        self._stopping = asyncio.Event()
+        self._publish_channel: Optional[AbstractChannel] = None
+        self._dlx: Optional[AbstractExchange] = None
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopping.is_set()
+
+    async def wait_stopped(self, timeout: float):
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._stopping.wait(), timeout)
+
+    def stop(self):
+        logger.info("Shutdown requested, draining in-flight messages...")
+        self._stopping.set()
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        self._acks.delivered(message)
+        await self._buffer.put(message)
+
+    async def _forward(self, message: AbstractIncomingMessage, exchange: AbstractExchange, routing_key: str,
+                       attempt: int, error: Exception):
+        """
+        Переносит сообщение в очередь задержки или карантин; исходное будет подтверждено.
+        Если публикация не удалась, сообщение отклоняется и брокер сам отправит его в DLX.
+        """
+        headers = dict(message.headers or {})
+        headers[ATTEMPTS_HEADER] = attempt
+        headers[ERROR_HEADER] = str(error)[:500]
         try:
-            logger.info("Connecting to RabbitMQ...")
+            await exchange.publish(
+                aio_pika.Message(
+                    body=message.body,
+                    headers=headers,
+                    content_type=message.content_type,
+                    message_id=message.message_id,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                ),
+                routing_key=routing_key,
+            )
+        except Exception as publish_error:
+            logger.warning(f"Failed to forward message {message.delivery_tag}, dead-lettering it: {publish_error}")
+            try:
+                await message.nack(requeue=False)
+            except Exception as nack_error:
+                logger.warning(f"Failed to nack message {message.delivery_tag}: {nack_error}")
 
-            connection = pika.BlockingConnection(parameters)
-            channel = connection.channel()
+    async def _handle(self, message: AbstractIncomingMessage):
+        try:
+            await process_notification(message.body, published_at(message))
+        except InvalidNotification as e:
+            # Повтор не поможет: сразу в карантин
+            logger.error(f"Invalid message {message.delivery_tag} quarantined: {e}")
+            await self._forward(message, self._dlx, QUEUE_NAME, attempts(message) + 1, e)
+        except Exception as e:
+            attempt = attempts(message) + 1
+            if attempt >= MAX_ATTEMPTS:
+                logger.error(f"Message {message.delivery_tag} failed {attempt} times, quarantined: {e}")
+                await self._forward(message, self._dlx, QUEUE_NAME, attempt, e)
+            else:
+                # Повтор через очередь с TTL, а не немедленный requeue: сообщение не крутится в цикле
+                logger.warning(f"Message {message.delivery_tag} failed (attempt {attempt}), scheduling retry: {e}")
+                await self._forward(message, self._publish_channel.default_exchange, retry_queue(attempt), attempt, e)
+        self._acks.settled(message)
+        if self._acks.ready >= self.ack_batch_size:
+            await self._acks.flush()
+
+    async def _worker(self):
+        while True:
+            message = await self._buffer.get()
+            try:
+                await self._handle(message)
+            finally:
+                self._buffer.task_done()
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(ACK_FLUSH_INTERVAL)
+            await self._acks.flush()
+
+    async def run(self):
+        # Без политики DLX сообщение, отклонённое при сбое публикации, было бы потеряно:
+        # ошибка здесь откладывает подключение до следующей попытки
+        await apply_dead_letter_policy(RABBITMQ_USER, RABBITMQ_PASSWORD)
+        self._buffer = asyncio.Queue()
+        connection = await aio_pika.connect_robust(
+            host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
+        )
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(self._flusher()))
+        try:
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=self.prefetch)
+
+            # Объявляем очередь вместе с очередями повторов и карантином
+            queue = await declare_topology(channel)
 
-            # Объявляем устойчивую очередь
-            channel.queue_declare(queue=QUEUE_NAME, durable=True)
+            # Повторы и карантин публикуются отдельным каналом с подтверждениями
+            self._publish_channel = await connection.channel(publisher_confirms=True)
+            self._dlx = await self._publish_channel.get_exchange(DLX_NAME)
+            consumer_tag = await queue.consume(self._on_message)
+            logger.info(
+                f"Waiting for messages in queue '{QUEUE_NAME}' "
+                f"(prefetch={self.prefetch}, concurrency={self.concurrency})"
+            )
 
-            # Начинаем прослушивать очередь
-            channel.basic_consume(queue=QUEUE_NAME, on_message_callback=callback)
-            logger.info(f"Waiting for messages in queue '{QUEUE_NAME}'. To exit press CTRL+C")
+            await self._stopping.wait()
 
-            channel.start_consuming()
-        except exceptions.AMQPConnectionError:
-            logger.warning("RabbitMQ is not available. Retrying in 3 seconds...")
-            time.sleep(3)
+            # Новые сообщения больше не принимаем, дожидаемся обработки уже полученных
+            await queue.cancel(consumer_tag)
+            try:
+                await asyncio.wait_for(self._buffer.join(), CONSUMER_SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self._buffer.qsize()} messages left unprocessed, broker will redeliver them")
+            await self._acks.flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await connection.close()
+            logger.info("RabbitMQ connection closed.")
+
+
+async def start_consumer():
+    """
+    Запуск потребителя RabbitMQ до получения SIGTERM/SIGINT.
+    """
+    consumer = NotificationConsumer()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, consumer.stop)
+
+    while not consumer.stopped:
+        try:
+            logger.info("Connecting to RabbitMQ...")
+            await consumer.run()
+        except (aio_pika.exceptions.AMQPConnectionError, httpx.HTTPError, ConnectionError, OSError):
+            logger.warning(f"RabbitMQ is not available. Retrying in {RECONNECT_DELAY} seconds...")
+            await consumer.wait_stopped(RECONNECT_DELAY)
         except Exception as e:
             logger.error(f"Unexpected error: {e}", exc_info=True)
-            time.sleep(3)
+            await consumer.wait_stopped(RECONNECT_DELAY)
+    await pipeline.close()
@@ -0,0 +1,140 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+import httpx
+
+# Настройки бэкендов доставки
+NOTIFICATION_BACKENDS = os.getenv("NOTIFICATION_BACKENDS", "log")
+NOTIFICATION_WEBHOOK_URL = os.getenv("NOTIFICATION_WEBHOOK_URL", "")
+NOTIFICATION_WEBHOOK_TIMEOUT = float(os.getenv("NOTIFICATION_WEBHOOK_TIMEOUT", 5))
+SMTP_SENDER = os.getenv("SMTP_SENDER", "notifications@micros.local")
+SMTP_RECIPIENT_DOMAIN = os.getenv("SMTP_RECIPIENT_DOMAIN", "micros.local")
+
+# Тема письма по виду уведомлений (поле kind); уведомления об откликах приходят без kind
+SMTP_SUBJECTS = {
+    "response": "New responses to your announcements",
+    "match": "Possible matches for your announcements",
+}
+SMTP_DEFAULT_SUBJECT = "New notifications about your announcements"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Digest:
+    """
+    Все уведомления одного пользователя из окна пакетной обработки.
+    """
+    user_id: int
+    notifications: list[dict] = field(default_factory=list)
+
+    @property
+    def content(self) -> str:
+        if len(self.notifications) == 1:
+            return self.notifications[0]["content"]
+        lines = "\n".join(f"- {notification['content']}" for notification in self.notifications)
+        return f"You have {len(self.notifications)} new notifications:\n{lines}"
+
+    @property
+    def kinds(self) -> set[str]:
+        return {notification.get("kind", "response") for notification in self.notifications}
+
+    def to_dict(self) -> dict:
+        return {"user_id": self.user_id, "content": self.content, "notifications": self.notifications}
+
+
+class DeliveryBackend:
+    """
+    Бэкенд доставки получает всю пачку дайджестов за один вызов.
+    """
+    name = "base"
+
+    async def send_batch(self, digests: list[Digest]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LogBackend(DeliveryBackend):
+    name = "log"
+
+    async def send_batch(self, digests: list[Digest]):
+        for digest in digests:
+            logger.info(f"[Notification] User ID: {digest.user_id}, Content: {digest.content}")
+
+
+class WebhookBackend(DeliveryBackend):
+    """
+    Отправляет пачку дайджестов одним POST-запросом с JSON-массивом.
+    """
+    name = "webhook"
+
+    def __init__(self, url: str = NOTIFICATION_WEBHOOK_URL):
+        if not url:
+            raise ValueError("NOTIFICATION_WEBHOOK_URL is required for the webhook backend")
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=NOTIFICATION_WEBHOOK_TIMEOUT)
+
+    async def send_batch(self, digests: list[Digest]):
+        response = await self._client.post(self.url, json=[digest.to_dict() for digest in digests])
+        response.raise_for_status()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class SmtpStubBackend(DeliveryBackend):
+    """
+    Заглушка SMTP: формирует письма для всей пачки в рамках одной "сессии" и пишет их в лог.
+    """
+    name = "smtp"
+
+    def __init__(self):
+        self.sent = 0
+
+    @staticmethod
+    def subject(digest: Digest) -> str:
+        """
+        Тема по видам уведомлений в дайджесте; для разных видов сразу — общая.
+        """
+        kinds = digest.kinds
+        if len(kinds) == 1:
+            return SMTP_SUBJECTS.get(kinds.pop(), SMTP_DEFAULT_SUBJECT)
+        return SMTP_DEFAULT_SUBJECT
+
+    @classmethod
+    def build_message(cls, digest: Digest) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = SMTP_SENDER
+        message["To"] = f"user-{digest.user_id}@{SMTP_RECIPIENT_DOMAIN}"
+        message["Subject"] = cls.subject(digest)
+        message.set_content(digest.content)
+        return message
+
+    async def send_batch(self, digests: list[Digest]):
+        messages = [self.build_message(digest) for digest in digests]
+        self.sent += len(messages)
+        logger.info(f"[SMTP stub] Session delivered {len(messages)} message(s): "
+                    f"{', '.join(message['To'] for message in messages)}")
+
+
+BACKENDS = {
+    LogBackend.name: LogBackend,
+    WebhookBackend.name: WebhookBackend,
+    SmtpStubBackend.name: SmtpStubBackend,
+}
+
+
+def get_backends(names: str = NOTIFICATION_BACKENDS) -> list[DeliveryBackend]:
+    """
+    Создаёт бэкенды по списку имён через запятую, например "log,webhook".
+    """
+    backends = []
+    for name in filter(None, (name.strip() for name in names.split(","))):
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown notification backend: {name}")
+        backends.append(BACKENDS[name]())
+    return backends
@@ -1,6 +1,12 @@
+import asyncio
 import logging
+import os
+from prometheus_client import start_http_server
 from consumer import start_consumer
 
+# Порт, на котором Prometheus собирает метрики сервиса
+METRICS_PORT = int(os.getenv("METRICS_PORT", 8055))
+
 # Настройка логгера
 logging.basicConfig(
     level=logging.INFO,
@@ -10,4 +16,5 @@ logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
     logger.info("Starting Notification Service...")
-    start_consumer()
+    start_http_server(METRICS_PORT)
+    asyncio.run(start_consumer())
@@ -1,28 +1,158 @@
+import asyncio
 import json
 import logging
+import os
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from delivery import DeliveryBackend, Digest, get_backends
+
+# Окно накопления уведомлений и максимальный размер пачки
+NOTIFICATION_BATCH_WINDOW = float(os.getenv("NOTIFICATION_BATCH_WINDOW", 0.5))
+NOTIFICATION_MAX_BATCH = int(os.getenv("NOTIFICATION_MAX_BATCH", 500))
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 
+BATCH_SIZE = Histogram(
+    "notification_batch_size", "Сообщений в одной пачке доставки",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DIGEST_SIZE = Histogram(
+    "notification_digest_size", "Уведомлений, объединённых в один дайджест",
+    buckets=(1, 2, 3, 5, 10, 20, 50),
+)
+DELIVERY_LATENCY = Histogram(
+    "notification_end_to_end_latency_seconds", "Время от публикации сообщения до его доставки",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+BACKEND_SECONDS = Histogram(
+    "notification_backend_send_seconds", "Время отправки пачки бэкендом", ["backend"],
+)
+BACKEND_ERRORS = Counter(
+    "notification_backend_errors_total", "Ошибки отправки пачки бэкендом", ["backend"],
+)
 
-def process_notification(body):
+
+class InvalidNotification(Exception):
     """
-    Обработка уведомления из очереди RabbitMQ.
+    Сообщение не может быть обработано ни при какой попытке (битый JSON, нет обязательных полей).
     """
+
+
+def parse_notification(body) -> dict:
     try:
         message = json.loads(body)
-        user_id = message.get("user_id")
-        content = message.get("content")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise InvalidNotification("Failed to decode message: Invalid JSON format")
+    if not isinstance(message, dict) or not message.get("user_id") or not message.get("content"):
+        raise InvalidNotification("Missing required fields: 'user_id' or 'content'")
+    return message
+
+
+def coalesce(messages: list[dict]) -> list[Digest]:
+    """
+    Объединяет уведомления одного пользователя в дайджест, сохраняя порядок поступления.
+    """
+    digests: dict[int, Digest] = {}
+    for message in messages:
+        digests.setdefault(message["user_id"], Digest(message["user_id"])).notifications.append(message)
+    return list(digests.values())
+
+
+class NotificationPipeline:
+    """
+    Накопитель уведомлений: сообщения собираются в течение окна (или до max_batch),
+    объединяются по user_id и одной пачкой передаются всем бэкендам доставки.
+    submit() завершается после доставки, поэтому сообщение подтверждается в RabbitMQ только
+    вместе со своей пачкой, а ошибка бэкенда возвращает в повтор все её сообщения.
+    """
+
+    def __init__(self, backends: Optional[list[DeliveryBackend]] = None,
+                 window: float = NOTIFICATION_BATCH_WINDOW, max_batch: int = NOTIFICATION_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._backends = backends
+        self._pending: list[tuple[dict, Optional[float], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._deliveries: set[asyncio.Task] = set()
+
+    @property
+    def backends(self) -> list[DeliveryBackend]:
+        if self._backends is None:
+            self._backends = get_backends()
+        return self._backends
+
+    async def submit(self, message: dict, published_at: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, published_at, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        await future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._deliver(batch))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
 
-        if not user_id or not content:
-            raise ValueError("Missing required fields: 'user_id' or 'content'")
+    async def _send(self, backend: DeliveryBackend, digests: list[Digest]):
+        with BACKEND_SECONDS.labels(backend.name).time():
+            try:
+                await backend.send_batch(digests)
+            except Exception:
+                BACKEND_ERRORS.labels(backend.name).inc()
+                raise
 
-        logger.info(f"[Notification] User ID: {user_id}, Content: {content}")
-        # Здесь можно добавить логику отправки уведомлений (например, на email или push-сообщения)
+    async def _deliver(self, batch):
+        BATCH_SIZE.observe(len(batch))
+        digests = coalesce([message for message, _, _ in batch])
+        for digest in digests:
+            DIGEST_SIZE.observe(len(digest.notifications))
+        try:
+            await asyncio.gather(*(self._send(backend, digests) for backend in self.backends))
+        except Exception as e:
+            logger.error(f"Failed to deliver batch of {len(batch)} notifications: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        delivered_at = time.time()
+        for _, published_at, future in batch:
+            if published_at is not None:
+                DELIVERY_LATENCY.observe(max(0.0, delivered_at - published_at))
+            if not future.done():
+                future.set_result(None)
+        logger.info(f"Delivered {len(batch)} notifications as {len(digests)} digest(s)")
 
-    except json.JSONDecodeError:
-        logger.error("Failed to decode message: Invalid JSON format")
-    except ValueError as ve:
-        logger.error(f"Invalid message structure: {ve}")
-    except Exception as e:
-        logger.error(f"Failed to process notification: {e}", exc_info=True)
+    async def close(self):
+        """
+        Доставляет накопленное и закрывает бэкенды.
+        """
+        self.flush()
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        for backend in self._backends or []:
+            await backend.close()
+
+
+pipeline = NotificationPipeline()
+
+
+async def process_notification(body, published_at: Optional[float] = None):
+    """
+    Обработка уведомления из очереди RabbitMQ: проверка и передача в пакетную доставку.
+    InvalidNotification означает сообщение для карантина, остальные ошибки — повод повторить попытку.
+    :param published_at: Время публикации (Unix time) для метрики сквозной задержки.
+    """
+    message = parse_notification(body)
+    await pipeline.submit(message, published_at)
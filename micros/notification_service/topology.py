@@ -0,0 +1,99 @@
+import os
+import re
+from typing import Optional
+from urllib.parse import quote
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractChannel, AbstractQueue
+
+# Имена очередей и обменников уведомлений
+QUEUE_NAME = os.getenv("RABBITMQ_QUEUE_NAME", "notifications")
+DLX_NAME = os.getenv("RABBITMQ_DLX", f"{QUEUE_NAME}.dlx")
+QUARANTINE_QUEUE = os.getenv("RABBITMQ_QUARANTINE_QUEUE", f"{QUEUE_NAME}.quarantine")
+
+# Задержки повторных попыток в секундах: по одной очереди с TTL на каждую ступень
+RETRY_DELAYS = [int(delay) for delay in os.getenv("NOTIFICATION_RETRY_DELAYS", "1,10,60").split(",")]
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 5))
+
+# Заголовок с номером попытки обработки
+ATTEMPTS_HEADER = "x-attempts"
+ERROR_HEADER = "x-error"
+# Время публикации (Unix time с долями секунды), выставляется db_service при отправке из outbox
+PUBLISHED_AT_HEADER = "x-published-at"
+
+# DLX основной очереди задаётся политикой RabbitMQ, а не аргументом x-dead-letter-exchange:
+# очередь уже существует без аргументов, и повторное объявление с другими аргументами
+# завершилось бы PRECONDITION_FAILED у потребителя, ретранслятора outbox и издателя.
+# Все участники объявляют очередь только как durable, без аргументов.
+RABBITMQ_MANAGEMENT_URL = os.getenv("RABBITMQ_MANAGEMENT_URL", "http://rabbitmq:15672")
+RABBITMQ_VHOST = os.getenv("RABBITMQ_VHOST", "/")
+DLX_POLICY_NAME = os.getenv("RABBITMQ_DLX_POLICY", f"{QUEUE_NAME}-dlx")
+
+
+def retry_queue_name(delay: int) -> str:
+    return f"{QUEUE_NAME}.retry.{delay}s"
+
+
+def retry_queue(attempt: int) -> str:
+    """
+    Очередь задержки для следующей попытки: ступени растут с номером попытки, последняя повторяется.
+    """
+    return retry_queue_name(RETRY_DELAYS[min(attempt, len(RETRY_DELAYS)) - 1])
+
+
+def attempts(message: aio_pika.abc.AbstractMessage) -> int:
+    return int((message.headers or {}).get(ATTEMPTS_HEADER, 0))
+
+
+def published_at(message: aio_pika.abc.AbstractMessage) -> Optional[float]:
+    """
+    Время публикации сообщения: заголовок издателя или, если его нет, AMQP timestamp (точность — секунда).
+    """
+    value = (message.headers or {}).get(PUBLISHED_AT_HEADER)
+    if value is not None:
+        return float(value)
+    if message.timestamp is not None:
+        return message.timestamp.timestamp()
+    return None
+
+
+def dead_letter_policy() -> dict:
+    """
+    Политика, направляющая отклонённые сообщения основной очереди в DLX.
+    """
+    return {
+        "pattern": f"^{re.escape(QUEUE_NAME)}$",
+        "apply-to": "queues",
+        "definition": {"dead-letter-exchange": DLX_NAME},
+        "priority": 0,
+    }
+
+
+async def apply_dead_letter_policy(user: str, password: str, client: Optional[httpx.AsyncClient] = None):
+    """
+    Создаёт или обновляет политику DLX через HTTP API управления RabbitMQ (операция идемпотентна).
+    """
+    url = f"{RABBITMQ_MANAGEMENT_URL}/api/policies/{quote(RABBITMQ_VHOST, safe='')}/{quote(DLX_POLICY_NAME, safe='')}"
+    async with (client or httpx.AsyncClient(timeout=5)) as http:
+        response = await http.put(url, json=dead_letter_policy(), auth=(user, password))
+        response.raise_for_status()
+
+
+async def declare_topology(channel: AbstractChannel) -> AbstractQueue:
+    """
+    Объявляет основную очередь, очереди задержки и карантин; возвращает основную очередь.
+    """
+    dlx = await channel.declare_exchange(DLX_NAME, aio_pika.ExchangeType.FANOUT, durable=True)
+    quarantine = await channel.declare_queue(QUARANTINE_QUEUE, durable=True)
+    await quarantine.bind(dlx)
+
+    # Сообщение лежит в очереди задержки до истечения TTL и возвращается в основную очередь
+    for delay in RETRY_DELAYS:
+        await channel.declare_queue(retry_queue_name(delay), durable=True, arguments={
+            "x-message-ttl": delay * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": QUEUE_NAME,
+        })
+
+    return await channel.declare_queue(QUEUE_NAME, durable=True)
@@ -1,6 +1,9 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes import router
+from http_client import start_client, close_client
+from revocation_events import revocation_listener
 from prometheus_fastapi_instrumentator import Instrumentator
 
 # Настройка логгера
@@ -12,10 +15,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+# Жизненный цикл приложения: общий HTTP-клиент и подписка на отзыв токенов создаются при старте и закрываются при остановке
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_client()
+    await revocation_listener.start()
+    yield
+    await revocation_listener.stop()
+    await close_client()
+
+
 # Инициализация FastAPI
 app = FastAPI(
     title="Report Service",
-    description="Сервис для получения отчётов об объявлениях и ответах"
+    description="Сервис для получения отчётов об объявлениях и ответах",
+    lifespan=lifespan
 )
 
 # Подключение маршрутов
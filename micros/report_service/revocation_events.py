@@ -0,0 +1,120 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from typing import Optional
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+
+from http_client import get_client, AUTH_SERVICE_TIMEOUT
+from revocation import revocation_list
+
+# Модуль одинаковый в announcement_service и report_service
+
+# Подключение к RabbitMQ (можно переопределять через переменные окружения)
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
+RABBITMQ_RECONNECT_DELAY = float(os.getenv("RABBITMQ_RECONNECT_DELAY", 3))
+# Fanout-обменник отзывов, в него публикует ретранслятор outbox db_service
+REVOCATIONS_EXCHANGE = os.getenv("AUTH_REVOCATIONS_EXCHANGE", "auth.revocations")
+
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth_service:8001")
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+# Снимок восполняет события, пропущенные при обрыве соединения, и очищает записи об истёкших токенах
+REVOCATION_SNAPSHOT_INTERVAL = float(os.getenv("REVOCATION_SNAPSHOT_INTERVAL", 300))
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationListener:
+    """
+    Поддерживает локальный список отзывов: события из обменника REVOCATIONS_EXCHANGE
+    (у каждого экземпляра своя временная очередь) и периодический снимок из auth_service.
+    Пока RabbitMQ недоступен, отзывы приходят только со снимками.
+    """
+
+    def __init__(self):
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._connection is not None and not self._connection.is_closed:
+            await self._connection.close()
+        self._connection = None
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        async with message.process(ignore_processed=True):
+            try:
+                event = json.loads(message.body)
+                revocation_list.add(event["jti"], event["exp"])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.error("Invalid revocation event, skipped")
+                return
+            logger.info(f"Token revoked by event: {event['jti']}")
+
+    async def _subscribe(self):
+        # connect_robust восстанавливает подписку сам, повторяем только первое подключение
+        while True:
+            connection = None
+            try:
+                connection = await aio_pika.connect_robust(
+                    host=RABBITMQ_HOST, port=RABBITMQ_PORT, login=RABBITMQ_USER, password=RABBITMQ_PASSWORD
+                )
+                channel = await connection.channel()
+                exchange = await channel.declare_exchange(REVOCATIONS_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True)
+                queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+                await queue.bind(exchange)
+                await queue.consume(self._on_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[RabbitMQ] Revocation listener cannot subscribe: {e}")
+                if connection is not None:
+                    await connection.close()
+                await asyncio.sleep(RABBITMQ_RECONNECT_DELAY)
+                continue
+            self._connection = connection
+            logger.info(f"Listening for token revocations on '{REVOCATIONS_EXCHANGE}'")
+            return
+
+    async def load_snapshot(self):
+        headers = {"X-Internal-Token": INTERNAL_API_TOKEN} if INTERNAL_API_TOKEN else {}
+        response = await get_client().get(
+            f"{AUTH_SERVICE_URL}/auth/revocations", headers=headers, timeout=AUTH_SERVICE_TIMEOUT
+        )
+        response.raise_for_status()
+        revocation_list.merge(response.json()["revoked"])
+        logger.info(f"Revocation snapshot loaded: {len(revocation_list)} revoked tokens")
+
+    async def _run(self):
+        subscription = asyncio.create_task(self._subscribe())
+        try:
+            while True:
+                try:
+                    await self.load_snapshot()
+                    delay = REVOCATION_SNAPSHOT_INTERVAL
+                except (httpx.HTTPError, KeyError, ValueError) as e:
+                    logger.warning(f"Failed to load revocation snapshot: {e}")
+                    delay = RABBITMQ_RECONNECT_DELAY
+                await asyncio.sleep(delay)
+        finally:
+            subscription.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await subscription
+
+
+revocation_listener = RevocationListener()
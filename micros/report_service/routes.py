@@ -1,27 +1,53 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from schemas import ReportAnnouncementOut, ReportResponseOut
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from schemas import (
+    ReportAnnouncementPage,
+    ReportResponseOut,
+    ReportCountBucket,
+    ReportPlaceCount,
+    ReportResponseRate,
+    ReportFirstResponseTime,
+    ReportUserActivity
+)
 from utils import (
     get_current_user,
-    get_announcements_by_user,
-    get_announcements_by_type,
+    get_announcements_page,
+    open_export_stream,
     get_responses_by_announcement,
-    get_responses_by_user
+    get_responses_by_user,
+    get_stats
 )
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
-@router.get("/announcements/user/{user_id}", response_model=list[ReportAnnouncementOut])
-async def get_user_announcements(user_id: int, user: dict = Depends(get_current_user)):
+@router.get("/announcements/user/{user_id}", response_model=ReportAnnouncementPage)
+async def get_user_announcements(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
     """
-    Эндпоинт для получения объявлений пользователя.
+    Эндпоинт для получения объявлений пользователя (постранично).
     """
     logger.info(f"Fetching announcements for user {user_id}")
     try:
-        announcements = await get_announcements_by_user(user_id)
-        if not announcements:
+        announcements = await get_announcements_page({
+            "user_id": user_id,
+            "limit": limit,
+            "cursor": cursor,
+            "time_from": time_from.isoformat() if time_from else None,
+            "time_to": time_to.isoformat() if time_to else None,
+        })
+        if not announcements["items"] and not cursor:
             logger.warning(f"No announcements found for user {user_id}")
             raise HTTPException(status_code=404, detail="No announcements found")
         logger.info(f"Successfully fetched announcements for user {user_id}")
@@ -31,17 +57,28 @@ async def get_user_announcements(user_id: int, user: dict = Depends(get_current_
         raise
 
 
-@router.get("/announcements/type", response_model=list[ReportAnnouncementOut])
+@router.get("/announcements/type", response_model=ReportAnnouncementPage)
 async def get_announcements_by_type_router(
-    item_type: bool, user: dict = Depends(get_current_user)
+    item_type: bool,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
 ):
     """
-    Эндпоинт для получения объявлений по типу.
+    Эндпоинт для получения объявлений по типу (постранично).
     """
     logger.info(f"Fetching announcements of type {item_type}")
     try:
-        announcements = await get_announcements_by_type(item_type)
-        if not announcements:
+        announcements = await get_announcements_page({
+            "type": item_type,
+            "limit": limit,
+            "cursor": cursor,
+            "time_from": time_from.isoformat() if time_from else None,
+            "time_to": time_to.isoformat() if time_to else None,
+        })
+        if not announcements["items"] and not cursor:
             logger.warning(f"No announcements found for type {item_type}")
             raise HTTPException(status_code=404, detail="No announcements found")
         logger.info(f"Successfully fetched announcements for type {item_type}")
@@ -90,3 +127,138 @@ async def get_responses_by_user_router(
         logger.error(f"Error fetching responses for user {user_id}: {e.detail}")
         raise
 
+
+async def relay_export(path: str, params: dict, filename: str) -> StreamingResponse:
+    """
+    Передаёт выгрузку из базы данных клиенту по частям, не накапливая её в памяти.
+    """
+    upstream = await open_export_stream(path, params)
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        media_type=upstream.headers.get("content-type"),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{params["format"]}"'},
+        background=BackgroundTask(upstream.aclose)
+    )
+
+
+@router.get("/export/announcements")
+async def export_announcements(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    type: Optional[bool] = None,
+    place: Optional[str] = None,
+    user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для потоковой выгрузки объявлений в NDJSON или CSV.
+    """
+    logger.info(f"Exporting announcements as {format}")
+    return await relay_export("/announcements/export", {
+        "format": format,
+        "type": type,
+        "place": place,
+        "user_id": user_id,
+        "time_from": time_from.isoformat() if time_from else None,
+        "time_to": time_to.isoformat() if time_to else None,
+    }, "announcements")
+
+
+@router.get("/export/responses")
+async def export_responses(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    announcement_id: Optional[int] = None,
+    responding_user_id: Optional[int] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для потоковой выгрузки откликов в NDJSON или CSV.
+    """
+    logger.info(f"Exporting responses as {format}")
+    return await relay_export("/responses/export", {
+        "format": format,
+        "announcement_id": announcement_id,
+        "responding_user_id": responding_user_id,
+        "time_from": time_from.isoformat() if time_from else None,
+        "time_to": time_to.isoformat() if time_to else None,
+    }, "responses")
+
+
+def time_range(time_from: Optional[datetime], time_to: Optional[datetime]) -> dict:
+    return {
+        "time_from": time_from.isoformat() if time_from else None,
+        "time_to": time_to.isoformat() if time_to else None,
+    }
+
+
+@router.get("/stats/announcements/counts", response_model=list[ReportCountBucket])
+async def get_announcement_counts(
+    bucket: Literal["day", "week"] = "day",
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для получения числа объявлений каждого типа по дням или неделям.
+    """
+    logger.info(f"Fetching announcement counts by {bucket}")
+    return await get_stats("/announcements/counts", {"bucket": bucket, **time_range(time_from, time_to)})
+
+
+@router.get("/stats/places/top", response_model=list[ReportPlaceCount])
+async def get_top_places(
+    limit: int = Query(10, ge=1, le=100),
+    type: Optional[bool] = None,
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для получения мест с наибольшим числом объявлений.
+    """
+    logger.info(f"Fetching top {limit} places")
+    return await get_stats("/places/top", {"limit": limit, "type": type, **time_range(time_from, time_to)})
+
+
+@router.get("/stats/responses/rate", response_model=ReportResponseRate)
+async def get_response_rate(
+    limit: int = Query(10, ge=1, le=100),
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для получения доли объявлений с откликами и самых обсуждаемых объявлений.
+    """
+    logger.info("Fetching response rate")
+    return await get_stats("/responses/rate", {"limit": limit, **time_range(time_from, time_to)})
+
+
+@router.get("/stats/responses/first-response-time", response_model=ReportFirstResponseTime)
+async def get_first_response_time(
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для получения медианы времени до первого отклика.
+    """
+    logger.info("Fetching median time to first response")
+    return await get_stats("/responses/first-response-time", time_range(time_from, time_to))
+
+
+@router.get("/stats/users/active", response_model=list[ReportUserActivity])
+async def get_active_users(
+    limit: int = Query(10, ge=1, le=100),
+    time_from: Optional[datetime] = None,
+    time_to: Optional[datetime] = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Эндпоинт для получения самых активных пользователей.
+    """
+    logger.info(f"Fetching top {limit} active users")
+    return await get_stats("/users/active", {"limit": limit, **time_range(time_from, time_to)})
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 
 class ReportAnnouncementOut(BaseModel):
     id: int
@@ -9,9 +10,45 @@ class ReportAnnouncementOut(BaseModel):
     time: datetime
     type: bool  # True = Найдено, False = Потеряно
 
+class ReportAnnouncementPage(BaseModel):
+    items: list[ReportAnnouncementOut]
+    next_cursor: Optional[str] = None
+
 class ReportResponseOut(BaseModel):
     id: int
     announcement_id: int
     responding_user_id: int
     message: str
     time: datetime
+
+class ReportCountBucket(BaseModel):
+    period: date
+    type: bool
+    count: int
+
+class ReportPlaceCount(BaseModel):
+    place: str
+    count: int
+
+class ReportAnnouncementResponses(BaseModel):
+    announcement_id: int
+    item: str
+    responses: int
+
+class ReportResponseRate(BaseModel):
+    announcements: int
+    answered: int
+    rate: float
+    avg_responses: float
+    top: list[ReportAnnouncementResponses]
+
+class ReportFirstResponseTime(BaseModel):
+    announcements: int
+    median_seconds: Optional[float] = None
+
+class ReportUserActivity(BaseModel):
+    user_id: int
+    username: str
+    announcements: int
+    responses: int
+    total: int
@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from prometheus_client import Counter, Gauge
+
+from singleflight import SingleFlight
+
+# Настройки кэша агрегатов для отчётов (можно переопределять через переменные окружения)
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", 60))
+STATS_CACHE_MAX_SIZE = int(os.getenv("STATS_CACHE_MAX_SIZE", 1000))
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_REQUESTS = Counter("stats_cache_requests_total", "Обращения к кэшу агрегатов", ["result"])
+STATS_CACHE_SIZE = Gauge("stats_cache_size", "Количество записей в кэше агрегатов")
+
+
+class StatsCache:
+    """
+    LRU-кэш агрегатов с TTL: дашборды опрашивают одни и те же отчёты,
+    и в течение TTL они отдаются без запросов к db_service.
+    Одновременные промахи по одному ключу объединяются в один запрос.
+    """
+
+    def __init__(self, ttl: float = STATS_CACHE_TTL, max_size: int = STATS_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def key(path: str, params: dict) -> str:
+        return path + "?" + json.dumps(params, sort_keys=True, default=str)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        STATS_CACHE_SIZE.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        STATS_CACHE_SIZE.set(0)
+
+    async def get_or_load(self, path: str, params: dict, load: Callable[[], Awaitable[Any]]):
+        """
+        Возвращает агрегат из кэша или загружает его через load(); ошибки не кэшируются.
+        """
+        key = self.key(path, params)
+        value = self._get(key)
+        if value is not None:
+            STATS_CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+
+        async def fill():
+            result = await load()
+            self._put(key, result)
+            return result
+
+        value, shared = await self._flight.do(key, fill)
+        STATS_CACHE_REQUESTS.labels(result="coalesced" if shared else "miss").inc()
+        return value
+
+
+stats_cache = StatsCache()
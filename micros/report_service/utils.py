@@ -2,69 +2,71 @@ from fastapi import HTTPException, Security
 import httpx
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from logging import getLogger
+from http_client import get_client
+from token_verifier import verify_token
+from token_cache import token_cache
+from revocation import revocation_list
+from stats_cache import stats_cache
 
 DATABASE_SERVICE_URL = "http://db_service:8090"
-AUTH_SERVICE_URL = "http://auth_service:8001/auth/verify-token"
 
 security = HTTPBearer()
 logger = getLogger(__name__)
 
 async def get_current_user(authorization: HTTPAuthorizationCredentials = Security(security)):
     """
-    Проверяет токен через сервис авторизации.
+    Проверяет токен (с кэшем результатов) локально по ключам сервиса авторизации или через сам сервис.
     """
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                AUTH_SERVICE_URL,
-                headers={"Authorization": f"Bearer {authorization.credentials}"}
-            )
-            if response.status_code != 200:
-                logger.warning(f"Authorization failed: {response.json()}")
-                raise HTTPException(status_code=401, detail="Invalid token")
-            logger.info("User successfully authorized")
-            return response.json()
-    except httpx.RequestError as exc:
-        logger.error(f"Authorization service unavailable: {exc}")
-        raise HTTPException(status_code=503, detail="Authorization service unavailable")
+    user = await token_cache.get_or_verify(authorization.credentials, verify_token)
+    if revocation_list.is_revoked(user.get("jti")):
+        logger.warning(f"Revoked token used by user {user['user_id']}")
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    logger.info("User successfully authorized")
+    return user
 
 
-async def get_announcements_by_user(user_id: int):
+async def get_announcements_page(params: dict):
     """
-    Получает список объявлений пользователя из базы данных.
+    Получает страницу объявлений из базы данных (фильтры и курсор как у GET /announcements/).
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{DATABASE_SERVICE_URL}/announcements/user/{user_id}")
-            if response.status_code != 200:
-                logger.warning(f"Announcements not found for user {user_id}: {response.json()}")
-                raise HTTPException(status_code=response.status_code, detail="Announcements not found")
-            logger.info(f"Announcements fetched for user {user_id}")
-            return response.json()
+        client = get_client()
+        response = await client.get(
+            f"{DATABASE_SERVICE_URL}/announcements/",
+            params={key: value for key, value in params.items() if value is not None}
+        )
+        if response.status_code != 200:
+            logger.warning(f"Announcements not found for {params}: {response.json()}")
+            raise HTTPException(status_code=response.status_code, detail="Announcements not found")
+        logger.info(f"Announcements page fetched for {params}")
+        return response.json()
     except httpx.RequestError as exc:
-        logger.error(f"Database service unavailable while fetching announcements for user {user_id}: {exc}")
+        logger.error(f"Database service unavailable while fetching announcements for {params}: {exc}")
         raise HTTPException(status_code=503, detail="Database service unavailable")
 
 
-async def get_announcements_by_type(item_type: bool):
+async def open_export_stream(path: str, params: dict) -> httpx.Response:
     """
-    Получает список объявлений из базы данных по типу.
-    - `item_type`: True для найденных предметов, False для потерянных.
+    Открывает потоковую выгрузку из базы данных. Ответ нужно закрыть после передачи клиенту.
     """
+    client = get_client()
+    request = client.build_request(
+        "GET",
+        f"{DATABASE_SERVICE_URL}{path}",
+        params={key: value for key, value in params.items() if value is not None}
+    )
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{DATABASE_SERVICE_URL}/announcements/type/",
-                params={"item_type": item_type}
-            )
-            if response.status_code != 200:
-                logger.warning(f"Announcements of type {item_type} not found: {response.json()}")
-                raise HTTPException(status_code=response.status_code, detail="Announcements not found")
-            logger.info(f"Announcements of type {item_type} fetched successfully")
-            return response.json()
+        response = await client.send(request, stream=True)
     except httpx.RequestError as exc:
-        logger.error(f"Database service unavailable while fetching announcements of type {item_type}: {exc}")
+        logger.error(f"Database service unavailable while exporting {path}: {exc}")
         raise HTTPException(status_code=503, detail="Database service unavailable")
+    if response.status_code != 200:
+        await response.aread()
+        await response.aclose()
+        logger.warning(f"Export {path} failed: {response.status_code}")
+        raise HTTPException(status_code=response.status_code, detail="Export failed")
+    logger.info(f"Export stream opened for {path} with {params}")
+    return response
 
 
 async def get_responses_by_announcement(announcement_id: int):
@@ -72,13 +74,13 @@ async def get_responses_by_announcement(announcement_id: int):
     Получает отклики на объявление из базы данных.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{DATABASE_SERVICE_URL}/responses/announcement/{announcement_id}")
-            if response.status_code != 200:
-                logger.warning(f"Responses not found for announcement {announcement_id}: {response.json()}")
-                raise HTTPException(status_code=response.status_code, detail="Responses not found")
-            logger.info(f"Responses fetched for announcement {announcement_id}")
-            return response.json()
+        client = get_client()
+        response = await client.get(f"{DATABASE_SERVICE_URL}/responses/announcement/{announcement_id}")
+        if response.status_code != 200:
+            logger.warning(f"Responses not found for announcement {announcement_id}: {response.json()}")
+            raise HTTPException(status_code=response.status_code, detail="Responses not found")
+        logger.info(f"Responses fetched for announcement {announcement_id}")
+        return response.json()
     except httpx.RequestError as exc:
         logger.error(f"Database service unavailable while fetching responses for announcement {announcement_id}: {exc}")
         raise HTTPException(status_code=503, detail="Database service unavailable")
@@ -89,13 +91,34 @@ async def get_responses_by_user(user_id: int):
     Получает отклики пользователя из базы данных.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{DATABASE_SERVICE_URL}/responses/user/{user_id}")
-            if response.status_code != 200:
-                logger.warning(f"Responses not found for user {user_id}: {response.json()}")
-                raise HTTPException(status_code=response.status_code, detail="Responses not found")
-            logger.info(f"Responses fetched for user {user_id}")
-            return response.json()
+        client = get_client()
+        response = await client.get(f"{DATABASE_SERVICE_URL}/responses/user/{user_id}")
+        if response.status_code != 200:
+            logger.warning(f"Responses not found for user {user_id}: {response.json()}")
+            raise HTTPException(status_code=response.status_code, detail="Responses not found")
+        logger.info(f"Responses fetched for user {user_id}")
+        return response.json()
     except httpx.RequestError as exc:
         logger.error(f"Database service unavailable while fetching responses for user {user_id}: {exc}")
         raise HTTPException(status_code=503, detail="Database service unavailable")
+
+
+async def get_stats(path: str, params: dict):
+    """
+    Получает агрегат из базы данных (GET /stats{path}); результаты кэшируются на STATS_CACHE_TTL.
+    """
+    params = {key: value for key, value in params.items() if value is not None}
+
+    async def load():
+        try:
+            response = await get_client().get(f"{DATABASE_SERVICE_URL}/stats{path}", params=params)
+        except httpx.RequestError as exc:
+            logger.error(f"Database service unavailable while fetching stats {path}: {exc}")
+            raise HTTPException(status_code=503, detail="Database service unavailable")
+        if response.status_code != 200:
+            logger.warning(f"Stats {path} failed for {params}: {response.status_code}")
+            raise HTTPException(status_code=response.status_code, detail="Stats unavailable")
+        logger.info(f"Stats {path} fetched for {params}")
+        return response.json()
+
+    return await stats_cache.get_or_load(path, params, load)
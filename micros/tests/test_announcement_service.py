@@ -35,9 +35,12 @@ async def create_announcement(
 
 @app.get("/announcements/")
 async def list_announcements():
-    return [
-        {"id": 1, "user_id": 1, "item": "Phone", "place": "Park", "type": False, "time": "2023-12-01T10:00:00"}
-    ]
+    return {
+        "items": [
+            {"id": 1, "user_id": 1, "item": "Phone", "place": "Park", "type": False, "time": "2023-12-01T10:00:00"}
+        ],
+        "next_cursor": None,
+    }
 
 @app.get("/announcements/{announcement_id}")
 async def get_announcement(announcement_id: int):
@@ -88,8 +91,9 @@ def test_list_announcements():
     response = client.get("/announcements/")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 1
-    assert data[0]["item"] == "Phone"
+    assert len(data["items"]) == 1
+    assert data["items"][0]["item"] == "Phone"
+    assert data["next_cursor"] is None
 
 def test_get_announcement_success():
     """
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "auth_service"))
+
+from rate_limit import TokenBucketLimiter  # noqa: E402
+from user_cache import UserCache  # noqa: E402
+
+
+class FakeDbService:
+    """
+    Заглушка db_service: считает запросы пользователя по имени.
+    """
+
+    def __init__(self, users: dict):
+        self.users = users
+        self.calls = 0
+
+    async def __call__(self, username: str):
+        self.calls += 1
+        user = self.users.get(username)
+        await asyncio.sleep(0.01)
+        return user
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_lookup():
+    cache = UserCache(ttl=60)
+    db = FakeDbService({"alice": {"id": 1, "username": "alice", "hashed_password": "hash"}})
+    results = await asyncio.gather(*(cache.get_or_fetch("alice", db) for _ in range(50)))
+    assert results == [{"id": 1, "hashed_password": "hash"}] * 50
+    assert await cache.get_or_fetch("alice", db) == {"id": 1, "hashed_password": "hash"}
+    assert db.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_username_is_cached_until_registration():
+    cache = UserCache(ttl=60, negative_ttl=60)
+    db = FakeDbService({})
+    assert await cache.get_or_fetch("bob", db) is None
+    assert await cache.get_or_fetch("bob", db) is None
+    assert db.calls == 1
+
+    db.users["bob"] = {"id": 2, "hashed_password": "hash"}
+    cache.invalidate(["bob"])
+    assert await cache.get_or_fetch("bob", db) == {"id": 2, "hashed_password": "hash"}
+    assert db.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_started_before_invalidation_is_not_cached():
+    cache = UserCache(ttl=60)
+    db = FakeDbService({"alice": {"id": 1, "hashed_password": "old"}})
+    pending = asyncio.create_task(cache.get_or_fetch("alice", db))
+    while not db.calls:  # запрос к db_service начался
+        await asyncio.sleep(0)
+    db.users["alice"] = {"id": 1, "hashed_password": "new"}
+    cache.clear()
+    assert (await pending)["hashed_password"] == "old"
+    assert (await cache.get_or_fetch("alice", db))["hashed_password"] == "new"
+
+
+def test_token_bucket_blocks_burst_and_refills():
+    now = [0.0]
+    limiter = TokenBucketLimiter(burst=3, per_minute=6, clock=lambda: now[0])
+    for _ in range(3):
+        assert limiter.retry_after("alice") == 0
+        limiter.consume("alice")
+    assert limiter.retry_after("alice") == pytest.approx(10)
+    assert limiter.retry_after("bob") == 0
+
+    now[0] += 10
+    assert limiter.retry_after("alice") == 0
@@ -0,0 +1,139 @@
+import os
+import sys
+from datetime import datetime
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import routes  # noqa: E402
+from database import Base, get_db  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "username": f"user{user_id}", "hashed_password": "x"} for user_id in (1, 2, 3)
+        ])
+        await conn.execute(models.Announcement.__table__.insert(), [
+            {"id": 1, "user_id": 1, "item": "Keys", "place": "Park", "time": datetime(2024, 1, 1), "type": False},
+            {"id": 2, "user_id": 2, "item": "Phone", "place": "Mall", "time": datetime(2024, 1, 2), "type": True},
+            {"id": 3, "user_id": 1, "item": "Bag", "place": "Park", "time": datetime(2024, 1, 3), "type": True},
+        ])
+        await conn.execute(models.Response.__table__.insert(), [
+            {"id": 1, "announcement_id": 1, "responding_user_id": 3, "message": "later", "time": datetime(2024, 1, 5)},
+            {"id": 2, "announcement_id": 1, "responding_user_id": 2, "message": "first", "time": datetime(2024, 1, 4)},
+            {"id": 3, "announcement_id": 2, "responding_user_id": 1, "message": "mine", "time": datetime(2024, 1, 4)},
+        ])
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(engine):
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(routes.users_router)
+    app.include_router(routes.announcements_router)
+    app.dependency_overrides[get_db] = get_test_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def statements(engine):
+    """
+    SQL-запросы, выполненные во время теста.
+    """
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+
+@pytest.mark.asyncio
+async def test_users_batch_keeps_request_order_and_skips_unknown_ids(client, statements):
+    response = await client.get("/users/batch", params={"ids": "3,99,1,3,2"})
+
+    assert response.status_code == 200
+    # Повторный id возвращается один раз, на месте первого упоминания
+    assert [user["username"] for user in response.json()] == ["user3", "user1", "user2"]
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_announcements_batch_keeps_request_order_without_includes(client, statements):
+    response = await client.get("/announcements/batch", params={"ids": "3, 42, 1, 3"})
+
+    assert response.status_code == 200
+    items = response.json()
+    assert [item["id"] for item in items] == [3, 1]
+    assert items[0]["user"] is None and items[0]["responses"] is None
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("include, queries", [("user", 1), ("responses", 2), ("user,responses", 2)])
+async def test_announcements_batch_loads_includes_in_at_most_two_queries(client, statements, include, queries):
+    response = await client.get("/announcements/batch", params={"ids": "2,1,3", "include": include})
+
+    assert response.status_code == 200
+    items = {item["id"]: item for item in response.json()}
+    assert list(items) == [2, 1, 3]
+    if "user" in include:
+        assert [items[i]["user"] for i in (2, 1)] == [{"id": 2, "username": "user2"}, {"id": 1, "username": "user1"}]
+    if "responses" in include:
+        assert [response["message"] for response in items[1]["responses"]] == ["first", "later"]
+        assert items[3]["responses"] == []
+    # Число запросов не зависит от числа объявлений в пачке
+    assert len(statements) == queries
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/users/batch", "/announcements/batch"])
+@pytest.mark.parametrize("ids", ["", " , ", "1,x", "1.5"])
+async def test_batch_rejects_malformed_ids(client, statements, path, ids):
+    response = await client.get(path, params={"ids": ids})
+
+    assert response.status_code == 400
+    assert statements == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/users/batch", "/announcements/batch"])
+async def test_batch_rejects_too_many_ids(client, statements, monkeypatch, path):
+    monkeypatch.setattr(routes, "BATCH_MAX_IDS", 3)
+
+    assert (await client.get(path, params={"ids": "1,2,3,1"})).status_code == 200
+    response = await client.get(path, params={"ids": "1,2,3,4"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "At most 3 ids per request"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("include", ["author", "user,comments", "USER"])
+async def test_announcements_batch_rejects_unknown_include(client, statements, include):
+    response = await client.get("/announcements/batch", params={"ids": "1", "include": include})
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown include")
+    assert statements == []
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import bulk  # noqa: E402
+import models  # noqa: E402
+import rollups  # noqa: E402
+import schemas  # noqa: E402
+import write_queue  # noqa: E402
+from database import Base  # noqa: E402
+
+
+class FakeRequest:
+    """
+    Запрос с телом NDJSON, которое приходит частями произвольной длины.
+    """
+
+    def __init__(self, lines: list[str], part_size: int = 7):
+        self.headers = {"content-type": "application/x-ndjson"}
+        self._body = "\n".join(lines).encode()
+        self._part_size = part_size
+
+    async def stream(self):
+        for start in range(0, len(self._body), self._part_size):
+            yield self._body[start:start + self._part_size]
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "x"}])
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(write_queue, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_reports_each_row_and_updates_rollups(sessions):
+    lines = [
+        json.dumps({"user_id": 1, "item": "Keys", "place": "Park", "type": False, "time": "2024-01-01T10:00:00"}),
+        "not json",
+        json.dumps({"user_id": 2, "item": "Phone", "place": "Mall", "type": True}),
+        json.dumps({"user_id": 1, "item": "Wallet", "place": "Mall", "type": True, "time": "2024-01-02T10:00:00"}),
+        json.dumps({"item": "Bag"}),
+        json.dumps({"user_id": 1, "item": "Bag", "place": "Park", "type": True, "time": "2024-01-02T11:00:00"}),
+    ]
+    result = await bulk.bulk_insert(
+        FakeRequest(lines), schemas.AnnouncementCreate, lambda chunk: bulk.insert_announcements(chunk, False), "test"
+    )
+    assert (result["created"], result["failed"]) == (3, 3)
+    assert [row["status"] for row in result["results"]] == ["created", "error", "error", "created", "error", "created"]
+    assert result["results"][2]["detail"] == "User not found"
+
+    async with sessions() as session:
+        items = {row.id: row.item for row in await session.scalars(select(models.Announcement))}
+        assert [items[row["id"]] for row in result["results"] if row["status"] == "created"] == ["Keys", "Wallet", "Bag"]
+
+        responses = [
+            {"announcement_id": announcement_id, "responding_user_id": 1, "message": "hi"}
+            for announcement_id in (1, 1, 2, 99)
+        ]
+        result = await bulk.bulk_insert(
+            FakeRequest([json.dumps(row) for row in responses]), schemas.ResponseCreate, bulk.insert_responses, "test"
+        )
+        assert (result["created"], result["failed"]) == (3, 1)
+        assert await session.scalar(select(func.count()).select_from(models.OutboxMessage)) == 3
+
+        incremental = [(await session.execute(select(table))).all() for table in (rollups.daily, rollups.per_announcement)]
+        await session.run_sync(lambda sync_session: rollups.rebuild_rollups(sync_session.connection()))
+        assert [(await session.execute(select(table))).all() for table in (rollups.daily, rollups.per_announcement)] == incremental
+
+
+@pytest.mark.asyncio
+async def test_bulk_chunks_are_committed_by_the_single_writer(sessions, monkeypatch):
+    queue = write_queue.WriteQueue(enabled=True)
+    monkeypatch.setattr(bulk, "write_queue", queue)
+    writers = []
+    record_announcements = rollups.record_announcements
+
+    async def record(session, rows):
+        writers.append(asyncio.current_task())
+        await record_announcements(session, rows)
+
+    monkeypatch.setattr(rollups, "record_announcements", record)
+    await queue.start()
+    try:
+        lines = [
+            json.dumps({"user_id": 1, "item": f"Item {n}", "place": "Park", "type": False}) for n in range(5)
+        ]
+        result = await bulk.bulk_insert(
+            FakeRequest(lines), schemas.AnnouncementCreate, lambda chunk: bulk.insert_announcements(chunk, False), "test"
+        )
+    finally:
+        await queue.stop()
+
+    assert result["created"] == 5
+    # Три пачки по BULK_CHUNK_SIZE=2, каждая — транзакцией задачи писателя
+    assert len(writers) == 3 and all(task is writers[0] for task in writers)
+    assert writers[0] is not asyncio.current_task()
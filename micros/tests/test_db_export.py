@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import export  # noqa: E402
+import models  # noqa: E402
+import routes  # noqa: E402
+from database import Base  # noqa: E402
+
+ANNOUNCEMENTS = [
+    {"id": 1, "user_id": 1, "item": 'Keys, "blue"', "place": "Park", "time": datetime(2024, 1, 1, 9), "type": False},
+    {"id": 2, "user_id": 2, "item": "Phone\nwith case", "place": "Mall", "time": datetime(2024, 1, 2, 9), "type": True},
+    {"id": 3, "user_id": 1, "item": "Зонт", "place": "Park", "time": datetime(2024, 1, 3, 9), "type": True},
+    {"id": 4, "user_id": 1, "item": "Bag", "place": "Station", "time": datetime(2024, 1, 4, 9), "type": True},
+    {"id": 5, "user_id": 2, "item": "Wallet", "place": "Park", "time": datetime(2024, 1, 5, 9), "type": True},
+]
+COLUMNS = [column.name for column in models.Announcement.__table__.columns]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'export.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "username": f"user{user_id}", "hashed_password": "x"} for user_id in (1, 2)
+        ])
+        conn.execute(models.Announcement.__table__.insert(), ANNOUNCEMENTS)
+        conn.execute(models.Response.__table__.insert(), [
+            {"announcement_id": 1, "responding_user_id": 2, "message": 'It\'s mine, "really"', "time": datetime(2024, 1, 6)},
+            {"announcement_id": 3, "responding_user_id": 2, "message": "Found it", "time": datetime(2024, 1, 7)},
+        ])
+    engine.dispose()
+
+    # Соединения открываются в цикле событий TestClient и закрываются после каждой выгрузки
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    monkeypatch.setattr(export, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    # Несколько порций серверного курсора на выгрузку
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    app = FastAPI()
+    app.include_router(routes.announcements_router)
+    app.include_router(routes.responses_router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_csv_export_has_header_and_escapes_values(client):
+    response = client.get("/announcements/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == COLUMNS
+    assert len(rows) == len(ANNOUNCEMENTS) + 1
+    records = [dict(zip(rows[0], row)) for row in rows[1:]]
+    # Запятые, кавычки и переводы строк экранированы и читаются обратно без изменений
+    assert [record["item"] for record in records] == [announcement["item"] for announcement in ANNOUNCEMENTS]
+    assert records[0]["time"] == "2024-01-01T09:00:00"
+
+
+def test_csv_export_applies_filters(client):
+    response = client.get("/announcements/export", params={
+        "format": "csv", "type": True, "place": "Park", "time_from": "2024-01-02T00:00:00",
+    })
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == COLUMNS
+    assert [row[0] for row in rows[1:]] == ["3", "5"]
+
+
+def test_csv_export_of_empty_result_has_only_header(client):
+    response = client.get("/announcements/export", params={"format": "csv", "user_id": 99})
+
+    assert list(csv.reader(io.StringIO(response.text))) == [COLUMNS]
+
+
+def test_ndjson_export_applies_filters(client):
+    response = client.get("/announcements/export", params={"user_id": 1, "time_to": "2024-01-04T00:00:00"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 2
+    assert [json.loads(line) for line in lines] == [
+        {**announcement, "time": announcement["time"].isoformat()}
+        for announcement in ANNOUNCEMENTS if announcement["id"] in (1, 3)
+    ]
+
+
+def test_ndjson_export_keeps_one_object_per_line(client):
+    response = client.get("/announcements/export")
+
+    lines = response.text.split("\n")
+    assert lines[-1] == ""  # каждая строка завершается переводом строки
+    items = [json.loads(line)["item"] for line in lines[:-1]]
+    assert items == [announcement["item"] for announcement in ANNOUNCEMENTS]
+
+
+def test_responses_export_in_both_formats(client):
+    ndjson = client.get("/responses/export", params={"responding_user_id": 2, "announcement_id": 1})
+    [response] = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert response["message"] == 'It\'s mine, "really"'
+
+    rows = list(csv.reader(io.StringIO(client.get("/responses/export", params={"format": "csv"}).text)))
+    assert rows[0] == [column.name for column in models.Response.__table__.columns]
+    assert [row[rows[0].index("message")] for row in rows[1:]] == ['It\'s mine, "really"', "Found it"]
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/announcements/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import matching  # noqa: E402
+import models  # noqa: E402
+import routes  # noqa: E402
+import write_queue  # noqa: E402
+from database import Base, get_db  # noqa: E402
+from outbox import utcnow  # noqa: E402
+
+
+class GatedSessions:
+    """
+    Фабрика сессий, которая открывает сессию только после release: пересборка индекса ждёт тест.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.release = asyncio.Event()
+        self.release.set()
+        self.opened = asyncio.Event()
+
+    @contextlib.asynccontextmanager
+    async def __call__(self):
+        self.opened.set()
+        await self.release.wait()
+        async with self.factory() as session:
+            yield session
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "username": f"user{user_id}", "hashed_password": "x"} for user_id in (1, 2, 3)
+        ])
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(write_queue, "AsyncSessionLocal", factory)
+    queue = write_queue.WriteQueue(enabled=True)
+    monkeypatch.setattr(routes, "write_queue", queue)
+    monkeypatch.setattr(matching, "AsyncSessionLocal", GatedSessions(factory))
+    monkeypatch.setattr(routes, "matching_engine", matching.MatchingEngine())
+    await queue.start()
+    yield factory
+    await queue.stop()
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def client(sessions):
+    async def get_test_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(routes.announcements_router)
+    app.include_router(routes.matching_router)
+    app.dependency_overrides[get_db] = get_test_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def announce(client, user_id: int, item: str, place: str, type: bool, **extra) -> int:
+    response = await client.post("/announcements/", json={
+        "user_id": user_id, "item": item, "place": place, "type": type, **extra
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def notifications(sessions) -> list[dict]:
+    async with sessions() as session:
+        messages = await session.scalars(select(models.OutboxMessage).order_by(models.OutboxMessage.id))
+        return [json.loads(message.payload) for message in messages]
+
+
+@pytest.mark.asyncio
+async def test_new_announcement_notifies_both_authors_through_outbox(client, sessions):
+    lost = await announce(client, 1, "Black leather wallet", "Central park", type=False)
+    assert await notifications(sessions) == []
+
+    found = await announce(client, 2, "black wallet", "central park", type=True)
+
+    new_author, matched_author = await notifications(sessions)
+    assert new_author["user_id"] == 2 and matched_author["user_id"] == 1
+    assert (new_author["announcement_id"], new_author["matched_announcement_id"]) == (found, lost)
+    assert (matched_author["announcement_id"], matched_author["matched_announcement_id"]) == (lost, found)
+    assert new_author["kind"] == matched_author["kind"] == "match"
+    assert new_author["score"] == matched_author["score"] > matching.MATCH_MIN_SCORE
+
+
+@pytest.mark.asyncio
+async def test_own_and_unrelated_announcements_are_not_matched(client, sessions):
+    await announce(client, 1, "Black wallet", "Park", type=False)
+    await announce(client, 1, "Black wallet", "Park", type=True)
+    await announce(client, 2, "Umbrella", "Bus stop", type=True)
+
+    assert await notifications(sessions) == []
+
+
+@pytest.mark.asyncio
+async def test_matches_endpoint_lists_opposite_type_candidates(client):
+    lost = await announce(client, 1, "Black wallet", "Central park", type=False)
+    found = await announce(client, 2, "Black wallet", "Central park", type=True)
+    await announce(client, 3, "Brown wallet", "Airport", type=True)
+
+    response = await client.get(f"/announcements/{lost}/matches")
+
+    assert response.status_code == 200
+    [match] = response.json()
+    assert match["announcement"]["id"] == found and match["score"] == 1.0
+    assert (await client.get("/announcements/999/matches")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_rebuild_restores_index_from_database_with_same_window_positions(client):
+    # Время со смещением и время по умолчанию: после пересборки сравниваются так же, как до неё
+    await announce(client, 1, "Phone", "Mall", type=False, time="2030-01-01T03:00:00+03:00")
+    found = await announce(client, 2, "Phone", "Mall", type=True, time="2030-01-01T00:00:00Z")
+    before = (await client.get(f"/announcements/{found}/matches")).json()
+
+    routes.matching_engine.index = matching.MatchIndex()
+    response = await client.post("/matching/rebuild")
+
+    assert response.json() == {"indexed": 2}
+    assert (await client.get(f"/announcements/{found}/matches")).json() == before
+    assert [match["announcement"]["time"] for match in before] == ["2030-01-01T00:00:00"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_announcements_added_while_it_runs(client, sessions):
+    await announce(client, 1, "Phone", "Mall", type=False)
+    gate = matching.AsyncSessionLocal
+    gate.release.clear()
+    rebuilding = asyncio.create_task(client.post("/matching/rebuild"))
+    await asyncio.wait_for(gate.opened.wait(), 1)
+
+    # Объявление попало в индекс, пока пересборка читала базу (например, из пачки массовой вставки)
+    added = models.Announcement(id=100, user_id=2, item="Phone", place="Mall", type=True, time=utcnow())
+    routes.matching_engine.add_and_match(added)
+    gate.release.set()
+
+    assert (await rebuilding).json() == {"indexed": 2}
+    [match] = routes.matching_engine.matches_for(
+        models.Announcement(id=101, user_id=3, item="Phone", place="Mall", type=False, time=utcnow())
+    )
+    assert match.entry.id == 100
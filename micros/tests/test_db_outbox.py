@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import outbox  # noqa: E402
+from database import Base  # noqa: E402
+
+
+class FakeExchange:
+    def __init__(self, channel: "FakeChannel", name: str = ""):
+        self.channel = channel
+        self.name = name
+
+    async def publish(self, message, routing_key: str):
+        if self.channel.is_closed:
+            raise ConnectionError("channel is closed")
+        if self.channel.broker.fail_publishes > 0:
+            self.channel.broker.fail_publishes -= 1
+            # Ошибка уровня канала: брокер закрывает канал, соединение остаётся
+            self.channel.is_closed = True
+            raise ConnectionError("PRECONDITION_FAILED")
+        self.channel.broker.published.append((self.name, routing_key, message))
+
+
+class FakeChannel:
+    def __init__(self, broker: "FakeBroker"):
+        self.broker = broker
+        self.is_closed = False
+        self.default_exchange = FakeExchange(self)
+
+    async def declare_queue(self, name: str, durable: bool = False):
+        self.broker.declared.append(name)
+
+    async def declare_exchange(self, name: str, type, durable: bool = False):
+        return FakeExchange(self, name)
+
+
+class FakeConnection:
+    def __init__(self, broker: "FakeBroker"):
+        self.broker = broker
+        self.is_closed = False
+        self.channels = []
+
+    async def channel(self, publisher_confirms: bool = False):
+        channel = FakeChannel(self.broker)
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeBroker:
+    def __init__(self):
+        self.connections = []
+        self.published = []
+        self.declared = []
+        self.fail_publishes = 0
+
+    async def connect_robust(self, **kwargs):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = FakeBroker()
+    monkeypatch.setattr(outbox.aio_pika, "connect_robust", broker.connect_robust)
+    return broker
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(outbox, "AsyncSessionLocal", factory)
+    yield factory
+    await engine.dispose()
+
+
+async def store(sessions, *messages):
+    async with sessions() as session:
+        session.add_all(messages)
+        await session.commit()
+
+
+async def stored(sessions) -> list[models.OutboxMessage]:
+    async with sessions() as session:
+        return list(await session.scalars(select(models.OutboxMessage).order_by(models.OutboxMessage.id)))
+
+
+@pytest.mark.asyncio
+async def test_pending_messages_are_published_then_marked_sent(sessions, broker):
+    relay = outbox.OutboxRelay()
+    await store(
+        sessions, outbox.notification_message(7, {"event": "new_response"}), outbox.revocation_message("j", 100)
+    )
+
+    assert await relay.relay_batch() == 2
+
+    notification, revocation = await stored(sessions)
+    assert notification.published_at is not None and revocation.published_at is not None
+    [(_, queue, message), (exchange, _, event)] = sorted(broker.published, key=lambda item: item[0])
+    assert queue == outbox.NOTIFICATIONS_QUEUE
+    assert json.loads(message.body) == {"user_id": 7, "event": "new_response"}
+    assert exchange == outbox.REVOCATIONS_EXCHANGE and json.loads(event.body)["jti"] == "j"
+    # Опубликованные сообщения больше не выбираются
+    assert await relay.relay_batch() == 0
+    assert len(broker.published) == 2
+
+
+@pytest.mark.asyncio
+async def test_message_id_identifies_outbox_row(sessions, broker):
+    relay = outbox.OutboxRelay()
+    await store(sessions, *(outbox.notification_message(user_id, {}) for user_id in (1, 2)))
+
+    await relay.relay_batch()
+
+    rows = await stored(sessions)
+    assert sorted(message.message_id for _, _, message in broker.published) == [f"outbox-{row.id}" for row in rows]
+    assert all(message.delivery_mode == outbox.aio_pika.DeliveryMode.PERSISTENT for _, _, message in broker.published)
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_keeps_message_pending_until_retry(sessions, broker, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_RELAY_ENABLED", True)
+    monkeypatch.setattr(outbox, "OUTBOX_RETRY_DELAY", 0.05)
+    relay = outbox.OutboxRelay(poll_interval=60)
+    await store(sessions, outbox.notification_message(1, {}))
+    broker.fail_publishes = 1
+
+    await relay.start()
+    try:
+        await asyncio.sleep(0.01)
+        # Первая попытка не удалась: сообщение осталось неопубликованным
+        assert broker.published == []
+        assert (await stored(sessions))[0].published_at is None
+
+        for _ in range(100):
+            if broker.published:
+                break
+            await asyncio.sleep(0.01)
+        [(_, _, message)] = broker.published
+        [row] = await stored(sessions)
+        assert row.published_at is not None and message.message_id == f"outbox-{row.id}"
+    finally:
+        await relay.stop()
+    assert all(connection.is_closed for connection in broker.connections)
+
+
+@pytest.mark.asyncio
+async def test_channel_error_reopens_channel_on_same_connection(sessions, broker):
+    relay = outbox.OutboxRelay()
+    await store(sessions, outbox.notification_message(1, {"n": 1}))
+    broker.fail_publishes = 1
+
+    with pytest.raises(ConnectionError):
+        await relay.relay_batch()
+    assert await relay.relay_batch() == 1
+
+    [connection] = broker.connections
+    assert [channel.is_closed for channel in connection.channels] == [True, False]
+    # Очередь объявляется заново на новом канале
+    assert broker.declared == [outbox.NOTIFICATIONS_QUEUE] * 2
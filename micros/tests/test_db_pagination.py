@@ -0,0 +1,126 @@
+import base64
+import os
+import sys
+from datetime import datetime
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import routes  # noqa: E402
+from database import Base, get_db  # noqa: E402
+
+# По три объявления на одно время: порядок внутри времени задаёт только id
+ANNOUNCEMENTS = [
+    {"id": id, "user_id": id % 2 + 1, "item": f"Item {id}", "place": "Park" if id % 3 else "Mall",
+     "time": datetime(2024, 1, (id - 1) // 3 + 1, 12), "type": id % 2 == 0}
+    for id in range(1, 13)
+]
+
+
+def newest_first(rows: list[dict]) -> list[int]:
+    return [row["id"] for row in sorted(rows, key=lambda row: (row["time"], row["id"]), reverse=True)]
+
+
+@pytest_asyncio.fixture
+async def client():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "username": f"user{user_id}", "hashed_password": "x"} for user_id in (1, 2)
+        ])
+        # Вставка не по порядку: страницы не должны зависеть от порядка строк в таблице
+        await conn.execute(models.Announcement.__table__.insert(), ANNOUNCEMENTS[::-1])
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(routes.announcements_router)
+    app.dependency_overrides[get_db] = get_test_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    await engine.dispose()
+
+
+async def walk(client, **params) -> list[list[int]]:
+    """
+    Все страницы списка, по next_cursor до конца.
+    """
+    pages, cursor = [], None
+    while True:
+        response = await client.get("/announcements/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 12, 50])
+async def test_pages_cover_all_rows_once_when_times_tie(client, limit):
+    pages = await walk(client, limit=limit)
+
+    assert [id for page in pages for id in page] == newest_first(ANNOUNCEMENTS)
+    assert all(len(page) == limit for page in pages[:-1])
+    # Последняя страница не пустая: курсор не выдаётся, если записей больше нет
+    assert 0 < len(pages[-1]) <= limit
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params, matches", [
+    ({"type": True}, lambda row: row["type"]),
+    ({"type": False}, lambda row: not row["type"]),
+    ({"place": "Mall"}, lambda row: row["place"] == "Mall"),
+    ({"user_id": 2}, lambda row: row["user_id"] == 2),
+    ({"time_from": "2024-01-02T12:00:00"}, lambda row: row["time"] >= datetime(2024, 1, 2, 12)),
+    # Граница time_to не включается
+    ({"time_to": "2024-01-03T12:00:00"}, lambda row: row["time"] < datetime(2024, 1, 3, 12)),
+    ({"type": True, "place": "Park", "time_from": "2024-01-02T00:00:00", "time_to": "2024-01-04T00:00:00"},
+     lambda row: row["type"] and row["place"] == "Park" and datetime(2024, 1, 2) <= row["time"] < datetime(2024, 1, 4)),
+])
+async def test_filters_apply_across_pages(client, params, matches):
+    pages = await walk(client, limit=2, **params)
+
+    expected = newest_first([row for row in ANNOUNCEMENTS if matches(row)])
+    assert expected and [id for page in pages for id in page] == expected
+
+
+@pytest.mark.asyncio
+async def test_filter_without_matches_returns_empty_page(client):
+    response = await client.get("/announcements/", params={"place": "Airport"})
+
+    assert response.json() == {"items": [], "next_cursor": None}
+
+
+def encoded(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    encoded(b"\xff\xfe"),
+    encoded(b"{}"),
+    encoded(b"[1]"),
+    encoded(b'["2024-01-01T12:00:00"]'),
+    encoded(b'["yesterday", 1]'),
+    encoded(b'["2024-01-01T12:00:00", "x"]'),
+    encoded(b'[[2024], 1]'),
+    encoded(b"42"),
+])
+async def test_malformed_cursor_is_rejected(client, cursor):
+    response = await client.get("/announcements/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,206 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import queries  # noqa: E402
+import rollups  # noqa: E402
+import search  # noqa: E402
+import stats  # noqa: E402
+from database import Base  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+DAY = timedelta(days=1)
+
+# Все запросы, которые выполняют маршруты db_service
+ROUTE_QUERIES = {
+    "user_by_id": queries.user_by_id(1),
+    "user_by_username": queries.user_by_username("user"),
+    "announcement_by_id": queries.announcement_by_id(1),
+    "users_by_ids": queries.users_by_ids([1, 2, 3]),
+    "announcements_by_ids": queries.announcements_by_ids([1, 2, 3], frozenset({"user"})),
+    "list_announcements": queries.list_announcements(50),
+    "list_announcements_cursor": queries.list_announcements(50, (NOW, 10)),
+    "list_announcements_type": queries.list_announcements(50, type=True),
+    "list_announcements_place": queries.list_announcements(50, place="Park"),
+    "list_announcements_user": queries.list_announcements(50, (NOW, 10), user_id=1),
+    "list_announcements_time_range": queries.list_announcements(50, time_from=NOW, time_to=NOW),
+    "list_announcements_type_time": queries.list_announcements(50, (NOW, 10), type=False, time_from=NOW),
+    "export_announcements": queries.export_announcements(),
+    "export_announcements_type": queries.export_announcements(type=True),
+    "export_announcements_user": queries.export_announcements(user_id=1),
+    "announcements_by_user": queries.announcements_by_user(1),
+    "announcements_by_type": queries.announcements_by_type(True),
+    "export_responses": queries.export_responses(),
+    "export_responses_announcement": queries.export_responses(announcement_id=1),
+    "export_responses_user": queries.export_responses(responding_user_id=1),
+    "responses_by_announcement": queries.responses_by_announcement(1),
+    "responses_by_user": queries.responses_by_user(1),
+    # Пересборка индекса сопоставления (POST /matching/rebuild)
+    "open_announcements": queries.open_announcements(NOW),
+    "unpublished_outbox": queries.unpublished_outbox(100),
+    "outbox_backlog": queries.outbox_backlog(),
+    "refresh_token_by_hash": queries.refresh_token_by_hash("hash"),
+    "active_revoked_tokens": queries.active_revoked_tokens(NOW),
+    "search": search.search_announcements("sqlite", "black phone", 20),
+    "search_type_page": search.search_announcements("sqlite", "phone", 20, 40, type=True),
+    "announcement_counts": stats.announcement_counts("sqlite", "day"),
+    "announcement_counts_period": stats.announcement_counts("sqlite", "week", time_from=NOW, time_to=NOW + DAY),
+    "top_places": stats.top_places(10),
+    "top_places_type_period": stats.top_places(10, type=True, time_from=NOW, time_to=NOW + DAY),
+    "active_users": stats.active_users(10),
+    "active_users_period": stats.active_users(10, time_from=NOW, time_to=NOW + DAY),
+}
+
+
+async def announcements_batch(db: AsyncSession):
+    query = queries.announcements_by_ids([1, 2, 3], frozenset({"user", "responses"}))
+    (await db.scalars(query)).unique().all()
+
+
+# Маршруты, которые выполняют несколько запросов или строят их внутри (загрузчики ORM,
+# статистика, сводки при вставке): проверяются все выполненные ими запросы
+ROUTE_CALLS = {
+    "announcements_batch_include": announcements_batch,
+    "response_rate": lambda db: stats.response_rate(db, 10),
+    "response_rate_period": lambda db: stats.response_rate(db, 10, time_from=NOW - DAY, time_to=NOW + DAY),
+    "first_response_time": lambda db: stats.median_first_response(db),
+    "first_response_time_period": lambda db: stats.median_first_response(db, time_from=NOW - DAY, time_to=NOW + DAY),
+    "record_announcements": lambda db: rollups.record_announcements(db, [{"time": NOW, "type": True}]),
+    "record_responses": lambda db: rollups.record_responses(
+        db, {1: SimpleNamespace(id=1, time=NOW, type=True)}, [{"announcement_id": 1, "time": NOW + DAY}]
+    ),
+}
+
+# Допустимые проходы по таблице или индексу целиком: точный шаг плана и причина.
+# Запрос из списка не должен перейти на другой полный проход (например, SCAN без индекса).
+ALLOWED_SCANS = {
+    # Первая страница без фильтров: LIMIT останавливает проход по индексу после limit + 1 строк
+    "list_announcements": "SCAN announcements USING INDEX ix_announcements_time",
+    # Выгрузка без фильтров отдаёт всю таблицу
+    "export_announcements": "SCAN announcements USING INDEX ix_announcements_time",
+    "export_responses": "SCAN responses USING INDEX ix_responses_time",
+    # Агрегаты по всей сводке дней (одна строка на день и тип) без периода
+    "announcement_counts": "SCAN stats_daily",
+    "response_rate": "SCAN stats_daily",
+}
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        search.create_search_index(conn)
+        yield conn
+    engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db():
+    """
+    Сессия над базой с несколькими строками: без данных часть запросов статистики не выполняется.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "x"}])
+        await conn.execute(models.Announcement.__table__.insert(), [
+            {"id": 1, "user_id": 1, "item": "Keys", "place": "Park", "time": NOW - DAY / 2, "type": True},
+            {"id": 2, "user_id": 1, "item": "Phone", "place": "Mall", "time": NOW, "type": False},
+        ])
+        await conn.execute(models.Response.__table__.insert(), [
+            {"announcement_id": 1, "responding_user_id": 1, "message": "mine", "time": NOW},
+        ])
+        await conn.run_sync(rollups.rebuild_rollups)
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+def query_plan(connection, query) -> list[str]:
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+async def executed_plans(db: AsyncSession, call) -> list[list[str]]:
+    """
+    Выполняет call(db) и возвращает планы всех выполненных им запросов.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        await call(db)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    conn = await db.connection()
+    return [
+        [row[3] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        for statement, parameters in statements
+    ]
+
+
+def is_full_scan(step: str) -> bool:
+    """
+    Проход по всей таблице или всему индексу. Допустимы только SEARCH и SCAN ... USING COVERING INDEX,
+    а также поиск FTS с условием MATCH и проход по материализованному подзапросу (его таблицы
+    проверяются своими шагами). SCAN ... USING INDEX — полный проход с чтением каждой строки.
+    """
+    if not step.startswith("SCAN ") or step == "SCAN CONSTANT ROW" or "USING COVERING INDEX" in step:
+        return False
+    if "VIRTUAL TABLE INDEX" in step:
+        # Без ограничений строка индекса виртуальной таблицы пустая: "INDEX 0:"
+        return step.endswith(":")
+    return step.split()[1] in Base.metadata.tables
+
+
+def assert_no_full_scans(name: str, plans: list[list[str]]):
+    scans = [step for plan in plans for step in plan if is_full_scan(step)]
+    allowed = ALLOWED_SCANS.get(name)
+    if allowed is not None:
+        assert allowed in scans, f"{name}: allow-list entry is stale, plans: {plans}"
+    assert not [step for step in scans if step != allowed], f"{name}: {plans}"
+
+
+@pytest.mark.parametrize("name", ROUTE_QUERIES)
+def test_route_query_uses_index(connection, name):
+    """
+    Запросы маршрутов не должны выполняться полным проходом по таблице, кроме ALLOWED_SCANS.
+    """
+    assert_no_full_scans(name, [query_plan(connection, ROUTE_QUERIES[name])])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", ROUTE_CALLS)
+async def test_route_call_queries_use_index(db, name):
+    plans = await executed_plans(db, ROUTE_CALLS[name])
+    assert plans, f"{name}: no queries executed"
+    assert_no_full_scans(name, plans)
+
+
+def test_full_scan_is_detected(connection):
+    """
+    Проверка самого детектора: фильтр по неиндексированному столбцу — это SCAN.
+    """
+    plan = query_plan(connection, select(models.Response).where(models.Response.message == "hi"))
+    assert any(is_full_scan(step) for step in plan)
+
+    assert is_full_scan("SCAN announcements USING INDEX ix_announcements_time")
+    assert is_full_scan("SCAN announcements_fts VIRTUAL TABLE INDEX 0:")
+    assert not is_full_scan("SCAN announcements USING COVERING INDEX ix_announcements_place_time")
+    assert not is_full_scan("SEARCH users USING INTEGER PRIMARY KEY (rowid=?)")
+    assert not is_full_scan("SCAN announcements_fts VIRTUAL TABLE INDEX 192:M2")
+    assert not is_full_scan("SCAN activity")
@@ -0,0 +1,147 @@
+import asyncio
+import contextlib
+import os
+import sys
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import routes  # noqa: E402
+from database import Base  # noqa: E402
+from read_cache import ReadCache  # noqa: E402
+
+
+class SlowLoader:
+    def __init__(self, value="row"):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_share_one_query_and_cache_result():
+    cache = ReadCache(ttl=60)
+    load = SlowLoader()
+    readers = [asyncio.create_task(cache.get_or_load("key", "test", load)) for _ in range(100)]
+    await asyncio.sleep(0)
+    load.release.set()
+    assert await asyncio.gather(*readers) == ["row"] * 100
+    assert await cache.get_or_load("key", "test", load) == "row"
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_not_found_is_cached_until_invalidated():
+    cache = ReadCache(ttl=60)
+    load = SlowLoader(value=None)
+    load.release.set()
+    assert await cache.get_or_load("key", "test", load) is None
+    assert await cache.get_or_load("key", "test", load) is None
+    cache.invalidate("key")
+    load.value = "created"
+    assert await cache.get_or_load("key", "test", load) == "created"
+    assert load.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_starts_new_query():
+    cache = ReadCache(ttl=60)
+    stale = SlowLoader(value="old")
+    first = asyncio.create_task(cache.get_or_load("key", "test", stale))
+    await asyncio.sleep(0)
+
+    cache.invalidate("key")  # запись завершилась, пока выполнялся запрос
+    fresh = SlowLoader(value="new")
+    fresh.release.set()
+    assert await cache.get_or_load("key", "test", fresh) == "new"
+
+    stale.release.set()
+    assert await first == "old"
+    # Результат запроса, начатого до записи, не попадает в кэш
+    assert await cache.get_or_load("key", "test", SlowLoader()) == "new"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_first_reader_does_not_cancel_joined_readers():
+    cache = ReadCache(ttl=60)
+    load = SlowLoader()
+    first = asyncio.create_task(cache.get_or_load("key", "test", load))
+    await asyncio.sleep(0)
+    joined = asyncio.create_task(cache.get_or_load("key", "test", load))
+    await asyncio.sleep(0)
+
+    first.cancel()  # клиент первого запроса отключился
+    await asyncio.sleep(0)
+    load.release.set()
+
+    assert await joined == "row"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    # Завершённая загрузка кэшируется, хотя начавший её запрос отменён
+    assert await cache.get_or_load("key", "test", SlowLoader(value="other")) == "row"
+    assert load.calls == 1
+
+
+class GatedSessions:
+    """
+    Фабрика сессий, которая не выполняет запрос до release: загрузка остаётся в процессе, пока тест не разрешит.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.release = asyncio.Event()
+        self.opened = 0
+
+    @contextlib.asynccontextmanager
+    async def __call__(self):
+        self.opened += 1
+        await self.release.wait()
+        async with self.factory() as session:
+            yield session
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "x"}])
+        await conn.execute(models.Announcement.__table__.insert(), [
+            {"id": 1, "user_id": 1, "item": "Keys", "place": "Park", "time": datetime(2024, 1, 1), "type": False}
+        ])
+    gated = GatedSessions(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(routes, "AsyncSessionLocal", gated)
+    monkeypatch.setattr(routes, "read_cache", ReadCache(ttl=60))
+    yield gated
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("route, arg, field, expected", [
+    (routes.get_announcement, 1, "item", "Keys"),
+    (routes.get_user_by_username, "user", "id", 1),
+])
+async def test_follower_gets_row_when_leader_request_is_cancelled(sessions, route, arg, field, expected):
+    leader = asyncio.create_task(route(arg))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(route(arg))
+    await asyncio.sleep(0)
+
+    leader.cancel()  # клиент первого запроса отключился, его зависимости закрыты
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    sessions.release.set()
+
+    assert (await asyncio.wait_for(follower, 1))[field] == expected
+    # Загрузка шла в одной собственной сессии, общей для обоих запросов
+    assert sessions.opened == 1
@@ -0,0 +1,87 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import search  # noqa: E402
+from database import Base  # noqa: E402
+
+ANNOUNCEMENTS = [
+    ("Black phone", "Central park"),
+    ("Phone charger", "Mall"),
+    ("Keys", "Phone booth"),
+    ("Wallet", "Park"),
+]
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "x"}])
+        search.create_search_index(conn)
+        conn.execute(models.Announcement.__table__.insert(), [
+            {"user_id": 1, "item": item, "place": place, "time": datetime(2024, 1, 1), "type": True}
+            for item, place in ANNOUNCEMENTS
+        ])
+        yield conn
+    engine.dispose()
+
+
+def found(connection, q: str, **kwargs) -> list[str]:
+    rows = Session(bind=connection).execute(search.search_announcements("sqlite", q, 10, **kwargs)).all()
+    return [announcement.item for announcement, _ in rows]
+
+
+def test_matches_all_words_with_prefix(connection):
+    assert found(connection, "black pho") == ["Black phone"]
+    assert set(found(connection, "park")) == {"Black phone", "Wallet"}
+
+
+def test_item_ranks_above_place(connection):
+    assert found(connection, "phone")[-1] == "Keys"
+
+
+def test_query_syntax_is_escaped(connection):
+    assert found(connection, 'phone" OR keys*') == []
+    assert found(connection, "keys)(^") == ["Keys"]
+
+
+def test_index_follows_updates_and_deletes(connection):
+    connection.execute(update(models.Announcement).where(models.Announcement.item == "Keys").values(item="Umbrella"))
+    connection.execute(delete(models.Announcement).where(models.Announcement.item == "Wallet"))
+    assert found(connection, "umbrella") == ["Umbrella"]
+    assert found(connection, "keys") == []
+    assert found(connection, "wallet") == []
+
+
+def test_existing_rows_are_indexed_on_creation():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "x"}])
+        conn.execute(models.Announcement.__table__.insert(), [
+            {"user_id": 1, "item": "Umbrella", "place": "Bus", "time": datetime(2024, 1, 1), "type": False}
+        ])
+        search.create_search_index(conn)
+        assert found(conn, "umbrella") == ["Umbrella"]
+    engine.dispose()
+
+
+def test_type_filter_is_applied_before_rank_window(connection, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_RANK_WINDOW", 3)
+    # Окно заполнено более новыми совпадениями другого типа
+    connection.execute(models.Announcement.__table__.insert(), [
+        {"user_id": 1, "item": f"Phone {n}", "place": "Bus", "time": datetime(2024, 1, 2), "type": False}
+        for n in range(3)
+    ])
+
+    assert set(found(connection, "phone", type=True)) == {"Black phone", "Phone charger", "Keys"}
+    assert set(found(connection, "phone", type=False)) == {"Phone 0", "Phone 1", "Phone 2"}
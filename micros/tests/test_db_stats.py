@@ -0,0 +1,93 @@
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import rollups  # noqa: E402
+import stats  # noqa: E402
+from database import Base  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all([
+            models.User(id=1, username="alice", hashed_password="x"),
+            models.User(id=2, username="bob", hashed_password="x"),
+        ])
+        # 2024-01-01 — понедельник, 2024-01-07 — воскресенье той же недели
+        announcements = {
+            1: models.Announcement(id=1, user_id=1, item="Keys", place="Park", time=datetime(2024, 1, 1, 10), type=False),
+            2: models.Announcement(id=2, user_id=1, item="Phone", place="Park", time=datetime(2024, 1, 7, 12), type=True),
+            3: models.Announcement(id=3, user_id=2, item="Wallet", place="Mall", time=datetime(2024, 1, 8, 9), type=True),
+        }
+        responses = [
+            models.Response(announcement_id=1, responding_user_id=2, message="a", time=datetime(2024, 1, 1, 12)),
+            models.Response(announcement_id=1, responding_user_id=2, message="b", time=datetime(2024, 1, 1, 11)),
+            models.Response(announcement_id=2, responding_user_id=2, message="c", time=datetime(2024, 1, 7, 15)),
+        ]
+        # Сводки обновляются теми же запросами, что передают маршруты в очередь записи
+        for announcement in announcements.values():
+            session.add(announcement)
+            for statement in rollups.announcement_created(announcement):
+                await session.execute(statement)
+        for response in responses:
+            session.add(response)
+            for statement in rollups.response_created(announcements[response.announcement_id], response):
+                await session.execute(statement)
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_counts_by_week_start_on_monday(db):
+    rows = (await db.execute(stats.announcement_counts("sqlite", "week"))).mappings().all()
+    assert [(date.fromisoformat(row["period"]), row["type"], row["count"]) for row in rows] == [
+        (date(2024, 1, 1), False, 1), (date(2024, 1, 1), True, 1), (date(2024, 1, 8), True, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_response_rate_and_median(db):
+    rate = await stats.response_rate(db, limit=5)
+    assert (rate["announcements"], rate["answered"], rate["avg_responses"]) == (3, 2, 1.0)
+    assert [row["announcement_id"] for row in rate["top"]] == [1, 2]
+
+    first = await stats.median_first_response(db)
+    assert first["announcements"] == 2
+    assert first["median_seconds"] == pytest.approx(2 * 3600, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_top_places_and_active_users(db):
+    places = (await db.execute(stats.top_places(1))).mappings().all()
+    assert [(row["place"], row["count"]) for row in places] == [("Park", 2)]
+
+    users = (await db.execute(stats.active_users(10))).mappings().all()
+    assert [(row["username"], row["announcements"], row["responses"]) for row in users] == [
+        ("bob", 1, 3), ("alice", 2, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollups_match_rebuild(db):
+    async def snapshot():
+        return [
+            (await db.execute(select(table).order_by(*table.primary_key.columns))).all()
+            for table in (rollups.daily, rollups.per_announcement)
+        ]
+
+    incremental = await snapshot()
+    await db.run_sync(lambda session: rollups.rebuild_rollups(session.connection()))
+    assert await snapshot() == incremental
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import routes  # noqa: E402
+import schemas  # noqa: E402
+import write_queue  # noqa: E402
+from database import Base  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    """
+    База в памяти; записи маршрутов идут только через запущенную очередь записи.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "user", "hashed_password": "old"}])
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(write_queue, "AsyncSessionLocal", factory)
+    queue = write_queue.WriteQueue(enabled=True)
+    monkeypatch.setattr(routes, "write_queue", queue)
+    await queue.start()
+    yield factory
+    await queue.stop()
+    await engine.dispose()
+
+
+async def count(sessions, model) -> int:
+    async with sessions() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_rotated_once(sessions):
+    async with sessions() as db:
+        await routes.create_refresh_token(schemas.RefreshTokenCreate(token_hash="a", user_id=1, expires_in=60), db)
+
+    rotations = await asyncio.gather(*(
+        routes.rotate_refresh_token(schemas.RefreshTokenRotate(token_hash="a", new_token_hash=new, expires_in=60))
+        for new in ("b", "c")
+    ), return_exceptions=True)
+
+    rotated = [result for result in rotations if isinstance(result, models.RefreshToken)]
+    rejected = [result for result in rotations if isinstance(result, HTTPException)]
+    assert len(rotated) == 1 and rotated[0].user_id == 1
+    assert [error.status_code for error in rejected] == [401]
+    assert await count(sessions, models.RefreshToken) == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_revoke_reports_whether_token_was_active(sessions):
+    async with sessions() as db:
+        await routes.create_refresh_token(schemas.RefreshTokenCreate(token_hash="a", user_id=1, expires_in=60), db)
+
+    assert await routes.revoke_refresh_token(schemas.RefreshTokenRevoke(token_hash="a")) == {"revoked": True}
+    assert await routes.revoke_refresh_token(schemas.RefreshTokenRevoke(token_hash="a")) == {"revoked": False}
+    with pytest.raises(HTTPException):
+        await routes.rotate_refresh_token(schemas.RefreshTokenRotate(token_hash="a", new_token_hash="b", expires_in=60))
+
+
+@pytest.mark.asyncio
+async def test_access_token_revocation_is_stored_once_with_outbox_event(sessions):
+    token = schemas.RevokedToken(jti="j", exp=int(time.time()) + 60)
+
+    async def revoke():
+        async with sessions() as db:
+            await routes.revoke_access_token(token, db)
+
+    await asyncio.gather(revoke(), revoke())
+    await revoke()
+
+    assert await count(sessions, models.RevokedToken) == 1
+    assert await count(sessions, models.OutboxMessage) == 1
+
+
+@pytest.mark.asyncio
+async def test_password_update_goes_through_write_queue(sessions):
+    user = await routes.update_user_password(1, schemas.UserPasswordUpdate(hashed_password="new"))
+    assert dict(user) == {"id": 1, "username": "user", "hashed_password": "new"}
+    async with sessions() as session:
+        assert (await session.get(models.User, 1)).hashed_password == "new"
+
+    with pytest.raises(HTTPException) as error:
+        await routes.update_user_password(2, schemas.UserPasswordUpdate(hashed_password="new"))
+    assert error.value.status_code == 404
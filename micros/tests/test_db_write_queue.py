@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+import write_queue  # noqa: E402
+from database import Base  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def sessions(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(models.User.__table__.insert(), [{"id": 1, "username": "taken", "hashed_password": "x"}])
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(write_queue, "AsyncSessionLocal", factory)
+    yield factory
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def queue(sessions, monkeypatch):
+    """
+    Запущенная очередь; размеры зафиксированных пачек записываются в batches.
+    """
+    instance = write_queue.WriteQueue(enabled=True)
+    instance.batches = []
+    commit_batch = instance._commit_batch
+
+    async def record(batch):
+        instance.batches.append(len(batch))
+        await commit_batch(batch)
+
+    monkeypatch.setattr(instance, "_commit_batch", record)
+    await instance.start()
+    yield instance
+    await instance.stop()
+
+
+async def usernames(sessions) -> list[str]:
+    async with sessions() as session:
+        return list(await session.scalars(select(models.User.username).order_by(models.User.id)))
+
+
+def user(name: str) -> models.User:
+    return models.User(username=name, hashed_password="x")
+
+
+@pytest.mark.asyncio
+async def test_bad_row_does_not_cancel_rest_of_batch(sessions, queue):
+    results = await asyncio.gather(
+        *(queue.submit(user(name)) for name in ("a", "taken", "b")), return_exceptions=True
+    )
+
+    assert queue.batches == [3]
+    assert isinstance(results[1], IntegrityError)
+    assert [result.username for result in (results[0], results[2])] == ["a", "b"]
+    assert results[0].id is not None and results[2].id is not None
+    assert await usernames(sessions) == ["taken", "a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_objects_are_flushed_before_statements(sessions, queue):
+    # Запрос видит пользователя, добавленного в той же транзакции
+    statement = update(models.User).where(models.User.username == "new").values(hashed_password="updated")
+    created = await queue.submit(user("new"), statement)
+
+    async with sessions() as session:
+        assert (await session.get(models.User, created.id)).hashed_password == "updated"
+
+
+@pytest.mark.asyncio
+async def test_run_sees_inserts_queued_before_it(sessions, queue):
+    async def read(session):
+        return list(await session.scalars(select(models.User.username).order_by(models.User.id)))
+
+    *_, seen = await asyncio.gather(queue.submit(user("a")), queue.submit(user("b")), queue.run(read))
+
+    assert seen == ["taken", "a", "b"]
+    assert queue.batches == [2]
+
+
+@pytest.mark.asyncio
+async def test_stop_commits_pending_writes(sessions):
+    queue = write_queue.WriteQueue(enabled=True)
+    await queue.start()
+    pending = [asyncio.create_task(queue.submit(user(name))) for name in ("a", "b", "c")]
+    await asyncio.sleep(0)
+
+    await queue.stop()
+
+    assert all(task.done() and task.exception() is None for task in pending)
+    assert await usernames(sessions) == ["taken", "a", "b", "c"]
+    # Остановленная очередь пишет напрямую
+    await queue.submit(user("d"))
+    assert (await usernames(sessions))[-1] == "d"
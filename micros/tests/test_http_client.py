@@ -0,0 +1,123 @@
+import asyncio
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "announcement_service"))
+
+import http_client  # noqa: E402
+
+SERVICES = ("announcement_service", "auth_service", "report_service")
+
+
+def gauge(metric, **labels) -> float:
+    if labels:
+        metric = metric.labels(**labels)
+    [sample] = metric.collect()[0].samples
+    return sample.value
+
+
+class SlowServer:
+    """
+    HTTP/1.1-сервер с keep-alive: тело ответа дописывается только после release,
+    поэтому запрос остаётся открытым, пока тест проверяет метрики пула.
+    """
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.url = None
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.url = f"http://{host}:{port}/"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\no")
+                await writer.drain()
+                await self.release.wait()
+                writer.write(b"k")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def server():
+    server = SlowServer()
+    await server.start()
+    yield server
+    server.release.set()
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def shared_client(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_MAX_CONNECTIONS", 1)
+    await http_client.close_client()
+    await http_client.start_client()
+    yield http_client.get_client()
+    await http_client.close_client()
+
+
+@pytest.mark.asyncio
+async def test_start_and_close_manage_one_shared_client():
+    await http_client.start_client()
+    client = http_client.get_client()
+    await http_client.start_client()
+    assert http_client.get_client() is client and not client.is_closed
+
+    await http_client.close_client()
+    assert client.is_closed
+    # Без клиента метрики пула нулевые, а не ошибка
+    assert gauge(http_client.POOL_CONNECTIONS, state="active") == 0
+    assert gauge(http_client.POOL_PENDING_REQUESTS) == 0
+    # Клиент пересоздаётся по требованию
+    assert not http_client.get_client().is_closed
+    await http_client.close_client()
+
+
+@pytest.mark.asyncio
+async def test_pool_gauges_follow_open_and_queued_requests(server, shared_client):
+    async with shared_client.stream("GET", server.url) as response:
+        assert response.status_code == 200
+        assert gauge(http_client.POOL_CONNECTIONS, state="active") == 1
+        assert gauge(http_client.POOL_CONNECTIONS, state="idle") == 0
+
+        # Единственное соединение занято: второй запрос ждёт в очереди пула
+        queued = asyncio.create_task(shared_client.get(server.url))
+        for _ in range(100):
+            if gauge(http_client.POOL_PENDING_REQUESTS):
+                break
+            await asyncio.sleep(0.01)
+        assert gauge(http_client.POOL_PENDING_REQUESTS) == 1
+
+        server.release.set()
+        assert await response.aread() == b"ok"
+
+    assert (await asyncio.wait_for(queued, 1)).content == b"ok"
+    assert gauge(http_client.POOL_PENDING_REQUESTS) == 0
+    # Соединение осталось в пуле для следующих запросов
+    assert gauge(http_client.POOL_CONNECTIONS, state="idle") == 1
+    assert gauge(http_client.POOL_CONNECTIONS, state="active") == 0
+
+
+def test_pool_metrics_are_identical_in_every_service():
+    def pool_metrics(service: str) -> str:
+        with open(os.path.join(os.path.dirname(__file__), "..", service, "http_client.py"), encoding="utf-8") as f:
+            source = f.read()
+        return source[source.index("def _pool"):source.index("def _create_client")]
+
+    # Проверяется копия announcement_service; остальные сервисы должны читать пул так же
+    assert len({pool_metrics(service) for service in SERVICES}) == 1
@@ -0,0 +1,86 @@
+import base64
+import json
+import os
+import sys
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "auth_service"))
+
+import jwt_handler  # noqa: E402
+from jwt_backends import BACKENDS, InvalidToken  # noqa: E402
+
+KEYS = {"old": "x" * 32, "new": "y" * 32}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    try:
+        return BACKENDS[request.param](KEYS)
+    except RuntimeError as e:
+        pytest.skip(str(e))
+
+
+def test_tokens_are_interchangeable_between_backends(backend):
+    claims = {"sub": "42", "exp": int(time.time()) + 60}
+    for issuer in BACKENDS:
+        try:
+            token = BACKENDS[issuer](KEYS).encode(claims, "new")
+        except RuntimeError:
+            continue
+        assert backend.get_unverified_header(token)["kid"] == "new"
+        assert backend.decode(token, "new") == claims
+
+
+def test_invalid_tokens_are_rejected(backend):
+    hmac_backend = BACKENDS["hmac"](KEYS)
+    valid = hmac_backend.encode({"sub": "42", "exp": int(time.time()) + 60}, "new")
+    expired = hmac_backend.encode({"sub": "42", "exp": int(time.time()) - 1}, "new")
+    header, claims, signature = valid.split(".")
+    tampered = ".".join([header, hmac_backend.encode({"sub": "1"}, "new").split(".")[1], signature])
+
+    for token, kid in ((valid, "old"), (expired, "new"), (tampered, "new"), ("not-a-token", "new")):
+        with pytest.raises(InvalidToken), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            backend.decode(token, kid)
+
+
+def test_handler_rejects_malformed_kid_with_401():
+    token = jwt_handler.create_access_token({"sub": "1"})
+    claims, signature = token.split(".")[1:]
+    for header in ({"alg": "HS256", "kid": [1]}, {"alg": "HS256", "kid": "unknown"}):
+        encoded = base64.urlsafe_b64encode(json.dumps(header).encode()).rstrip(b"=").decode()
+        forged = ".".join([encoded, claims, signature])
+        with pytest.raises(HTTPException) as error:
+            jwt_handler.decode_access_token(forged)
+        assert error.value.status_code == 401
+
+
+class SlowLRU(OrderedDict):
+    """
+    Кэш, уступающий поток между get и move_to_end: так гонка без блокировки воспроизводится каждый раз.
+    """
+
+    def move_to_end(self, key, last=True):
+        time.sleep(0.001)
+        super().move_to_end(key, last)
+
+
+def test_decode_cache_is_safe_across_threads(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "_verified", SlowLRU())
+    # Кэш на один токен: каждая проверка другого токена вытесняет предыдущий
+    monkeypatch.setattr(jwt_handler, "JWT_DECODE_CACHE_SIZE", 1)
+    tokens = [jwt_handler.create_access_token({"sub": str(user_id)}) for user_id in range(4)]
+
+    def verify(token):
+        return [jwt_handler.decode_access_token(token)["sub"] for _ in range(50)]
+
+    with ThreadPoolExecutor(len(tokens)) as pool:
+        results = list(pool.map(verify, tokens))
+
+    assert results == [[str(user_id)] * 50 for user_id in range(4)]
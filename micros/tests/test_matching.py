@@ -0,0 +1,56 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "db_service"))
+
+import models  # noqa: E402
+from matching import Entry, MatchIndex, normalize  # noqa: E402
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def entry(id: int, item: str, place: str, type: bool, user_id: int = None, days_ago: float = 0) -> Entry:
+    return Entry(
+        id=id, user_id=user_id or id, type=type, item=item, place=place, time=NOW - timedelta(days=days_ago),
+        item_tokens=normalize(item), place_tokens=normalize(place),
+    )
+
+
+def test_normalize():
+    assert normalize("My black Keys, near the Mall") == {"black", "key", "mall"}
+
+
+def test_candidates_are_opposite_type_ranked_by_similarity():
+    index = MatchIndex(window=timedelta(days=30))
+    index.add(entry(1, "Black wallet", "Central park", type=True))
+    index.add(entry(2, "Brown wallet", "Airport", type=True))
+    index.add(entry(3, "Black wallet", "Central park", type=False))
+    matches = index.candidates(entry(4, "black leather wallet", "park", type=False), min_score=0.1)
+    assert [match.entry.id for match in matches] == [1, 2]
+
+
+def test_candidates_skip_own_and_out_of_window_announcements():
+    index = MatchIndex(window=timedelta(days=30))
+    index.add(entry(1, "Phone", "Mall", type=True, user_id=7))
+    index.add(entry(2, "Phone", "Mall", type=True, days_ago=45))
+    assert index.candidates(entry(3, "Phone", "Mall", type=False, user_id=7)) == []
+
+
+def test_expire_removes_old_announcements():
+    index = MatchIndex(window=timedelta(days=30))
+    index.add(entry(1, "Phone", "Mall", type=True, days_ago=40))
+    index.add(entry(2, "Phone", "Mall", type=True))
+    index.expire(NOW)
+    assert len(index) == 1
+    assert [match.entry.id for match in index.candidates(entry(3, "Phone", "Mall", type=False))] == [2]
+
+
+def test_entry_time_is_utc_for_aware_and_stored_values():
+    def announcement(time: datetime) -> models.Announcement:
+        return models.Announcement(id=1, user_id=1, item="Phone", place="Mall", type=True, time=time)
+
+    aware = Entry.from_announcement(announcement(datetime(2024, 6, 1, 15, tzinfo=timezone(timedelta(hours=3)))))
+    # Так же объявление читается из базы при пересборке индекса
+    stored = Entry.from_announcement(announcement(datetime(2024, 6, 1, 12)))
+    assert aware.time == stored.time == datetime(2024, 6, 1, 12)
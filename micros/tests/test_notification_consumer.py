@@ -0,0 +1,306 @@
+import asyncio
+import os
+import signal
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "notification_service"))
+
+import admin  # noqa: E402
+import consumer  # noqa: E402
+from notifications import InvalidNotification  # noqa: E402
+from topology import ATTEMPTS_HEADER, ERROR_HEADER, MAX_ATTEMPTS, QUEUE_NAME  # noqa: E402
+
+
+class FakeMessage:
+    """
+    Доставленное сообщение: запоминает ack/nack вместо обращения к брокеру.
+    """
+
+    def __init__(self, tag: int = 1, headers: dict = None, body: bytes = b"{}", channel=None):
+        self.delivery_tag = tag
+        self.headers = headers or {}
+        self.body = body
+        self.channel = channel
+        self.content_type = "application/json"
+        self.message_id = f"m{tag}"
+        self.timestamp = None
+        self.processed = False
+        self.acks = []
+        self.nacked = False
+
+    async def ack(self, multiple: bool = False):
+        self.acks.append(multiple)
+        self.processed = True
+
+    async def nack(self, requeue: bool = True):
+        self.nacked = True
+        self.processed = True
+
+
+class FakeExchange:
+    def __init__(self, fail: bool = False):
+        self.published = []
+        self.fail = fail
+
+    async def publish(self, message, routing_key: str):
+        if self.fail:
+            raise ConnectionError("channel closed")
+        self.published.append((routing_key, message))
+
+
+@pytest.fixture
+def notification_consumer():
+    instance = consumer.NotificationConsumer(prefetch=10, concurrency=1)
+    instance._publish_channel = SimpleNamespace(default_exchange=FakeExchange())
+    instance._dlx = FakeExchange()
+    return instance
+
+
+def failing_with(error: Exception):
+    async def process(body, published_at):
+        raise error
+    return process
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("previous, queue", [
+    (0, f"{QUEUE_NAME}.retry.1s"),
+    (1, f"{QUEUE_NAME}.retry.10s"),
+    (2, f"{QUEUE_NAME}.retry.60s"),
+    # Последняя ступень повторяется
+    (3, f"{QUEUE_NAME}.retry.60s"),
+])
+async def test_failed_message_goes_to_retry_tier(notification_consumer, monkeypatch, previous, queue):
+    monkeypatch.setattr(consumer, "process_notification", failing_with(RuntimeError("smtp down")))
+    message = FakeMessage(headers={ATTEMPTS_HEADER: previous, "trace": "t"})
+
+    await notification_consumer._handle(message)
+
+    [(routing_key, forwarded)] = notification_consumer._publish_channel.default_exchange.published
+    assert routing_key == queue
+    assert forwarded.headers == {ATTEMPTS_HEADER: previous + 1, ERROR_HEADER: "smtp down", "trace": "t"}
+    assert forwarded.body == message.body and forwarded.message_id == message.message_id
+    assert notification_consumer._dlx.published == []
+    assert not message.nacked
+
+
+@pytest.mark.asyncio
+async def test_message_is_quarantined_after_max_attempts(notification_consumer, monkeypatch):
+    monkeypatch.setattr(consumer, "process_notification", failing_with(RuntimeError("smtp down")))
+    message = FakeMessage(headers={ATTEMPTS_HEADER: MAX_ATTEMPTS - 1})
+
+    await notification_consumer._handle(message)
+
+    [(routing_key, forwarded)] = notification_consumer._dlx.published
+    assert routing_key == QUEUE_NAME
+    assert forwarded.headers[ATTEMPTS_HEADER] == MAX_ATTEMPTS
+    assert notification_consumer._publish_channel.default_exchange.published == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_message_is_quarantined_without_retry(notification_consumer, monkeypatch):
+    monkeypatch.setattr(consumer, "process_notification", failing_with(InvalidNotification("no user_id")))
+    message = FakeMessage()
+
+    await notification_consumer._handle(message)
+
+    [(_, forwarded)] = notification_consumer._dlx.published
+    assert forwarded.headers == {ATTEMPTS_HEADER: 1, ERROR_HEADER: "no user_id"}
+    assert notification_consumer._publish_channel.default_exchange.published == []
+
+
+@pytest.mark.asyncio
+async def test_message_is_dead_lettered_when_forward_fails(notification_consumer, monkeypatch):
+    monkeypatch.setattr(consumer, "process_notification", failing_with(RuntimeError("smtp down")))
+    notification_consumer._publish_channel.default_exchange.fail = True
+    message = FakeMessage()
+
+    await notification_consumer._handle(message)
+
+    assert message.nacked
+
+
+class FakeQuarantine:
+    def __init__(self, messages: list):
+        self.messages = list(messages)
+        self.declaration_result = SimpleNamespace(message_count=len(self.messages))
+
+    async def get(self, no_ack: bool = False, fail: bool = True):
+        return self.messages.pop(0) if self.messages else None
+
+
+class ReplayChannel:
+    """
+    Канал, в котором каждое возвращённое сообщение сразу снова попадает в карантин,
+    как при повторной ошибке обработки.
+    """
+
+    def __init__(self, messages: list):
+        self.quarantine = FakeQuarantine(messages)
+        self.default_exchange = self
+
+    async def declare_queue(self, name: str, passive: bool = False):
+        assert passive
+        return self.quarantine
+
+    async def publish(self, message, routing_key: str):
+        assert routing_key == QUEUE_NAME
+        assert ATTEMPTS_HEADER not in message.headers and ERROR_HEADER not in message.headers
+        self.quarantine.messages.append(FakeMessage(headers={ATTEMPTS_HEADER: MAX_ATTEMPTS}))
+
+
+@pytest.mark.asyncio
+async def test_replay_all_stops_at_initial_queue_depth():
+    originals = [FakeMessage(tag, headers={ATTEMPTS_HEADER: MAX_ATTEMPTS, ERROR_HEADER: "e"}) for tag in range(3)]
+    channel = ReplayChannel(originals)
+
+    await admin.replay_quarantined(channel, float("inf"))
+
+    assert all(message.acks == [False] for message in originals)
+    # Вернувшиеся в карантин сообщения остались там
+    assert len(channel.quarantine.messages) == 3
+
+
+@pytest.mark.asyncio
+async def test_replay_respects_limit():
+    channel = ReplayChannel([FakeMessage(tag) for tag in range(5)])
+
+    await admin.replay_quarantined(channel, 2)
+
+    assert len(channel.quarantine.messages) == 5
+
+
+def delivered(tracker: consumer.AckTracker, count: int, channel=None) -> list[FakeMessage]:
+    channel = channel or object()
+    messages = [FakeMessage(tag, channel=channel) for tag in range(1, count + 1)]
+    for message in messages:
+        tracker.delivered(message)
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_ack_tracker_acks_only_contiguous_prefix_on_out_of_order_completion():
+    tracker = consumer.AckTracker()
+    first, second, third = delivered(tracker, 3)
+
+    tracker.settled(third)
+    await tracker.flush()
+    assert [message.acks for message in (first, second, third)] == [[], [], []]
+
+    tracker.settled(first)
+    await tracker.flush()
+    assert first.acks == [True] and third.acks == []
+
+    tracker.settled(second)
+    await tracker.flush()
+    # Одно подтверждение с multiple покрывает второе и третье сообщения
+    assert second.acks == [] and third.acks == [True]
+    assert tracker.ready == 0
+
+
+@pytest.mark.asyncio
+async def test_ack_tracker_skips_nacked_messages_in_window():
+    tracker = consumer.AckTracker()
+    messages = delivered(tracker, 4)
+    for message in (messages[1], messages[3]):
+        await message.nack(requeue=False)
+    for message in messages:
+        tracker.settled(message)
+
+    await tracker.flush()
+
+    # Последнее подтверждаемое — третье: тег отклонённого четвёртого повторно не отправляется
+    assert [message.acks for message in messages] == [[], [], [True], []]
+
+
+@pytest.mark.asyncio
+async def test_ack_tracker_forgets_messages_of_previous_channel():
+    tracker = consumer.AckTracker()
+    [stale] = delivered(tracker, 1)
+    [fresh] = delivered(tracker, 1)  # тот же тег на новом канале после переподключения
+
+    tracker.settled(stale)
+    tracker.settled(fresh)
+    await tracker.flush()
+
+    assert stale.acks == [] and fresh.acks == [True]
+
+
+class FakeQueue:
+    def __init__(self):
+        self.callback = None
+        self.cancelled = False
+        self.consuming = asyncio.Event()
+
+    async def consume(self, callback):
+        self.callback = callback
+        self.consuming.set()
+        return "consumer-tag"
+
+    async def cancel(self, consumer_tag: str):
+        self.cancelled = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    async def channel(self, publisher_confirms: bool = False):
+        return self
+
+    async def set_qos(self, prefetch_count: int):
+        pass
+
+    async def get_exchange(self, name: str):
+        return FakeExchange()
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_sigterm_drains_in_flight_messages_before_closing(monkeypatch):
+    queue, connection = FakeQueue(), FakeConnection()
+    release = asyncio.Event()
+    processed = []
+
+    async def process(body, published_at):
+        await release.wait()
+        processed.append(body)
+
+    async def connect_robust(**kwargs):
+        return connection
+
+    async def declare_topology(channel):
+        return queue
+
+    async def apply_dead_letter_policy(user, password):
+        pass
+
+    monkeypatch.setattr(consumer, "process_notification", process)
+    monkeypatch.setattr(consumer.aio_pika, "connect_robust", connect_robust)
+    monkeypatch.setattr(consumer, "declare_topology", declare_topology)
+    monkeypatch.setattr(consumer, "apply_dead_letter_policy", apply_dead_letter_policy)
+    monkeypatch.setattr(consumer, "ACK_BATCH_SIZE", 100)
+    monkeypatch.setattr(consumer, "ACK_FLUSH_INTERVAL", 60)
+
+    running = asyncio.create_task(consumer.start_consumer())
+    await asyncio.wait_for(queue.consuming.wait(), 1)
+    messages = [FakeMessage(tag, body=f"{tag}".encode(), channel=connection) for tag in range(1, 4)]
+    for message in messages:
+        await queue.callback(message)
+
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.sleep(0.05)
+    # Сигнал получен, но соединение не закрыто, пока обрабатываются полученные сообщения
+    assert queue.cancelled and not connection.closed and not running.done()
+
+    release.set()
+    await asyncio.wait_for(running, 1)
+
+    assert sorted(processed) == [b"1", b"2", b"3"]
+    assert [message.acks for message in messages] == [[], [], [True]]
+    assert connection.closed
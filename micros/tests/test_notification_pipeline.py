@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "notification_service"))
+
+from delivery import DeliveryBackend, Digest, SmtpStubBackend  # noqa: E402
+from notifications import InvalidNotification, NotificationPipeline, process_notification  # noqa: E402
+import notifications  # noqa: E402
+
+
+class RecordingBackend(DeliveryBackend):
+    """
+    Бэкенд, запоминающий полученные пачки дайджестов.
+    """
+    name = "recording"
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def send_batch(self, digests):
+        if self.fail:
+            raise RuntimeError("delivery failed")
+        self.batches.append(digests)
+
+
+def body(user_id: int, content: str) -> bytes:
+    return json.dumps({"user_id": user_id, "content": content}).encode()
+
+
+@pytest.mark.asyncio
+async def test_window_coalesces_by_user(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(notifications, "pipeline", NotificationPipeline([backend], window=0.05))
+
+    await asyncio.gather(*(process_notification(body(i % 2 + 1, f"response {i}")) for i in range(6)))
+
+    assert len(backend.batches) == 1
+    digests = {digest.user_id: digest for digest in backend.batches[0]}
+    assert len(digests[1].notifications) == 3
+    assert digests[2].content.startswith("You have 3 new notifications")
+
+
+@pytest.mark.asyncio
+async def test_max_batch_flushes_before_window(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(notifications, "pipeline", NotificationPipeline([backend], window=60, max_batch=4))
+
+    await asyncio.wait_for(asyncio.gather(*(process_notification(body(1, str(i))) for i in range(4))), 1)
+
+    assert [len(batch[0].notifications) for batch in backend.batches] == [4]
+
+
+@pytest.mark.asyncio
+async def test_backend_failure_fails_every_message(monkeypatch):
+    monkeypatch.setattr(notifications, "pipeline", NotificationPipeline([RecordingBackend(fail=True)], window=0.01))
+
+    results = await asyncio.gather(*(process_notification(body(1, "x")) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_invalid_message_is_rejected():
+    with pytest.raises(InvalidNotification):
+        await process_notification(b"not json")
+    with pytest.raises(InvalidNotification):
+        await process_notification(json.dumps({"user_id": 1}).encode())
+
+
+@pytest.mark.parametrize("kinds, subject", [
+    ([None, None], "New responses to your announcements"),
+    (["match", "match"], "Possible matches for your announcements"),
+    ([None, "match"], "New notifications about your announcements"),
+    (["unknown"], "New notifications about your announcements"),
+])
+def test_smtp_subject_follows_notification_kinds(kinds, subject):
+    digest = Digest(1, [
+        {"user_id": 1, "content": f"n{i}", **({"kind": kind} if kind else {})} for i, kind in enumerate(kinds)
+    ])
+
+    message = SmtpStubBackend.build_message(digest)
+
+    assert message["Subject"] == subject
+    assert message["To"].startswith("user-1@")
@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "notification_service"))
+
+import topology  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_dead_letter_policy_is_put_through_management_api():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(201)
+
+    await topology.apply_dead_letter_policy(
+        "guest", "secret", client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    [request] = requests
+    assert request.method == "PUT"
+    # Виртуальный хост "/" кодируется в пути
+    assert request.url.raw_path.decode() == f"/api/policies/%2F/{topology.DLX_POLICY_NAME}"
+    assert request.headers["Authorization"].startswith("Basic ")
+    policy = json.loads(request.content)
+    assert policy["apply-to"] == "queues"
+    assert policy["pattern"] == f"^{topology.QUEUE_NAME}$"
+    assert policy["definition"] == {"dead-letter-exchange": topology.DLX_NAME}
+
+
+@pytest.mark.asyncio
+async def test_dead_letter_policy_errors_are_raised():
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(401)))
+    with pytest.raises(httpx.HTTPStatusError):
+        await topology.apply_dead_letter_policy("guest", "wrong", client=client)
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import Executor, Future
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "auth_service"))
+
+import utils  # noqa: E402
+
+
+class StubPool(Executor):
+    """
+    Пул без потоков: задачи ждут release(), shutdown запоминает аргументы и отменяет ожидающие.
+    """
+
+    def __init__(self):
+        self.pending: list[tuple[Future, object, tuple]] = []
+        self.shutdown_calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.pending.append((future, fn, args))
+        return future
+
+    def release(self):
+        pending, self.pending = self.pending, []
+        for future, fn, args in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_result(fn(*args))
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdown_calls.append((wait, cancel_futures))
+        if cancel_futures:
+            for future, _, _ in self.pending:
+                future.cancel()
+            self.pending = []
+
+
+class InlinePool(Executor):
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    monkeypatch.setattr(utils, "pwd_context", CryptContext(
+        schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=5, bcrypt__min_rounds=5
+    ))
+
+
+def hasher_with(pool: Executor, workers: int = 1, queue_size: int = 1) -> utils.PasswordHasher:
+    hasher = utils.PasswordHasher(workers=workers, queue_size=queue_size)
+    hasher._executor = pool
+    return hasher
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_with_503_and_retry_after():
+    pool = StubPool()
+    hasher = hasher_with(pool, workers=1, queue_size=1)
+    running = [asyncio.create_task(hasher.hash("secret")) for _ in range(2)]
+    await until(lambda: len(pool.pending) == 2)
+
+    with pytest.raises(HTTPException) as error:
+        await hasher.verify_and_update("secret", "hash")
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "1"}
+
+    pool.release()
+    hashes = await asyncio.gather(*running)
+    assert all(utils.pwd_context.verify("secret", hashed) for hashed in hashes)
+    # Место в очереди освободилось
+    assert hasher._pending == 0
+    task = asyncio.create_task(hasher.hash("secret"))
+    await until(lambda: pool.pending)
+    pool.release()
+    assert utils.pwd_context.verify("secret", await task)
+
+
+@pytest.mark.asyncio
+async def test_verify_and_update_rehashes_stale_rounds():
+    hasher = hasher_with(InlinePool())
+    stale = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret")
+
+    is_valid, new_hash = await hasher.verify_and_update("secret", stale)
+    assert is_valid and new_hash.startswith("$2b$05$")
+    assert utils.pwd_context.verify("secret", new_hash)
+
+    # Хеш с текущей стоимостью не перехешируется, неверный пароль не проходит
+    assert await hasher.verify_and_update("secret", new_hash) == (True, None)
+    assert await hasher.verify_and_update("wrong", stale) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_queued_work_and_releases_pool():
+    pool = StubPool()
+    hasher = hasher_with(pool, workers=1, queue_size=4)
+    queued = asyncio.create_task(hasher.hash("secret"))
+    await until(lambda: pool.pending)
+
+    hasher.shutdown()
+
+    assert pool.shutdown_calls == [(False, True)]
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert hasher._pending == 0 and hasher._executor is None
+    hasher.shutdown()  # повторный вызов ничего не делает
+    assert pool.shutdown_calls == [(False, True)]
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "announcement_service"))
+
+import rabbitmq_utils  # noqa: E402
+
+EXCHANGE = rabbitmq_utils.ANNOUNCEMENT_EVENTS_EXCHANGE
+
+
+class FakeExchange:
+    def __init__(self, channel: "FakeChannel", name: str):
+        self.channel = channel
+        self.name = name
+
+    async def publish(self, message, routing_key: str):
+        if self.channel.is_closed:
+            raise ConnectionError("channel is closed")
+        self.channel.published.append(self.name)
+
+
+class FakeChannel:
+    def __init__(self, fail_declare: bool = False):
+        self.is_closed = False
+        self.fail_declare = fail_declare
+        self.published = []
+        self.declared_queues = []
+
+    async def declare_exchange(self, name: str, type, durable: bool = False):
+        if self.fail_declare:
+            # Ошибка объявления закрывает канал на стороне брокера
+            self.is_closed = True
+            raise ConnectionError("PRECONDITION_FAILED")
+        return FakeExchange(self, name)
+
+    async def declare_queue(self, name: str, durable: bool = False):
+        self.declared_queues.append(name)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self, broker: "FakeBroker"):
+        self.broker = broker
+        self.is_closed = False
+        self.channels = []
+
+    async def channel(self, publisher_confirms: bool = False):
+        channel = FakeChannel(fail_declare=self.broker.fail_declares > 0)
+        self.broker.fail_declares -= 1
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeBroker:
+    def __init__(self):
+        self.connections = []
+        self.fail_declares = 0
+
+    async def connect_robust(self, **kwargs):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    @property
+    def open_connections(self) -> list[FakeConnection]:
+        return [connection for connection in self.connections if not connection.is_closed]
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = FakeBroker()
+    monkeypatch.setattr(rabbitmq_utils.aio_pika, "connect_robust", broker.connect_robust)
+    monkeypatch.setattr(rabbitmq_utils, "RABBITMQ_RECONNECT_DELAY", 0)
+    return broker
+
+
+async def published(publisher: rabbitmq_utils.RabbitPublisher, message: dict):
+    publisher.publish(message, exchange=EXCHANGE)
+    await asyncio.wait_for(publisher._outbox.join(), 1)
+
+
+@pytest.mark.asyncio
+async def test_closed_channel_is_reopened_on_same_connection(broker):
+    publisher = rabbitmq_utils.RabbitPublisher()
+    await publisher.start()
+    try:
+        await published(publisher, {"n": 1})
+        [connection] = broker.connections
+        # Брокер закрыл канал (например, после ошибки публикации), соединение живо
+        await connection.channels[0].close()
+        broker.fail_declares = 2
+
+        await published(publisher, {"n": 2})
+
+        assert broker.connections == [connection]
+        assert len(connection.channels) == 4
+        assert [channel.is_closed for channel in connection.channels] == [True, True, True, False]
+        assert connection.channels[-1].published == [EXCHANGE]
+        # Издатель пишет только в обменник и не объявляет очередь уведомлений
+        assert all(channel.declared_queues == [] for channel in connection.channels)
+    finally:
+        await publisher.stop()
+    assert broker.open_connections == []
+
+
+@pytest.mark.asyncio
+async def test_new_connection_only_after_previous_closed(broker):
+    publisher = rabbitmq_utils.RabbitPublisher()
+    await publisher.start()
+    try:
+        await published(publisher, {"n": 1})
+        first = broker.connections[0]
+        await first.close()
+        await first.channels[0].close()
+
+        await published(publisher, {"n": 2})
+
+        assert len(broker.connections) == 2
+        assert broker.open_connections == [broker.connections[1]]
+    finally:
+        await publisher.stop()
+    assert broker.open_connections == []
@@ -3,6 +3,7 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.testclient import TestClient
 from datetime import datetime
 from pydantic import BaseModel
+from typing import Optional
 
 # Заглушки для схем
 class ReportAnnouncementOut(BaseModel):
@@ -13,6 +14,10 @@ class ReportAnnouncementOut(BaseModel):
     time: datetime
     type: bool  # True = Найдено, False = Потеряно
 
+class ReportAnnouncementPage(BaseModel):
+    items: list[ReportAnnouncementOut]
+    next_cursor: Optional[str] = None
+
 class ReportResponseOut(BaseModel):
     id: int
     announcement_id: int
@@ -57,12 +62,12 @@ mock_responses = [
 # Определение приложения и маршрутов
 app = FastAPI()
 
-@app.get("/reports/announcements/user/{user_id}", response_model=list[ReportAnnouncementOut])
+@app.get("/reports/announcements/user/{user_id}", response_model=ReportAnnouncementPage)
 async def get_user_announcements(user_id: int, user: dict = Depends(get_current_user_stub)):
     announcements = [ann for ann in mock_announcements if ann["user_id"] == user_id]
     if not announcements:
         raise HTTPException(status_code=404, detail="No announcements found")
-    return announcements
+    return {"items": announcements, "next_cursor": None}
 
 @app.get("/reports/responses/announcement/{announcement_id}", response_model=list[ReportResponseOut])
 async def get_responses_by_announcement(announcement_id: int, user: dict = Depends(get_current_user_stub)):
@@ -78,7 +83,8 @@ client = TestClient(app)
 def test_get_user_announcements_success():
     response = client.get("/reports/announcements/user/1")
     assert response.status_code == 200
-    assert len(response.json()) == 2
+    assert len(response.json()["items"]) == 2
+    assert response.json()["next_cursor"] is None
 
 def test_get_user_announcements_not_found():
     response = client.get("/reports/announcements/user/99")
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "announcement_service"))
+
+from cache import MemoryBackend, RedisBackend, ResponseCache, etag_matches  # noqa: E402
+
+
+class FakeRedis:
+    """
+    Минимальная замена redis.asyncio.Redis в памяти для проверки RedisBackend.
+    """
+
+    def __init__(self):
+        self.data: dict[str, tuple[Optional[float], bytes]] = {}
+
+    async def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= time.monotonic()):
+            self.data.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key, value, px=None):
+        self.data[key] = (time.monotonic() + px / 1000 if px else None, value)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def incr(self, key):
+        value = int((await self.get(key)) or 0) + 1
+        self.data[key] = (None, str(value).encode())
+        return value
+
+    async def aclose(self):
+        pass
+
+
+class CountingLoader:
+    """
+    Заглушка запроса к db_service, считающая обращения.
+    """
+
+    def __init__(self, body: bytes = b'{"items":[]}', delay: float = 0):
+        self.calls = 0
+        self.body = body
+        self.delay = delay
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.body
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    backend = MemoryBackend() if request.param == "memory" else RedisBackend(client=FakeRedis())
+    return ResponseCache(backend, ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_hit_after_miss(cache):
+    load = CountingLoader()
+    first = await cache.get_or_load("key", "item", load)
+    second = await cache.get_or_load("key", "item", load)
+    assert load.calls == 1
+    assert first == second
+    assert etag_matches(first.etag, second.etag)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(cache):
+    load = CountingLoader(delay=0.05)
+    results = await asyncio.gather(*(cache.get_or_load("key", "item", load) for _ in range(20)))
+    assert load.calls == 1
+    assert len({result.etag for result in results}) == 1
+
+
+@pytest.mark.asyncio
+async def test_list_invalidation_changes_key(cache):
+    params = {"limit": 50, "type": True}
+    key = await cache.list_key(params)
+    await cache.get_or_load(key, "list", CountingLoader())
+    await cache.invalidate_lists()
+    new_key = await cache.list_key(params)
+    assert new_key != key
+    load = CountingLoader()
+    await cache.get_or_load(new_key, "list", load)
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_item_invalidation(cache):
+    await cache.get_or_load(cache.item_key(1), "item", CountingLoader())
+    await cache.invalidate_announcement(1)
+    load = CountingLoader()
+    await cache.get_or_load(cache.item_key(1), "item", load)
+    assert load.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(cache):
+    async def failing():
+        raise RuntimeError("db_service unavailable")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("key", "item", failing)
+    load = CountingLoader()
+    await cache.get_or_load("key", "item", load)
+    assert load.calls == 1
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
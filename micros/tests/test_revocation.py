@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "auth_service"))
+
+import jwt_handler  # noqa: E402
+from revocation import RevocationList, revocation_list  # noqa: E402
+
+
+def test_snapshot_and_events_merge_and_drop_expired_tokens():
+    revoked = RevocationList()
+    now = time.time()
+    revoked.add("event", now + 60)
+    revoked.add("expired-event", now - 1)
+    # Снимок, сделанный до события, не отменяет его
+    revoked.merge([{"jti": "snapshot", "exp": now + 60}, {"jti": "expired-snapshot", "exp": now - 1}])
+
+    assert revoked.is_revoked("event") and revoked.is_revoked("snapshot")
+    assert not revoked.is_revoked("expired-event") and not revoked.is_revoked("expired-snapshot")
+    assert not revoked.is_revoked(None)
+    assert len(revoked) == 2
+
+
+def test_revoked_token_is_rejected_even_when_decode_is_cached():
+    token = jwt_handler.create_access_token({"sub": "7"})
+    payload = jwt_handler.decode_access_token(token)
+    assert payload["sub"] == "7" and payload["jti"]
+
+    revocation_list.add(payload["jti"], payload["exp"])
+    with pytest.raises(HTTPException) as error:
+        jwt_handler.decode_access_token(token)
+    assert error.value.status_code == 401
+    # Другие токены того же пользователя действуют
+    assert jwt_handler.decode_access_token(jwt_handler.create_access_token({"sub": "7"}))["sub"] == "7"
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+SERVICES = ("announcement_service", "auth_service", "report_service")
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+sys.path.insert(0, os.path.join(ROOT, "announcement_service"))
+
+from singleflight import SingleFlight  # noqa: E402
+
+
+def test_service_copies_are_identical():
+    sources = set()
+    for service in SERVICES:
+        with open(os.path.join(ROOT, service, "singleflight.py"), encoding="utf-8") as file:
+            sources.add(file.read())
+    assert len(sources) == 1
+
+
+async def started_calls(flight: SingleFlight, fn, count: int) -> list[asyncio.Task]:
+    calls = []
+    for _ in range(count):
+        calls.append(asyncio.create_task(flight.do("key", fn)))
+        await asyncio.sleep(0)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    flight, release, runs = SingleFlight(), asyncio.Event(), []
+
+    async def load():
+        runs.append(1)
+        await release.wait()
+        return "value"
+
+    leader, *waiters = await started_calls(flight, load, 3)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == [("value", True)] * 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert runs == [1]
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_call():
+    flight, release = SingleFlight(), asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "value"
+
+    leader, waiter = await started_calls(flight, load, 2)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == ("value", False)
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared_and_next_call_runs_again():
+    flight, release, runs = SingleFlight(), asyncio.Event(), []
+
+    async def load():
+        runs.append(1)
+        await release.wait()
+        raise RuntimeError("db_service unavailable")
+
+    calls = await started_calls(flight, load, 2)
+    release.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert not flight.in_flight("key")
+    # Ошибка не запоминается: следующий вызов выполняет функцию заново
+    with pytest.raises(RuntimeError):
+        await flight.do("key", load)
+    assert len(runs) == 2
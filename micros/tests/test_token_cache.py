@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "announcement_service"))
+
+from token_cache import TokenCache  # noqa: E402
+
+SECRET_KEY = "your_secret_key"
+ALGORITHM = "HS256"
+
+
+def make_token(sub: str, expires_in: float = 1800) -> str:
+    return jwt.encode({"sub": sub, "exp": int(time.time() + expires_in)}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+class CountingVerifier:
+    """
+    Заглушка проверки токена, считающая обращения к "сервису авторизации".
+    """
+
+    def __init__(self, valid: bool = True, delay: float = 0):
+        self.calls = 0
+        self.valid = valid
+        self.delay = delay
+
+    async def __call__(self, token: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if not self.valid:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return {"user_id": int(jwt.get_unverified_claims(token)["sub"])}
+
+
+@pytest.mark.asyncio
+async def test_cache_hit():
+    cache = TokenCache()
+    verify = CountingVerifier()
+    token = make_token("1")
+    assert await cache.get_or_verify(token, verify) == {"user_id": 1}
+    assert await cache.get_or_verify(token, verify) == {"user_id": 1}
+    assert verify.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_cache():
+    cache = TokenCache(negative_ttl=60)
+    verify = CountingVerifier(valid=False)
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc:
+            await cache.get_or_verify("invalid_token", verify)
+        assert exc.value.status_code == 401
+    assert verify.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_coalesced():
+    cache = TokenCache()
+    verify = CountingVerifier(delay=0.05)
+    token = make_token("2")
+    results = await asyncio.gather(*(cache.get_or_verify(token, verify) for _ in range(20)))
+    assert all(result == {"user_id": 2} for result in results)
+    assert verify.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = TokenCache(max_size=2)
+    verify = CountingVerifier()
+    first, second, third = make_token("1"), make_token("2"), make_token("3")
+    await cache.get_or_verify(first, verify)
+    await cache.get_or_verify(second, verify)
+    await cache.get_or_verify(first, verify)  # first становится самым свежим
+    await cache.get_or_verify(third, verify)  # вытесняется second
+    assert len(cache) == 2
+    await cache.get_or_verify(first, verify)
+    assert verify.calls == 3
+    await cache.get_or_verify(second, verify)
+    assert verify.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_ttl_bounded_by_token_exp():
+    cache = TokenCache(ttl=300)
+    verify = CountingVerifier()
+    token = make_token("1", expires_in=-1)  # уже истёкший токен не кэшируется
+    await cache.get_or_verify(token, verify)
+    await cache.get_or_verify(token, verify)
+    assert verify.calls == 2
@@ -0,0 +1,100 @@
+import base64
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "announcement_service"))
+
+import token_verifier  # noqa: E402
+
+KEYS = {"old": "o" * 32, "new": "n" * 32}
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setattr(token_verifier, "JWT_KEYS", KEYS)
+    monkeypatch.setattr(token_verifier, "ACTIVE_KID", "new")
+
+
+@pytest.fixture
+def auth_service(monkeypatch):
+    """
+    Заглушка auth_service: запоминает запросы к /auth/verify-token.
+    """
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers["Authorization"] == "Bearer good":
+            return httpx.Response(200, json={"user_id": 5, "jti": "j"})
+        return httpx.Response(401, json={"detail": "Invalid token payload"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(token_verifier, "get_client", lambda: client)
+    return requests
+
+
+def make_token(kid="new", secret=None, expires_in=60, **claims) -> str:
+    payload = {"sub": "42", "exp": int(time.time()) + expires_in, "jti": "abc", **claims}
+    return jwt.encode(payload, secret or KEYS[kid], algorithm="HS256", headers={"kid": kid})
+
+
+def forge_header(token: str, header: dict) -> str:
+    encoded = base64.urlsafe_b64encode(json.dumps(header).encode()).rstrip(b"=").decode()
+    return ".".join([encoded] + token.split(".")[1:])
+
+
+async def assert_rejected(token: str):
+    with pytest.raises(HTTPException) as error:
+        await token_verifier.verify_token_local(token)
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_local_decode_uses_key_from_kid(auth_service):
+    assert await token_verifier.verify_token_local(make_token("old")) == {"user_id": 42, "jti": "abc"}
+    # Токены без kid проверяются активным ключом
+    token = jwt.encode({"sub": "7", "exp": int(time.time()) + 60}, KEYS["new"], algorithm="HS256")
+    assert (await token_verifier.verify_token_local(token))["user_id"] == 7
+    assert auth_service == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_rejected_without_network(auth_service):
+    await assert_rejected(make_token("new", secret="x" * 32))
+    await assert_rejected(make_token("new", expires_in=-10))
+    await assert_rejected(make_token("new", sub="not-a-number"))
+    await assert_rejected(make_token("old").replace(".", "", 1))
+    # Неизвестный и некорректный kid (список не хешируется) — 401, а не запрос ключей или 500
+    await assert_rejected(forge_header(make_token("new"), {"alg": "HS256", "kid": "unknown"}))
+    await assert_rejected(forge_header(make_token("new"), {"alg": "HS256", "kid": [1]}))
+    assert auth_service == []
+
+
+@pytest.mark.asyncio
+async def test_remote_mode_asks_auth_service(auth_service, monkeypatch):
+    monkeypatch.setattr(token_verifier, "TOKEN_VERIFY_MODE", "remote")
+    assert await token_verifier.verify_token("good") == {"user_id": 5, "jti": "j"}
+    with pytest.raises(HTTPException) as error:
+        await token_verifier.verify_token("bad")
+    assert error.value.status_code == 401
+    assert [request.url.path for request in auth_service] == ["/auth/verify-token"] * 2
+
+
+@pytest.mark.asyncio
+async def test_remote_mode_reports_unavailable_auth_service(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(token_verifier, "get_client", lambda: client)
+    monkeypatch.setattr(token_verifier, "TOKEN_VERIFY_MODE", "remote")
+    with pytest.raises(HTTPException) as error:
+        await token_verifier.verify_token("good")
+    assert error.value.status_code == 503